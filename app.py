@@ -1,33 +1,73 @@
+# Tandai modul skrip sebagai __main__ paket: multiprocessing tidak menjalankan
+# ulang modul seperti ini di worker forkserver (mpl_render), jadi pool bisa
+# dibuat kapan saja tanpa mengganti sys.modules["__main__"]. Harus tetap
+# pernyataan pertama.
+import importlib.machinery
+__spec__ = importlib.machinery.ModuleSpec("__main__", None)
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from bokeh.plotting import figure
-from bokeh.models import ColumnDataSource, HoverTool, LinearColorMapper, ColorBar, BasicTicker, PrintfTickFormatter
+from bokeh.models import ColumnDataSource, HoverTool, LinearColorMapper, ColorBar, BasicTicker, PrintfTickFormatter, Slider, Button, CustomJS, Range1d, BoxSelectTool, LassoSelectTool, Div
+from bokeh.layouts import column, row
 from bokeh.transform import cumsum, factor_cmap, linear_cmap
 from bokeh.palettes import Category10, Category20c, Viridis256
 from math import pi
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from data_store import filter_view, ingest_csv, memory_report, open_store, source_stamp
+from cube import AggregateCube, CorrelationCube, HistogramCube
+from clustering import FEATURES, MODES, ClusteringEngine
+from charts import ChartCache, ChartPipeline, ChartSpec
+from export import FORMATS, export_file_name, export_frame
+from profiling import Profiler
+from lod import DensityGrid, LTTB_JS, REBIN_JS, RAW_POINT_LIMIT, DISPLAY_POINTS, line_levels
+from profiles import ClusterProfiles
+from query_service import QueryService
+from ranking import RankingIndex
+from warmup import Warmup, ready_path
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+# Modul berat yang hanya dipakai satu halaman (mpl_render: matplotlib/seaborn,
+# spatial: scikit-learn) diimpor di tempat pemakaiannya; warmup.py mengimpornya
+# di latar belakang saat server mulai.
 
 st.set_page_config(page_title="Analisis Konsumsi Energi Global", layout="wide")
 
 st.title("Analisis Konsumsi Energi Global dengan Clustering AI & Visualisasi Interaktif")
 
-# Load full data initially to populate filters
-@st.cache_data
-def load_full_data():
-    df_full = pd.read_csv("global_energy_consumption.csv")
-    df_agglo_full = pd.read_csv("hasil_agglo_clustering.csv")
+# Bisa diarahkan ke dataset lain lewat environment (dipakai benchmark.py)
+DATA_PATH = os.environ.get("ENERGY_DATA_PATH", "global_energy_consumption.csv")
+AGGLO_PATH = os.environ.get("ENERGY_AGGLO_PATH", "hasil_agglo_clustering.csv")
+
+# Profiling per bagian; toggle-nya ada di expander "Profiling" di akhir sidebar
+# Satu lease tracemalloc per sesi (lihat profiling.py)
+profiler = Profiler(st.session_state.get("profiling", False),
+                    st.session_state.setdefault("profiler_owner", uuid.uuid4().hex))
+
+# Load full data initially to populate filters.
+# cache_resource: satu salinan read-only (memory-mapped) dibagi ke semua sesi;
+# stamp (mtime, ukuran) membuat cache dibangun ulang saat file sumber berubah.
+@st.cache_resource(max_entries=4)
+def load_full_data(data_stamp, agglo_stamp):
+    df_full = open_store(DATA_PATH)
+    df_agglo_full = open_store(AGGLO_PATH)
     return df_full, df_agglo_full
 
-df_full, df_agglo_full = load_full_data()
+df_full, df_agglo_full = load_full_data(source_stamp(DATA_PATH), source_stamp(AGGLO_PATH))
+profiler.checkpoint("Muat data")
 
 # Sidebar
 st.sidebar.title("Navigasi")
 menu = st.sidebar.radio("Pilih Halaman:", [
     "Eksplorasi Data",
     "Visualisasi Interaktif",
-    "Analisis Clustering (AI)"
+    "Analisis Clustering (AI)",
+    "Peta Klaster PCA"
 ])
 
 # --- Filter Global ---
@@ -36,29 +76,175 @@ st.sidebar.subheader("Filter Data")
 # File Uploader
 uploaded_file = st.sidebar.file_uploader("Upload Data Energi Global (CSV)", type=["csv"])
 
-@st.cache_data(show_spinner=False)
-def load_data_from_upload(uploaded_file):
+# Frame hasil unggahan per hash isi file, dibagi ke semua sesi
+@st.cache_resource
+def get_upload_frames():
+    return OrderedDict()
+
+def load_data_from_upload(uploaded_file, upload_key):
+    frames = get_upload_frames()
+    if upload_key in frames:
+        return frames[upload_key]
+    # Dibaca per chunk dengan skema eksplisit; kolom divalidasi terhadap data default
+    progress_bar = st.sidebar.progress(0.0, text="Memuat data unggahan...")
     try:
-        df_uploaded = pd.read_csv(uploaded_file)
-        st.sidebar.success("Data berhasil diunggah dan dimuat!")
-        return df_uploaded
+        df_uploaded, dropped = ingest_csv(
+            uploaded_file,
+            reference_columns=list(df_full.columns),
+            progress=lambda fraction: progress_bar.progress(fraction, text="Memuat data unggahan..."),
+        )
     except Exception as e:
         st.sidebar.error(f"Error memuat file: {e}")
         return None
+    finally:
+        progress_bar.empty()
+    if dropped:
+        st.sidebar.warning(f"{dropped:,} baris tanpa Country/Year yang valid dilewati.")
+    if len(df_uploaded) == 0:
+        st.sidebar.error("File tidak berisi baris dengan Country dan Year yang valid.")
+        return None
+    frames[upload_key] = df_uploaded
+    while len(frames) > 4:
+        frames.popitem(last=False)
+    return df_uploaded
 
+dataset_key = ("default",) + source_stamp(DATA_PATH)
+agglo_key = ("default",) + source_stamp(AGGLO_PATH)
 if uploaded_file is not None:
-    df_full = load_data_from_upload(uploaded_file)
+    # Digest isi dihitung sekali per file unggahan (file_id), bukan setiap rerun
+    if st.session_state.get("upload_digest", (None,))[0] != uploaded_file.file_id:
+        st.session_state["upload_digest"] = (uploaded_file.file_id, hashlib.sha1(uploaded_file.getvalue()).hexdigest())
+    upload_key = st.session_state["upload_digest"][1]
+    df_full = load_data_from_upload(uploaded_file, upload_key)
     if df_full is None:
-        # Fallback to original data if upload fails
-        df_full = pd.read_csv("global_energy_consumption.csv")
-        df_agglo_full = pd.read_csv("hasil_agglo_clustering.csv") # Revert df_agglo_full as well
+        # Fallback to original data if upload fails (df_agglo_full tetap data default)
+        df_full, df_agglo_full = load_full_data(source_stamp(DATA_PATH), source_stamp(AGGLO_PATH))
         st.sidebar.warning("Menggunakan data default karena file yang diunggah bermasalah.")
-else:
-    df_full = pd.read_csv("global_energy_consumption.csv")
-    df_agglo_full = pd.read_csv("hasil_agglo_clustering.csv")
+    else:
+        st.sidebar.success("Data berhasil diunggah dan dimuat!")
+        dataset_key = ("upload", upload_key)
+profiler.checkpoint("Data unggahan")
+
+# --- Clustering (AI) ---
+# Label dari notebook hanya berlaku untuk data default; data unggahan selalu
+# diklaster ulang di dalam aplikasi.
+st.sidebar.subheader("Clustering (AI)")
+cluster_sources = dict(MODES)
+if dataset_key[0] == "default":
+    # k mengikuti hasil terakhir notebook/pipeline.py (tidak selalu 3)
+    notebook_k = df_agglo_full["Cluster"].nunique()
+    cluster_sources = {"notebook": f"Hasil notebook (Agglomerative, k={notebook_k})", **MODES}
+cluster_label = st.sidebar.selectbox("Sumber Klaster", list(cluster_sources.values()))
+cluster_mode = next(mode for mode, label in cluster_sources.items() if label == cluster_label)
+cluster_k = st.sidebar.slider("Jumlah Klaster (k)", min_value=2, max_value=10, value=3, disabled=cluster_mode == "notebook")
+
+@st.cache_resource
+def get_clustering_engine():
+    return ClusteringEngine()
+
+clustering_result = None
+if cluster_mode != "notebook":
+    future = get_clustering_engine().submit(df_full, dataset_key, cluster_k, cluster_mode)
+    with st.spinner("Menghitung ulang klaster..."):
+        try:
+            clustering_result = future.result()
+        except ValueError as e:
+            st.sidebar.error(f"Clustering gagal: {e}")
+    if clustering_result is not None:
+        df_agglo_full = clustering_result.frame
+        agglo_key = ("cluster", dataset_key, clustering_result.mode, cluster_k)
+profiler.checkpoint("Clustering")
+
+# Kubus agregat per dataset, dibagi ke semua sesi. Argumen berawalan "_" tidak
+# di-hash oleh Streamlit; identitas dataset diwakili oleh frame_key.
+def append_base(frame, frame_key):
+    # Store default yang diperpanjang lewat append.py mencatat segmen per versi.
+    # Kembalikan (jumlah baris, frame_key) versi sebelumnya agar kubusnya (dari
+    # cache) cukup digabung dengan kubus dari baris baru.
+    if frame_key[0] != "default":
+        return None
+    segments = frame.attrs.get("segments", [])
+    rows = [segment["rows"] for segment in segments]
+    if len(frame) not in rows[1:]:
+        return None
+    prev = segments[rows.index(len(frame)) - 1]
+    return prev["rows"], ("default",) + tuple(prev["stamp"])
+
+@st.cache_resource(max_entries=8)
+def load_cube(_frame, frame_key, cluster_col=None):
+    base = append_base(_frame, frame_key)
+    if base is None:
+        return AggregateCube(_frame, cluster_col)
+    rows, base_key = base
+    return load_cube(_frame.iloc[:rows], base_key, cluster_col).merge(
+        AggregateCube(_frame.iloc[rows:], cluster_col))
+
+# Co-moment per sel untuk heatmap korelasi (semua kolom numerik, termasuk Year)
+@st.cache_resource(max_entries=8)
+def load_corr_cube(_frame, frame_key, cluster_col=None):
+    columns = _frame.select_dtypes(include="number").columns
+    base = append_base(_frame, frame_key)
+    if base is None:
+        return CorrelationCube(_frame, columns, cluster_col)
+    rows, base_key = base
+    return load_corr_cube(_frame.iloc[:rows], base_key, cluster_col).merge(
+        CorrelationCube(_frame.iloc[rows:], columns, cluster_col))
+
+# Indeks spasial (grid + KD-tree) atas PC1/PC2 untuk halaman Peta Klaster PCA
+@st.cache_resource(max_entries=4)
+def load_cluster_map(_frame, frame_key):
+    from spatial import ClusterMap
+    return ClusterMap(_frame, [col for col in FEATURES if col in _frame.columns])
+
+# Histogram per sel untuk histogram dan box plot halaman Eksplorasi
+@st.cache_resource(max_entries=8)
+def load_hist_cube(_frame, frame_key):
+    return HistogramCube(_frame, _frame.select_dtypes(include="number").columns)
+
+# Profil per klaster (rata-rata, kuartil, deret per tahun dan per negara) untuk
+# halaman Analisis Clustering
+@st.cache_resource(max_entries=4)
+def load_cluster_profiles(_frame, frame_key):
+    features = [col for col in FEATURES if col in _frame.columns]
+    return ClusterProfiles(load_cube(_frame, frame_key, "Cluster"),
+                           HistogramCube(_frame, features, "Cluster"), features)
+
+# Indeks peringkat Top-N per negara (atau per negara-klaster) dari kubus
+@st.cache_resource(max_entries=8)
+def load_ranking(_frame, frame_key, cluster_col=None):
+    by = ("Country", "Cluster") if cluster_col else ("Country",)
+    return RankingIndex(load_cube(_frame, frame_key, cluster_col), by)
+
+# Process pool bersama untuk gambar matplotlib/seaborn (backend Agg)
+@st.cache_resource
+def get_render_pool():
+    from mpl_render import make_render_pool
+    return make_render_pool()
+
+# Thread pool bersama untuk menyiapkan dan menserialisasi grafik Bokeh
+@st.cache_resource
+def get_chart_executor():
+    return ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="charts")
+
+# Cache hasil grafik (JSON Bokeh / PNG) lintas sesi, LRU dengan batas memori
+@st.cache_resource
+def get_chart_cache():
+    return ChartCache(max_bytes=64 * 1024 * 1024)
+
+# Layanan query agregat bersama (asyncio): cache hasil, dedup dan batching lintas sesi
+@st.cache_resource
+def get_query_service():
+    return QueryService(max_workers=min(8, os.cpu_count() or 1))
+
+# File ekspor yang sudah dibuat, per (dataset, filter, format), lintas sesi
+@st.cache_resource
+def get_export_cache():
+    return ChartCache(max_bytes=256 * 1024 * 1024)
+
+full_cube = load_cube(df_full, dataset_key)
 
 # Perbarui all_years dan all_countries berdasarkan df_full yang mungkin baru
-all_years = sorted(df_full['Year'].unique())
+all_years = full_cube.years.tolist()
 selected_years = st.sidebar.slider(
     "Pilih Rentang Tahun",
     min_value=int(min(all_years)),
@@ -66,28 +252,104 @@ selected_years = st.sidebar.slider(
     value=(int(min(all_years)), int(max(all_years)))
 )
 
-all_countries = sorted(df_full['Country'].unique())
+all_countries = full_cube.countries.tolist()
 selected_countries = st.sidebar.multiselect(
     "Pilih Negara (Visualisasi Interaktif)",
     options=all_countries,
     default=all_countries[:10] # Default 10 negara pertama
 )
 
-# Apply filters based on sidebar selection
-df = df_full[(df_full['Year'] >= selected_years[0]) & (df_full['Year'] <= selected_years[1])]
-df = df[df['Country'].isin(selected_countries)]
+# Apply filters based on sidebar selection: grafik agregat bertanya ke layanan
+# query (potongan kubus dibagi antar sesi), baris mentah hanya difilter untuk
+# bagian yang membutuhkannya (filter_rows).
+queries = get_query_service()
+queries.register(dataset_key, full_cube)
+query_filters = {"years": selected_years, "countries": selected_countries}
 
-# Note: df_agglo tetap menggunakan data asli hasil_agglo_clustering.csv
-# Jika ingin clustering ulang dengan data yang diupload, perlu kode AI clustering di sini.
-# Untuk saat ini, df_agglo tidak difilter berdasarkan negara dari uploaded_file.
-df_agglo = df_agglo_full[(df_agglo_full['Year'] >= selected_years[0]) & (df_agglo_full['Year'] <= selected_years[1])]
-df_agglo = df_agglo[df_agglo['Country'].isin(selected_countries)] # Filter df_agglo based on selected countries
+def series(metric=None, groupby=None, stat="mean", n=10):
+    return queries.series(dataset_key, metric, groupby, query_filters, stat, n)
 
-# Pastikan df_agglo memiliki kolom Cluster sebagai string untuk visualisasi
-df_agglo["Cluster"] = df_agglo["Cluster"].astype(str)
+# Grafik Top-N membaca indeks peringkat (argpartition, memo per filter)
+ranking = load_ranking(df_full, dataset_key)
+
+def top_countries(metric, n=10, ascending=False, columns=()):
+    return ranking.top(metric, n, selected_years, selected_countries, ascending, columns)
+
+# Pemanasan sekali per proses server untuk data default (lihat warmup.py):
+# modul halaman, kubus, profil klaster dan agregat tampilan default dibangun di
+# latar belakang, lalu file kesiapan ditulis. ENERGY_WARMUP=0 mematikannya.
+def warmup_steps(data_stamp, agglo_stamp):
+    data_key = ("default",) + data_stamp
+    agglo_key_default = ("default",) + agglo_stamp
+
+    def import_pages():
+        import mpl_render  # noqa: F401
+        import spatial  # noqa: F401
+        import sklearn.cluster  # noqa: F401
+        import sklearn.decomposition  # noqa: F401
+
+    def cubes():
+        frame, agglo = load_full_data(data_stamp, agglo_stamp)
+        load_cube(frame, data_key)
+        load_corr_cube(frame, data_key)
+        load_hist_cube(frame, data_key)
+        load_cube(agglo, agglo_key_default, "Cluster")
+        load_corr_cube(agglo, agglo_key_default, "Cluster")
+
+    def cluster_views():
+        _, agglo = load_full_data(data_stamp, agglo_stamp)
+        load_cluster_profiles(agglo, agglo_key_default)
+        load_ranking(agglo, agglo_key_default, "Cluster")
+        if {"PC1", "PC2"} <= set(agglo.columns):
+            load_cluster_map(agglo, agglo_key_default)
+
+    def default_view():
+        # Filter default sidebar: semua tahun, 10 negara pertama
+        frame, _ = load_full_data(data_stamp, agglo_stamp)
+        default_cube = load_cube(frame, data_key)
+        queries.register(data_key, default_cube)
+        filters = {"years": (int(default_cube.years.min()), int(default_cube.years.max())),
+                   "countries": default_cube.countries.tolist()[:10]}
+        pending = [queries.submit(data_key, groupby=dim, filters=filters, stat="count") for dim in ("Year", "Country")]
+        for feature in default_cube.features:
+            pending.append(queries.submit(data_key, feature, "Year", filters))
+            pending.append(queries.submit(data_key, feature, None, filters))
+        default_ranking = load_ranking(frame, data_key)
+        for feature in default_cube.features:
+            default_ranking.top(feature, 10, filters["years"], filters["countries"])
+        for future in pending:
+            future.result()
+
+    return [
+        ("Impor modul halaman", import_pages),
+        ("Kubus agregat", cubes),
+        ("Profil & peta klaster", cluster_views),
+        ("Agregat tampilan default", default_view),
+    ]
+
+@st.cache_resource
+def start_warmup(data_stamp, agglo_stamp):
+    stamps = {"data": list(data_stamp), "agglo": list(agglo_stamp)}
+    return Warmup(warmup_steps(data_stamp, agglo_stamp), ready_path(DATA_PATH), stamps).start(add_script_run_ctx)
+
+warmup = None
+if os.environ.get("ENERGY_WARMUP", "1") != "0":
+    warmup = start_warmup(source_stamp(DATA_PATH), source_stamp(AGGLO_PATH))
+
+# Semua state global yang memengaruhi isi grafik; bagian dari kunci ChartCache
+chart_context = (dataset_key, agglo_key, tuple(selected_years), tuple(sorted(selected_countries)))
+# Gambar Eksplorasi hanya bergantung pada data energi dan filter
+image_context = (dataset_key, tuple(selected_years), tuple(sorted(selected_countries)))
+profiler.checkpoint("Kubus & filter")
+
+# Frame terurut per Year, jadi filter tahun menghasilkan view tanpa salinan
+def filter_rows(frame):
+    return filter_view(frame, selected_years, selected_countries)
 
 if menu == "Eksplorasi Data":
     st.header("Eksplorasi Data Energi Global")
+    df = filter_rows(df_full)
+    df_agglo = filter_rows(df_agglo_full)
     st.markdown("""
     **Sumber Dataset:** [Global Energy Consumption 2000-2024 (Kaggle)](https://www.kaggle.com/datasets/atharvasoundankar/global-energy-consumption-2000-2024)
     """)
@@ -101,175 +363,223 @@ if menu == "Eksplorasi Data":
     st.dataframe(df.describe())
 
     st.subheader("Download Data Hasil Filter")
+    # File hanya dibuat saat diminta, lalu disimpan per fingerprint filter
+    def export_widget(frame, frame_key, label, stem, help_text, widget_key):
+        fmt_label = st.selectbox(f"Format {label}", [v[0] for v in FORMATS.values()], key=f"{widget_key}_format")
+        fmt = next(fmt for fmt, spec in FORMATS.items() if spec[0] == fmt_label)
+        export_key = (frame_key, tuple(selected_years), tuple(sorted(selected_countries)), fmt)
+        payload = get_export_cache().get(export_key)
+        if payload is None and st.button(f"Siapkan {label}", key=f"{widget_key}_prepare", help=help_text):
+            with st.spinner("Menyiapkan file..."):
+                payload = export_frame(frame, fmt)
+            get_export_cache().put(export_key, payload)
+        if payload is not None:
+            st.download_button(
+                label=f"Unduh {label} ({fmt_label})",
+                data=payload,
+                file_name=export_file_name(stem, fmt),
+                mime=FORMATS[fmt][1],
+                help=help_text,
+                key=f"{widget_key}_download"
+            )
+
     col1, col2 = st.columns(2)
     with col1:
-        st.download_button(
-            label="Unduh Data Energi Global (CSV)",
-            data=df.to_csv(index=False).encode('utf-8'),
-            file_name="global_energy_consumption_filtered.csv",
-            mime="text/csv",
-            help="Unduh data energi global yang saat ini difilter."
-        )
+        export_widget(df, dataset_key, "Data Energi Global", "global_energy_consumption_filtered",
+                      "Unduh data energi global yang saat ini difilter.", "export_energy")
     with col2:
-        st.download_button(
-            label="Unduh Data Klastering (CSV)",
-            data=df_agglo.to_csv(index=False).encode('utf-8'),
-            file_name="hasil_agglo_clustering_filtered.csv",
-            mime="text/csv",
-            help="Unduh data hasil clustering (AI) yang saat ini difilter."
-        )
+        export_widget(df_agglo, agglo_key, "Data Klastering", "hasil_agglo_clustering_filtered",
+                      "Unduh data hasil clustering (AI) yang saat ini difilter.", "export_cluster")
+
+    # Gambar dirender di process pool dari ringkasan kubus, bukan baris mentah
+    from mpl_render import ImagePipeline
+    images = ImagePipeline(get_render_pool, get_chart_cache(), image_context)
+    hist_cube = load_hist_cube(df_full, dataset_key)
 
     st.subheader("Distribusi Jumlah Data Per Tahun")
     st.info("""
     Visualisasi ini menunjukkan jumlah entri data untuk setiap tahun. Dengan melihat distribusi ini, kita dapat mengetahui apakah data terdistribusi merata sepanjang waktu atau terdapat tahun-tahun tertentu dengan data lebih banyak/lebih sedikit.
     """)
-    fig, ax = plt.subplots(figsize=(10, 4))
-    sns.countplot(x='Year', data=df, palette="Set3", ax=ax)
-    ax.set_title("Distribusi Jumlah Data Per Tahun")
-    ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
-    st.pyplot(fig)
+    def prepare_year_counts():
+        year_counts = series(groupby="Year", stat="count")
+        return year_counts["Year"].tolist(), year_counts["count"].tolist()
+    images.add(st, "eksplorasi_year_counts", "year_counts", prepare_year_counts)
 
     st.subheader("10 Negara dengan Jumlah Data Terbanyak")
     st.info("""
     Grafik batang ini menampilkan 10 negara dengan jumlah data terbanyak dalam dataset. Hal ini membantu mengidentifikasi negara-negara yang paling sering tercatat dan dapat menjadi fokus analisis lebih lanjut.
     """)
-    fig, ax = plt.subplots(figsize=(10, 4))
-    df["Country"].value_counts().head(10).plot(kind='bar', color='teal', ax=ax)
-    ax.set_title("10 Negara dengan Jumlah Data Terbanyak")
-    ax.set_ylabel("Jumlah Data")
-    st.pyplot(fig)
+    def prepare_country_counts():
+        top10 = series(groupby="Country", stat="count").sort_values("count", ascending=False, kind="stable").head(10)
+        return top10["Country"].tolist(), top10["count"].tolist()
+    images.add(st, "eksplorasi_country_counts", "country_counts", prepare_country_counts)
 
     st.subheader("Korelasi Antar Variabel Numerik")
     st.info("""
     Heatmap korelasi ini memperlihatkan hubungan linear antar fitur numerik utama dalam data energi global. Korelasi positif/negatif yang kuat dapat mengindikasikan adanya keterkaitan antar fitur, yang penting untuk analisis lanjutan dan pemodelan.
     """)
-    fig, ax = plt.subplots(figsize=(12, 8))
-    numeric_cols = df.select_dtypes(include='number').columns
-    sns.heatmap(df[numeric_cols].corr(), annot=True, cmap="coolwarm", ax=ax)
-    ax.set_title("Korelasi Antar Variabel Numerik")
-    st.pyplot(fig)
+    images.add(st, "eksplorasi_corr", "corr_heatmap",
+               lambda: load_corr_cube(df_full, dataset_key).corr(selected_years, selected_countries))
 
     st.subheader("Distribusi Fitur Numerik")
     st.info("""
     Histogram ini menampilkan distribusi nilai dari setiap fitur numerik. Dengan melihat histogram, kita dapat mengetahui apakah data berdistribusi normal, skewed, atau memiliki outlier.
     """)
-    df_numeric = df.select_dtypes(include='number')
-    fig, ax = plt.subplots(figsize=(15, 10))
-    df_numeric.hist(bins=30, color='salmon', edgecolor='black', ax=ax)
-    plt.suptitle("Distribusi Fitur Numerik", fontsize=16)
-    st.pyplot(fig)
+    images.add(st, "eksplorasi_hist", "histograms",
+               lambda: hist_cube.histograms(selected_years, selected_countries))
 
     st.subheader("Deteksi Outlier Pada Fitur Numerik")
     st.info("""
     Boxplot ini digunakan untuk mendeteksi outlier pada fitur numerik. Outlier dapat mempengaruhi hasil analisis dan pemodelan, sehingga penting untuk diidentifikasi sejak awal.
     """)
-    fig, ax = plt.subplots(figsize=(14, 8))
-    sns.boxplot(data=df_numeric, orient="h", palette="pastel", ax=ax)
-    ax.set_title("Deteksi Outlier Pada Fitur Numerik")
-    st.pyplot(fig)
+    images.add(st, "eksplorasi_boxplot", "boxplot",
+               lambda: hist_cube.box_stats(selected_years, selected_countries))
+    profiler.checkpoint("Statistik & ekspor")
+    images.render()
 
 elif menu == "Visualisasi Interaktif":
     st.header("Visualisasi Interaktif Data Energi Global")
+    charts = ChartPipeline(get_chart_executor(), get_chart_cache(), chart_context)
+
     # 1. Rata-rata konsumsi energi per tahun (Bokeh)
     st.subheader("Rata-Rata Konsumsi Energi Total Per Tahun")
-    energy_avg = df.groupby("Year")["Total Energy Consumption (TWh)"].mean().reset_index()
-    source = ColumnDataSource(energy_avg)
-    p = figure(title="Rata-Rata Konsumsi Energi Total Per Tahun", x_axis_label='Tahun', y_axis_label='Energi (TWh)', width=800, height=400, tools="pan,wheel_zoom,box_zoom,reset,hover,save")
-    p.line(x='Year', y='Total Energy Consumption (TWh)', source=source, line_width=2, color="navy")
-    p.circle(x='Year', y='Total Energy Consumption (TWh)', source=source, size=6, color="navy", alpha=0.6)
-    p.add_tools(HoverTool(tooltips=[("Tahun", "@Year"), ("Energi", "@{Total Energy Consumption (TWh)}{0.0}")]))
-    p.title.align = 'center'
-    st.bokeh_chart(p, use_container_width=True)
+    def build_energy_avg(energy_avg):
+        source = ColumnDataSource(energy_avg)
+        p = figure(title="Rata-Rata Konsumsi Energi Total Per Tahun", x_axis_label='Tahun', y_axis_label='Energi (TWh)', width=800, height=400, tools="pan,wheel_zoom,box_zoom,reset,hover,save")
+        p.line(x='Year', y='Total Energy Consumption (TWh)', source=source, line_width=2, color="navy")
+        p.circle(x='Year', y='Total Energy Consumption (TWh)', source=source, size=6, color="navy", alpha=0.6)
+        p.add_tools(HoverTool(tooltips=[("Tahun", "@Year"), ("Energi", "@{Total Energy Consumption (TWh)}{0.0}")]))
+        p.title.align = 'center'
+        return p
+    charts.add(st, ChartSpec("energy_avg", lambda: series("Total Energy Consumption (TWh)", "Year"), build_energy_avg))
 
     # 2. Top 10 negara konsumsi energi (Bokeh)
     st.subheader("10 Negara dengan Rata-Rata Konsumsi Energi Tertinggi")
-    country_avg = df.groupby("Country")["Total Energy Consumption (TWh)"].mean().reset_index()
-    top10 = country_avg.sort_values(by="Total Energy Consumption (TWh)", ascending=False).head(10)
-    top10["color"] = Category10[10]
-    source2 = ColumnDataSource(top10)
-    p2 = figure(x_range=top10["Country"], title="10 Negara dengan Rata-Rata Konsumsi Energi Tertinggi", x_axis_label='Negara', y_axis_label='Rata-rata Konsumsi Energi (TWh)', width=800, height=400, tools="pan,box_zoom,reset,hover,save")
-    p2.vbar(x='Country', top='Total Energy Consumption (TWh)', source=source2, width=0.6, fill_color='color')
-    p2.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi", "@{Total Energy Consumption (TWh)}{0.0}")]))
-    p2.xaxis.major_label_orientation = 1.0
-    p2.title.align = 'center'
-    p2.title.text_font_size = '14pt'
-    st.bokeh_chart(p2, use_container_width=True)
+    def build_top10(top10):
+        top10["color"] = Category10[10][:len(top10)]
+        source2 = ColumnDataSource(top10)
+        p2 = figure(x_range=top10["Country"].tolist(), title="10 Negara dengan Rata-Rata Konsumsi Energi Tertinggi", x_axis_label='Negara', y_axis_label='Rata-rata Konsumsi Energi (TWh)', width=800, height=400, tools="pan,box_zoom,reset,hover,save")
+        p2.vbar(x='Country', top='Total Energy Consumption (TWh)', source=source2, width=0.6, fill_color='color')
+        p2.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi", "@{Total Energy Consumption (TWh)}{0.0}")]))
+        p2.xaxis.major_label_orientation = 1.0
+        p2.title.align = 'center'
+        p2.title.text_font_size = '14pt'
+        return p2
+    charts.add(st, ChartSpec("top10_energy", lambda: top_countries("Total Energy Consumption (TWh)"), build_top10))
 
     # 3. Rata-rata emisi karbon per tahun (Bokeh)
     st.subheader("Rata-Rata Emisi Karbon Global Per Tahun")
-    emission_avg = df.groupby("Year")["Carbon Emissions (Million Tons)"].mean().reset_index()
-    source3 = ColumnDataSource(emission_avg)
-    p3 = figure(title="Rata-rata Emisi Karbon Global Per Tahun", x_axis_label='Tahun', y_axis_label='Emisi Karbon (Juta Ton)', width=800, height=400, tools="pan,box_zoom,reset,hover,save")
-    p3.line(x='Year', y='Carbon Emissions (Million Tons)', source=source3, line_width=2, color="firebrick")
-    p3.circle(x='Year', y='Carbon Emissions (Million Tons)', source=source3, size=6, color="firebrick", alpha=0.6)
-    p3.add_tools(HoverTool(tooltips=[("Tahun", "@Year"), ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0}")]))
-    p3.title.align = 'center'
-    st.bokeh_chart(p3, use_container_width=True)
+    # Dipakai tiga grafik; permintaan paralel yang identik digabung oleh layanan query
+    def emission_avg():
+        return series("Carbon Emissions (Million Tons)", "Year")
+    def build_emission_avg(emission_avg):
+        source3 = ColumnDataSource(emission_avg)
+        p3 = figure(title="Rata-rata Emisi Karbon Global Per Tahun", x_axis_label='Tahun', y_axis_label='Emisi Karbon (Juta Ton)', width=800, height=400, tools="pan,box_zoom,reset,hover,save")
+        p3.line(x='Year', y='Carbon Emissions (Million Tons)', source=source3, line_width=2, color="firebrick")
+        p3.circle(x='Year', y='Carbon Emissions (Million Tons)', source=source3, size=6, color="firebrick", alpha=0.6)
+        p3.add_tools(HoverTool(tooltips=[("Tahun", "@Year"), ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0}")]))
+        p3.title.align = 'center'
+        return p3
+    charts.add(st, ChartSpec("emission_avg", emission_avg, build_emission_avg))
 
     st.subheader("Animasi Tren Emisi Karbon Global Per Tahun")
-    st.info("Gunakan slider di bawah untuk melihat tren emisi karbon global dari waktu ke waktu.")
-    
-    # Slider untuk animasi tahun
-    animation_year = st.slider(
-        "Pilih Tahun untuk Animasi Emisi Karbon",
-        min_value=int(df['Year'].min()),
-        max_value=int(df['Year'].max()),
-        value=int(df['Year'].min()),
-        step=1
-    )
-
-    # Filter data hingga tahun yang dipilih untuk animasi
-    animated_emission_avg = emission_avg[emission_avg['Year'] <= animation_year]
-    source_animated = ColumnDataSource(animated_emission_avg)
-
-    p3_animated = figure(title=f"Tren Emisi Karbon Global Hingga Tahun {animation_year}", x_axis_label='Tahun', y_axis_label='Emisi Karbon (Juta Ton)', width=800, height=400, tools="pan,box_zoom,reset,hover,save")
-    p3_animated.line(x='Year', y='Carbon Emissions (Million Tons)', source=source_animated, line_width=2, color="firebrick")
-    p3_animated.circle(x='Year', y='Carbon Emissions (Million Tons)', source=source_animated, size=6, color="firebrick", alpha=0.6)
-    p3_animated.add_tools(HoverTool(tooltips=[("Tahun", "@Year"), ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0}")]))
-    p3_animated.title.align = 'center'
-    st.bokeh_chart(p3_animated, use_container_width=True)
+    st.info("Gunakan slider atau tombol Putar di bawah grafik untuk melihat tren emisi karbon global dari waktu ke waktu.")
+
+    # Animasi berjalan di browser: seluruh deret tahunan dikirim sekali, lalu
+    # slider/tombol Putar (CustomJS) memfilter data tanpa rerun ke server.
+    def build_emission_animated(emission_avg):
+        first_year = int(emission_avg['Year'].min()) if len(emission_avg) else selected_years[0]
+        last_year = int(emission_avg['Year'].max()) if len(emission_avg) else selected_years[1]
+        source_full = ColumnDataSource(emission_avg)
+        source_animated = ColumnDataSource(emission_avg[emission_avg['Year'] <= first_year])
+        p3_animated = figure(title=f"Tren Emisi Karbon Global Hingga Tahun {first_year}", x_axis_label='Tahun', y_axis_label='Emisi Karbon (Juta Ton)', width=800, height=400, tools="pan,box_zoom,reset,hover,save", x_range=(first_year - 0.5, last_year + 0.5))
+        p3_animated.line(x='Year', y='Carbon Emissions (Million Tons)', source=source_animated, line_width=2, color="firebrick")
+        p3_animated.circle(x='Year', y='Carbon Emissions (Million Tons)', source=source_animated, size=6, color="firebrick", alpha=0.6)
+        p3_animated.add_tools(HoverTool(tooltips=[("Tahun", "@Year"), ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0}")]))
+        p3_animated.title.align = 'center'
+
+        year_slider = Slider(start=first_year, end=max(last_year, first_year + 1), value=first_year, step=1, title="Pilih Tahun untuk Animasi Emisi Karbon")
+        year_slider.js_on_change('value', CustomJS(args=dict(full=source_full, shown=source_animated, plot=p3_animated), code="""
+            const year = cb_obj.value;
+            const keep = full.data['Year'].map((y) => y <= year);
+            const data = {};
+            for (const [col, values] of Object.entries(full.data)) {
+                data[col] = Array.from(values).filter((_, i) => keep[i]);
+            }
+            shown.data = data;
+            plot.title.text = 'Tren Emisi Karbon Global Hingga Tahun ' + year;
+        """))
+        play_button = Button(label="▶ Putar", width=100)
+        play_button.js_on_event('button_click', CustomJS(args=dict(slider=year_slider, button=play_button), code="""
+            if (button._timer) {
+                clearInterval(button._timer);
+                button._timer = null;
+                button.label = '▶ Putar';
+                return;
+            }
+            if (slider.value >= slider.end) {
+                slider.value = slider.start;
+            }
+            button.label = '❚❚ Jeda';
+            button._timer = setInterval(() => {
+                if (slider.value >= slider.end) {
+                    clearInterval(button._timer);
+                    button._timer = null;
+                    button.label = '▶ Putar';
+                    return;
+                }
+                slider.value = slider.value + 1;
+            }, 500);
+        """))
+        return column(p3_animated, row(year_slider, play_button, sizing_mode="stretch_width"), sizing_mode="stretch_width")
+    charts.add(st, ChartSpec("emission_animated", emission_avg, build_emission_animated))
 
     # 4. Top 10 negara energi terbarukan (horizontal bar, Bokeh)
     st.subheader("Top 10 Negara dengan Rata-Rata Proporsi Energi Terbarukan Tertinggi")
-    renew_avg = df.groupby("Country")["Renewable Energy Share (%)"].mean().reset_index()
-    top10_renew = renew_avg.sort_values(by="Renewable Energy Share (%)", ascending=False).head(10)
-    top10_renew["Color"] = Category10[10]
-    top10_renew = top10_renew.sort_values("Renewable Energy Share (%)")
-    source4 = ColumnDataSource(top10_renew)
-    p4 = figure(y_range=top10_renew["Country"], width=800, height=400, title="Top 10 Negara dengan Rata-Rata Proporsi Energi Terbarukan Tertinggi", x_axis_label='Proporsi Energi Terbarukan (%)', tools="pan,box_zoom,reset,hover,save")
-    p4.hbar(y='Country', right='Renewable Energy Share (%)', height=0.6, source=source4, fill_color='Color')
-    p4.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi Terbarukan", "@{Renewable Energy Share (%)}{0.0}%")]))
-    p4.title.align = 'center'
-    st.bokeh_chart(p4, use_container_width=True)
+    def build_top10_renew(top10_renew):
+        top10_renew["Color"] = Category10[10][:len(top10_renew)]
+        top10_renew = top10_renew.sort_values("Renewable Energy Share (%)")
+        source4 = ColumnDataSource(top10_renew)
+        p4 = figure(y_range=top10_renew["Country"].tolist(), width=800, height=400, title="Top 10 Negara dengan Rata-Rata Proporsi Energi Terbarukan Tertinggi", x_axis_label='Proporsi Energi Terbarukan (%)', tools="pan,box_zoom,reset,hover,save")
+        p4.hbar(y='Country', right='Renewable Energy Share (%)', height=0.6, source=source4, fill_color='Color')
+        p4.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi Terbarukan", "@{Renewable Energy Share (%)}{0.0}%")]))
+        p4.title.align = 'center'
+        return p4
+    charts.add(st, ChartSpec("top10_renew", lambda: top_countries("Renewable Energy Share (%)"), build_top10_renew))
 
     # 5. Area chart emisi karbon per tahun (Bokeh)
     st.subheader("Tren Rata-Rata Emisi Karbon Global Per Tahun")
-    carbon_avg = df.groupby("Year")["Carbon Emissions (Million Tons)"].mean().reset_index()
-    source5 = ColumnDataSource(carbon_avg)
-    p5 = figure(title="Tren Rata-Rata Emisi Karbon Global Per Tahun", x_axis_label="Tahun", y_axis_label="Emisi Karbon (Juta Ton)", width=800, height=400, tools="pan,box_zoom,reset,hover,save")
-    p5.varea(x='Year', y1=0, y2='Carbon Emissions (Million Tons)', source=source5, fill_color="firebrick", fill_alpha=0.5)
-    p5.line(x='Year', y='Carbon Emissions (Million Tons)', source=source5, line_width=2, color="firebrick")
-    p5.circle(x='Year', y='Carbon Emissions (Million Tons)', source=source5, size=6, color="firebrick")
-    p5.add_tools(HoverTool(tooltips=[("Tahun", "@Year"), ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0}")]))
-    p5.title.align = 'center'
-    st.bokeh_chart(p5, use_container_width=True)
+    def build_carbon_area(carbon_avg):
+        source5 = ColumnDataSource(carbon_avg)
+        p5 = figure(title="Tren Rata-Rata Emisi Karbon Global Per Tahun", x_axis_label="Tahun", y_axis_label="Emisi Karbon (Juta Ton)", width=800, height=400, tools="pan,box_zoom,reset,hover,save")
+        p5.varea(x='Year', y1=0, y2='Carbon Emissions (Million Tons)', source=source5, fill_color="firebrick", fill_alpha=0.5)
+        p5.line(x='Year', y='Carbon Emissions (Million Tons)', source=source5, line_width=2, color="firebrick")
+        p5.circle(x='Year', y='Carbon Emissions (Million Tons)', source=source5, size=6, color="firebrick")
+        p5.add_tools(HoverTool(tooltips=[("Tahun", "@Year"), ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0}")]))
+        p5.title.align = 'center'
+        return p5
+    charts.add(st, ChartSpec("carbon_area", emission_avg, build_carbon_area))
 
     # 6. Donut chart komposisi energi global (Bokeh)
     st.subheader("Komposisi Rata-Rata Sumber Energi Global")
-    renew = df["Renewable Energy Share (%)"].mean()
-    fossil = df["Fossil Fuel Dependency (%)"].mean()
-    other = 100 - (renew + fossil)
-    data = pd.Series({'Energi Terbarukan': renew, 'Bahan Bakar Fosil': fossil, 'Lainnya': other}).reset_index(name='value').rename(columns={'index': 'sumber'})
-    data['angle'] = data['value'] / data['value'].sum() * 2 * pi
-    data['color'] = Category20c[len(data)]
-    source6 = ColumnDataSource(data)
-    p6 = figure(height=400, width=400, title="Komposisi Rata-Rata Sumber Energi Global", toolbar_location=None, tools="hover", tooltips="@sumber: @value{0.2f}%", x_range=(-0.5, 1.0))
-    p6.wedge(x=0, y=1, radius=0.4, start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'), line_color="white", fill_color='color', legend_field='sumber', source=source6)
-    p6.annular_wedge(x=0, y=1, inner_radius=0.2, outer_radius=0.4, start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'), fill_color='color', line_color="white", source=source6)
-    p6.axis.visible = False
-    p6.grid.visible = False
-    p6.title.align = 'center'
-    st.bokeh_chart(p6, use_container_width=False)
+    def prepare_donut():
+        renew = series("Renewable Energy Share (%)")
+        fossil = series("Fossil Fuel Dependency (%)")
+        other = 100 - (renew + fossil)
+        data = pd.Series({'Energi Terbarukan': renew, 'Bahan Bakar Fosil': fossil, 'Lainnya': other}).reset_index(name='value').rename(columns={'index': 'sumber'})
+        data['angle'] = data['value'] / data['value'].sum() * 2 * pi
+        data['color'] = Category20c[len(data)]
+        return data
+    def build_donut(data):
+        source6 = ColumnDataSource(data)
+        p6 = figure(height=400, width=400, title="Komposisi Rata-Rata Sumber Energi Global", toolbar_location=None, tools="hover", tooltips="@sumber: @value{0.2f}%", x_range=(-0.5, 1.0))
+        p6.wedge(x=0, y=1, radius=0.4, start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'), line_color="white", fill_color='color', legend_field='sumber', source=source6)
+        p6.annular_wedge(x=0, y=1, inner_radius=0.2, outer_radius=0.4, start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'), fill_color='color', line_color="white", source=source6)
+        p6.axis.visible = False
+        p6.grid.visible = False
+        p6.title.align = 'center'
+        return p6
+    charts.add(st, ChartSpec("donut", prepare_donut, build_donut, use_container_width=False))
 
     # 7. Heatmap korelasi fitur (Bokeh)
     st.subheader("Heatmap Korelasi Antar Fitur Energi")
@@ -281,193 +591,264 @@ elif menu == "Visualisasi Interaktif":
         "Carbon Emissions (Million Tons)",
         "Energy Price Index (USD/kWh)"
     ]
-    corr_matrix = df[features].corr().round(2)
-    corr_df = corr_matrix.stack().reset_index()
-    corr_df.columns = ["Feature_X", "Feature_Y", "Correlation"]
-    source7 = ColumnDataSource(corr_df)
-    mapper = LinearColorMapper(palette=Viridis256, low=-1, high=1)
-    p7 = figure(title="Heatmap Korelasi Antar Fitur Energi", x_range=features, y_range=list(reversed(features)), x_axis_location="above", width=800, height=600, tools="hover,save", tooltips=[('X', '@Feature_X'), ('Y', '@Feature_Y'), ('Korelasi', '@Correlation')])
-    p7.rect(x="Feature_X", y="Feature_Y", width=1, height=1, source=source7, fill_color=linear_cmap('Correlation', Viridis256, -1, 1), line_color=None)
-    color_bar = ColorBar(color_mapper=mapper, ticker=BasicTicker(desired_num_ticks=10), formatter=PrintfTickFormatter(format="%.2f"), label_standoff=12, border_line_color=None, location=(0, 0))
-    p7.add_layout(color_bar, 'right')
-    p7.xaxis.major_label_orientation = np.pi / 4
-    p7.title.align = 'center'
-    st.bokeh_chart(p7, use_container_width=True)
+    corr_cube = load_corr_cube(df_full, dataset_key)
+    def prepare_corr():
+        corr_matrix = corr_cube.corr(selected_years, selected_countries, columns=features).round(2)
+        corr_df = corr_matrix.stack().reset_index()
+        corr_df.columns = ["Feature_X", "Feature_Y", "Correlation"]
+        return corr_df
+    def build_corr(corr_df):
+        source7 = ColumnDataSource(corr_df)
+        mapper = LinearColorMapper(palette=Viridis256, low=-1, high=1)
+        p7 = figure(title="Heatmap Korelasi Antar Fitur Energi", x_range=features, y_range=list(reversed(features)), x_axis_location="above", width=800, height=600, tools="hover,save", tooltips=[('X', '@Feature_X'), ('Y', '@Feature_Y'), ('Korelasi', '@Correlation')])
+        p7.rect(x="Feature_X", y="Feature_Y", width=1, height=1, source=source7, fill_color=linear_cmap('Correlation', Viridis256, -1, 1), line_color=None)
+        color_bar = ColorBar(color_mapper=mapper, ticker=BasicTicker(desired_num_ticks=10), formatter=PrintfTickFormatter(format="%.2f"), label_standoff=12, border_line_color=None, location=(0, 0))
+        p7.add_layout(color_bar, 'right')
+        p7.xaxis.major_label_orientation = np.pi / 4
+        p7.title.align = 'center'
+        return p7
+    charts.add(st, ChartSpec("corr_heatmap", prepare_corr, build_corr))
 
     # 8. Scatter plot emisi karbon vs energi terbarukan (top 10 negara, Bokeh)
     st.subheader("Scatter Plot: Emisi Karbon vs Energi Terbarukan (Top 10 Negara)")
-    top10_emission = df.groupby("Country")["Carbon Emissions (Million Tons)"].mean().reset_index().sort_values(by="Carbon Emissions (Million Tons)", ascending=False).head(10)
-    df_top10 = df[df["Country"].isin(top10_emission["Country"])]
-    avg_top10 = df_top10.groupby("Country")[["Carbon Emissions (Million Tons)", "Renewable Energy Share (%)"]].mean().reset_index()
-    source8 = ColumnDataSource(avg_top10)
-    p8 = figure(title="Scatter Plot: Emisi Karbon vs Energi Terbarukan (Top 10 Negara)", x_axis_label="Proporsi Energi Terbarukan (%)", y_axis_label="Emisi Karbon (Juta Ton)", width=850, height=500, tools="pan,box_zoom,reset,hover,save")
-    p8.circle(x='Renewable Energy Share (%)', y='Carbon Emissions (Million Tons)', size=10, source=source8, fill_color=factor_cmap('Country', palette=Category10[10], factors=avg_top10["Country"].tolist()), line_color="black", fill_alpha=0.7, legend_field="Country")
-    p8.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi Terbarukan", "@{Renewable Energy Share (%)}{0.0}%"), ("Emisi Karbon", "@{Carbon Emissions (Million Tons)}{0.0} Juta Ton")]))
-    p8.legend.location = "top_right"
-    p8.legend.title = "Negara"
-    p8.legend.click_policy = "hide"
-    p8.title.align = 'center'
-    st.bokeh_chart(p8, use_container_width=True)
+    # Rata-rata energi terbarukan ikut dibaca dari indeks untuk 10 negara yang sama
+    def prepare_top10_scatter():
+        return top_countries("Carbon Emissions (Million Tons)", columns=["Renewable Energy Share (%)"])
+    def build_top10_scatter(avg_top10):
+        source8 = ColumnDataSource(avg_top10)
+        p8 = figure(title="Scatter Plot: Emisi Karbon vs Energi Terbarukan (Top 10 Negara)", x_axis_label="Proporsi Energi Terbarukan (%)", y_axis_label="Emisi Karbon (Juta Ton)", width=850, height=500, tools="pan,box_zoom,reset,hover,save")
+        p8.circle(x='Renewable Energy Share (%)', y='Carbon Emissions (Million Tons)', size=10, source=source8, fill_color=factor_cmap('Country', palette=Category10[10], factors=avg_top10["Country"].tolist()), line_color="black", fill_alpha=0.7, legend_field="Country")
+        p8.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi Terbarukan", "@{Renewable Energy Share (%)}{0.0}%"), ("Emisi Karbon", "@{Carbon Emissions (Million Tons)}{0.0} Juta Ton")]))
+        p8.legend.location = "top_right"
+        p8.legend.title = "Negara"
+        p8.legend.click_policy = "hide"
+        p8.title.align = 'center'
+        return p8
+    charts.add(st, ChartSpec("top10_scatter", prepare_top10_scatter, build_top10_scatter))
+
+    # 9. Deret data mentah per negara (level-of-detail)
+    st.subheader("Deret Data Mentah Per Negara")
+    st.info("""
+    Grafik ini menampilkan seluruh observasi mentah satu negara untuk fitur yang dipilih. Untuk data besar, titik-titik diringkas dengan LTTB sehingga bentuk deret tetap terjaga; saat grafik diperbesar, detail pada rentang yang terlihat dihitung ulang langsung di browser.
+    """)
+    col_negara, col_fitur = st.columns(2)
+    negara_deret = col_negara.selectbox("Pilih Negara", selected_countries or all_countries, key="deret_negara")
+    fitur_deret = col_fitur.selectbox("Pilih Fitur", full_cube.features, key="deret_fitur")
+    def prepare_raw_series():
+        rows = filter_view(df_full, selected_years, [negara_deret])
+        return line_levels(rows["Year"].to_numpy(), rows[fitur_deret].to_numpy())
+    def build_raw_series(levels):
+        fine_x, fine_y, shown_x, shown_y = levels
+        fine = ColumnDataSource({"x": fine_x, "y": fine_y})
+        shown = ColumnDataSource({"x": shown_x, "y": shown_y})
+        x_start, x_end = (fine_x[0], fine_x[-1]) if len(fine_x) else selected_years
+        p_deret = figure(title=f"{fitur_deret} - {negara_deret}", x_axis_label="Tahun", y_axis_label=fitur_deret, width=850, height=400, tools="pan,wheel_zoom,box_zoom,reset,save", x_range=Range1d(x_start - 0.5, x_end + 0.5))
+        p_deret.line(x="x", y="y", source=shown, line_width=1, color="navy", alpha=0.8)
+        p_deret.add_tools(HoverTool(tooltips=[("Tahun", "@x{0}"), ("Nilai", "@y{0.00}")]))
+        p_deret.x_range.js_on_change("start", CustomJS(args=dict(fine=fine, shown=shown, xr=p_deret.x_range, n_out=DISPLAY_POINTS), code=LTTB_JS))
+        p_deret.title.align = 'center'
+        return p_deret
+    charts.add(st, ChartSpec("raw_series", prepare_raw_series, build_raw_series, params=(negara_deret, fitur_deret)))
+
+    # 10. Peringkat negara untuk metrik dan jumlah negara pilihan pengguna
+    st.subheader("Peringkat Negara Berdasarkan Metrik Pilihan")
+    col_metrik, col_n, col_urutan = st.columns([2, 2, 1])
+    metrik_peringkat = col_metrik.selectbox("Pilih Metrik", full_cube.features, key="peringkat_metrik")
+    n_peringkat = col_n.slider("Jumlah Negara", min_value=5, max_value=50, value=15, step=5, key="peringkat_n")
+    urutan_peringkat = col_urutan.radio("Urutan", ["Tertinggi", "Terendah"], key="peringkat_urutan")
+    def build_ranking(ranked):
+        ranked = ranked.iloc[::-1]
+        source_rank = ColumnDataSource(ranked)
+        p_rank = figure(y_range=ranked["Country"].tolist(), title=f"{n_peringkat} Negara dengan Rata-Rata {metrik_peringkat} {urutan_peringkat}", x_axis_label=metrik_peringkat, width=850, height=max(300, 22 * len(ranked) + 100), tools="pan,box_zoom,reset,hover,save")
+        p_rank.hbar(y='Country', right=metrik_peringkat, height=0.6, source=source_rank, fill_color="steelblue")
+        p_rank.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Nilai", f"@{{{metrik_peringkat}}}{{0.00}}")]))
+        p_rank.title.align = 'center'
+        return p_rank
+    charts.add(st, ChartSpec("ranking", lambda: top_countries(metrik_peringkat, n_peringkat, urutan_peringkat == "Terendah"), build_ranking, params=(metrik_peringkat, n_peringkat, urutan_peringkat)))
+
+    profiler.checkpoint("Persiapan halaman")
+    charts.render()
 
 elif menu == "Analisis Clustering (AI)":
     st.header("Analisis Clustering (AI)")
     st.markdown("""
     Web ini menampilkan analisis konsumsi energi global berbasis AI (Agglomerative Clustering). Negara-negara dikelompokkan berdasarkan pola konsumsi energi, proporsi energi terbarukan, ketergantungan bahan bakar fosil, dan emisi karbon. Setiap visualisasi membantu memahami perbedaan karakteristik energi antar klaster, mendukung pengambilan kebijakan energi yang lebih tepat.
     """)
+    if clustering_result is not None:
+        st.caption(f"Klaster dihitung ulang dengan {MODES[clustering_result.mode]} (k={clustering_result.k}) pada {len(df_agglo_full):,} baris. Silhouette score (estimasi sampel): {clustering_result.silhouette:.3f}")
+    charts = ChartPipeline(get_chart_executor(), get_chart_cache(), chart_context)
+    profile = load_cluster_profiles(df_agglo_full, agglo_key).view(selected_years, selected_countries)
+    clusters = profile.clusters
+    cluster_ranking = load_ranking(df_agglo_full, agglo_key, "Cluster")
+    colors = Category10[10][:len(clusters)]
+
+    # Ringkasan profil klaster untuk filter aktif
+    st.subheader("Profil Klaster")
+    st.dataframe(profile.means.round(2), hide_index=True)
+    with st.expander("Kuartil fitur per klaster"):
+        st.dataframe(profile.quantiles.round(2), hide_index=True)
+
     # 1. Rata-rata konsumsi energi per tahun berdasarkan klaster
     st.subheader("Rata-Rata Konsumsi Energi Tahunan Berdasarkan Klaster (AI)")
     st.info("""
     Visualisasi ini menunjukkan tren konsumsi energi tahunan rata-rata dari tiap klaster hasil Agglomerative Clustering. Garis berwarna mewakili masing-masing klaster, memperlihatkan perbedaan pola konsumsi energi antar kelompok negara. Beberapa klaster mengalami kenaikan signifikan, sementara lainnya cenderung stabil. Klasterisasi membantu mengidentifikasi pola ini untuk mendukung kebijakan energi yang lebih terarah.
     """)
-    df_agglo["Cluster"] = df_agglo["Cluster"].astype(str)
-    energy_by_year_cluster = df_agglo.groupby(["Year", "Cluster"])["Total Energy Consumption (TWh)"].mean().reset_index()
-    energy_by_year_cluster["Year"] = energy_by_year_cluster["Year"].astype(int)
-    clusters = sorted(df_agglo["Cluster"].unique())
-    colors = Category10[len(clusters)]
-    p9 = figure(title="Rata-rata Konsumsi Energi Tahunan Berdasarkan Klaster (AI)", x_axis_label="Tahun", y_axis_label="Energi (TWh)", width=850, height=450, tools="pan,box_zoom,reset,hover,save")
-    for i, cluster in enumerate(clusters):
-        cluster_data = energy_by_year_cluster[energy_by_year_cluster["Cluster"] == cluster]
-        source = ColumnDataSource(cluster_data)
-        p9.line(x='Year', y='Total Energy Consumption (TWh)', source=source, line_width=2, color=colors[i], legend_label=f"Cluster {cluster}")
-        p9.circle(x='Year', y='Total Energy Consumption (TWh)', source=source, size=5, color=colors[i], fill_alpha=0.7)
-    hover = HoverTool(tooltips=[("Tahun", "@Year"), ("Klaster", "@Cluster"), ("Energi", "@{Total Energy Consumption (TWh)}{0.0} TWh")])
-    p9.add_tools(hover)
-    p9.legend.title = "Klaster AI"
-    p9.legend.location = "top_left"
-    p9.legend.click_policy = "hide"
-    p9.title.align = 'center'
-    st.bokeh_chart(p9, use_container_width=True)
+    def build_energy_by_cluster(energy_by_year_cluster):
+        energy_by_year_cluster["Year"] = energy_by_year_cluster["Year"].astype(int)
+        p9 = figure(title="Rata-rata Konsumsi Energi Tahunan Berdasarkan Klaster (AI)", x_axis_label="Tahun", y_axis_label="Energi (TWh)", width=850, height=450, tools="pan,box_zoom,reset,hover,save")
+        for i, cluster in enumerate(clusters):
+            cluster_data = energy_by_year_cluster[energy_by_year_cluster["Cluster"] == cluster]
+            source = ColumnDataSource(cluster_data)
+            p9.line(x='Year', y='Total Energy Consumption (TWh)', source=source, line_width=2, color=colors[i], legend_label=f"Cluster {cluster}")
+            p9.circle(x='Year', y='Total Energy Consumption (TWh)', source=source, size=5, color=colors[i], fill_alpha=0.7)
+        hover = HoverTool(tooltips=[("Tahun", "@Year"), ("Klaster", "@Cluster"), ("Energi", "@{Total Energy Consumption (TWh)}{0.0} TWh")])
+        p9.add_tools(hover)
+        p9.legend.title = "Klaster AI"
+        p9.legend.location = "top_left"
+        p9.legend.click_policy = "hide"
+        p9.title.align = 'center'
+        return p9
+    charts.add(st, ChartSpec("cluster_energy", lambda: profile.year_series("Total Energy Consumption (TWh)"), build_energy_by_cluster))
 
     # 2. Top 10 negara konsumsi energi berdasarkan klaster
     st.subheader("Top 10 Negara dengan Konsumsi Energi Tertinggi Berdasarkan Klaster AI")
     st.info("""
     Visualisasi ini menampilkan 10 negara dengan konsumsi energi tertinggi dan klaster AI tempat mereka tergolong. Setiap batang warna mewakili klaster hasil dari model Agglomerative Clustering. Klaster membantu mengelompokkan negara berdasarkan karakteristik seperti konsumsi per kapita, ketergantungan bahan bakar fosil, dan emisi karbon. Dengan ini, kita dapat melihat bahwa negara-negara dengan konsumsi energi tinggi tidak selalu berada di klaster yang sama — menunjukkan adanya perbedaan signifikan dalam pola penggunaan energi.
     """)
-    country_avg_ai = df_agglo.groupby(["Country", "Cluster"])["Total Energy Consumption (TWh)"].mean().reset_index()
-    top10_ai = country_avg_ai.sort_values(by="Total Energy Consumption (TWh)", ascending=False).head(10)
-    cluster_colors = {str(i): Category10[3][i] for i in range(3)}
-    top10_ai["color"] = top10_ai["Cluster"].map(cluster_colors)
-    source10 = ColumnDataSource(top10_ai)
-    p10 = figure(x_range=top10_ai["Country"], title="Top 10 Negara dengan Konsumsi Energi Tertinggi Berdasarkan Klaster AI", x_axis_label='Negara', y_axis_label='Rata-rata Konsumsi Energi (TWh)', width=850, height=400, tools="pan,box_zoom,reset,hover,save")
-    p10.vbar(x='Country', top='Total Energy Consumption (TWh)', source=source10, width=0.6, fill_color='color', legend_field='Cluster')
-    p10.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi", "@{Total Energy Consumption (TWh)}{0.0} TWh"), ("Klaster", "@Cluster")]))
-    p10.xaxis.major_label_orientation = 1.0
-    p10.title.align = 'center'
-    p10.title.text_font_size = '14pt'
-    p10.legend.title = "Klaster AI"
-    p10.legend.location = "top_right"
-    p10.legend.click_policy = "hide"
-    st.bokeh_chart(p10, use_container_width=True)
+    def build_top10_cluster(top10_ai):
+        cluster_colors = {str(i): Category10[10][i] for i in range(10)}
+        top10_ai["color"] = top10_ai["Cluster"].map(cluster_colors)
+        # Negara yang barisnya terbagi ke beberapa klaster muncul lebih dari sekali
+        top10_ai["Label"] = top10_ai["Country"]
+        if top10_ai["Country"].duplicated().any():
+            top10_ai["Label"] = top10_ai["Country"] + " (Klaster " + top10_ai["Cluster"] + ")"
+        source10 = ColumnDataSource(top10_ai)
+        p10 = figure(x_range=top10_ai["Label"].tolist(), title="Top 10 Negara dengan Konsumsi Energi Tertinggi Berdasarkan Klaster AI", x_axis_label='Negara', y_axis_label='Rata-rata Konsumsi Energi (TWh)', width=850, height=400, tools="pan,box_zoom,reset,hover,save")
+        p10.vbar(x='Label', top='Total Energy Consumption (TWh)', source=source10, width=0.6, fill_color='color', legend_field='Cluster')
+        p10.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi", "@{Total Energy Consumption (TWh)}{0.0} TWh"), ("Klaster", "@Cluster")]))
+        p10.xaxis.major_label_orientation = 1.0
+        p10.title.align = 'center'
+        p10.title.text_font_size = '14pt'
+        p10.legend.title = "Klaster AI"
+        p10.legend.location = "top_right"
+        p10.legend.click_policy = "hide"
+        return p10
+    charts.add(st, ChartSpec("cluster_top10", lambda: cluster_ranking.top("Total Energy Consumption (TWh)", 10, selected_years, selected_countries), build_top10_cluster))
 
     # 3. Rata-rata emisi karbon per tahun berdasarkan klaster
     st.subheader("Rata-Rata Emisi Karbon Per Tahun Berdasarkan Klaster AI")
     st.info("""
     Visualisasi ini menampilkan tren rata-rata emisi karbon global per tahun untuk masing-masing klaster hasil model AI. Klaster yang cenderung memiliki emisi lebih tinggi menunjukkan karakteristik negara dengan konsumsi energi fosil dominan. Sebaliknya, klaster dengan tren penurunan atau emisi rendah dapat diindikasikan sebagai negara-negara yang mulai transisi ke energi bersih atau efisiensi tinggi. Tren ini membantu memahami peran klaster dalam kontribusi terhadap emisi karbon global dari waktu ke waktu.
     """)
-    emission_by_year_cluster = df_agglo.groupby(["Year", "Cluster"])["Carbon Emissions (Million Tons)"].mean().reset_index()
-    p11 = figure(title="Rata-Rata Emisi Karbon Per Tahun Berdasarkan Klaster AI", x_axis_label="Tahun", y_axis_label="Emisi Karbon (Juta Ton)", width=850, height=450, tools="pan,box_zoom,reset,hover,save")
-    for i, cluster in enumerate(clusters):
-        cluster_data = emission_by_year_cluster[emission_by_year_cluster["Cluster"] == cluster]
-        source = ColumnDataSource(cluster_data)
-        p11.line(x='Year', y='Carbon Emissions (Million Tons)', source=source, line_width=2, color=colors[i], legend_label=f"Cluster {cluster}")
-        p11.circle(x='Year', y='Carbon Emissions (Million Tons)', source=source, size=5, color=colors[i], fill_alpha=0.7)
-    hover2 = HoverTool(tooltips=[("Tahun", "@Year"), ("Klaster", "@Cluster"), ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0} Juta Ton")])
-    p11.add_tools(hover2)
-    p11.legend.title = "Klaster AI"
-    p11.legend.location = "top_left"
-    p11.legend.click_policy = "hide"
-    p11.title.align = 'center'
-    p11.title.text_font_size = '14pt'
-    st.bokeh_chart(p11, use_container_width=True)
+    def build_emission_by_cluster(emission_by_year_cluster):
+        p11 = figure(title="Rata-Rata Emisi Karbon Per Tahun Berdasarkan Klaster AI", x_axis_label="Tahun", y_axis_label="Emisi Karbon (Juta Ton)", width=850, height=450, tools="pan,box_zoom,reset,hover,save")
+        for i, cluster in enumerate(clusters):
+            cluster_data = emission_by_year_cluster[emission_by_year_cluster["Cluster"] == cluster]
+            source = ColumnDataSource(cluster_data)
+            p11.line(x='Year', y='Carbon Emissions (Million Tons)', source=source, line_width=2, color=colors[i], legend_label=f"Cluster {cluster}")
+            p11.circle(x='Year', y='Carbon Emissions (Million Tons)', source=source, size=5, color=colors[i], fill_alpha=0.7)
+        hover2 = HoverTool(tooltips=[("Tahun", "@Year"), ("Klaster", "@Cluster"), ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0} Juta Ton")])
+        p11.add_tools(hover2)
+        p11.legend.title = "Klaster AI"
+        p11.legend.location = "top_left"
+        p11.legend.click_policy = "hide"
+        p11.title.align = 'center'
+        p11.title.text_font_size = '14pt'
+        return p11
+    charts.add(st, ChartSpec("cluster_emission", lambda: profile.year_series("Carbon Emissions (Million Tons)"), build_emission_by_cluster))
 
     # 4. Bar chart proporsi energi terbarukan per klaster
     st.subheader("Rata-Rata Proporsi Energi Terbarukan Per Klaster (AI)")
     st.info("""
     Grafik ini menggambarkan rata-rata proporsi energi terbarukan pada setiap klaster hasil model AI. Klaster dengan proporsi tertinggi mengindikasikan negara-negara yang telah beralih ke energi terbarukan dalam skala besar, sementara klaster dengan nilai lebih rendah mungkin masih bergantung pada energi fosil. Dengan pendekatan ini, kita dapat membandingkan tingkat adopsi energi terbarukan antar kelompok negara secara sistematis.
     """)
-    renew_per_cluster = df_agglo.groupby("Cluster")["Renewable Energy Share (%)"].mean().reset_index()
-    renew_per_cluster["Color"] = Category10[len(renew_per_cluster)]
-    source_bar = ColumnDataSource(renew_per_cluster)
-    p_bar = figure(y_range=renew_per_cluster["Cluster"].astype(str), width=700, height=400, title="Rata-Rata Proporsi Energi Terbarukan per Klaster (AI)", x_axis_label='Proporsi Energi Terbarukan (%)', tools="pan,box_zoom,reset,hover,save")
-    p_bar.hbar(y='Cluster', right='Renewable Energy Share (%)', height=0.5, source=source_bar, fill_color='Color')
-    p_bar.add_tools(HoverTool(tooltips=[("Klaster", "@Cluster"), ("Proporsi Terbarukan", "@{Renewable Energy Share (%)}{0.0}%")]))
-    p_bar.title.align = 'center'
-    st.bokeh_chart(p_bar, use_container_width=True)
+    def build_renew_by_cluster(renew_per_cluster):
+        renew_per_cluster["Color"] = Category10[10][:len(renew_per_cluster)]
+        source_bar = ColumnDataSource(renew_per_cluster)
+        p_bar = figure(y_range=renew_per_cluster["Cluster"].astype(str).tolist(), width=700, height=400, title="Rata-Rata Proporsi Energi Terbarukan per Klaster (AI)", x_axis_label='Proporsi Energi Terbarukan (%)', tools="pan,box_zoom,reset,hover,save")
+        p_bar.hbar(y='Cluster', right='Renewable Energy Share (%)', height=0.5, source=source_bar, fill_color='Color')
+        p_bar.add_tools(HoverTool(tooltips=[("Klaster", "@Cluster"), ("Proporsi Terbarukan", "@{Renewable Energy Share (%)}{0.0}%")]))
+        p_bar.title.align = 'center'
+        return p_bar
+    charts.add(st, ChartSpec("cluster_renew", lambda: profile.cluster_means("Renewable Energy Share (%)"), build_renew_by_cluster))
 
     # 5. Area chart tren emisi karbon per tahun untuk klaster yang dipilih
     st.subheader("Area Chart: Rata-Rata Emisi Karbon Global Per Tahun Berdasarkan Klaster (AI)")
     st.info("""
     Grafik area ini menampilkan rata-rata emisi karbon global dari tahun ke tahun berdasarkan hasil pengelompokan klaster AI. Setiap klaster menunjukkan tren emisi karbon yang berbeda. Beberapa klaster cenderung stabil, sedangkan yang lain mengalami peningkatan atau penurunan drastis. Perbedaan ini mengindikasikan adanya karakteristik unik dalam konsumsi energi dan kebijakan lingkungan di masing-masing kelompok negara.
     """)
-    clusters_area = sorted(df_agglo["Cluster"].unique())
-    cluster_selected = st.selectbox("Pilih Klaster untuk Area Chart", clusters_area, key="area_chart_cluster")
-    carbon_cluster = df_agglo[df_agglo["Cluster"] == cluster_selected].groupby(["Year", "Cluster"])["Carbon Emissions (Million Tons)"].mean().reset_index()
-    color_area = Category10[len(clusters_area)][clusters_area.index(cluster_selected)]
-    p_area_selected = figure(
-        title=f"Rata-Rata Emisi Karbon Global Per Tahun - Klaster {cluster_selected}",
-        x_axis_label="Tahun",
-        y_axis_label="Emisi Karbon (Juta Ton)",
-        width=850,
-        height=450,
-        tools="pan,box_zoom,reset,hover,save"
-    )
-    source = ColumnDataSource(carbon_cluster)
-    p_area_selected.varea(
-        x='Year',
-        y1=0,
-        y2='Carbon Emissions (Million Tons)',
-        source=source,
-        fill_color=color_area,
-        fill_alpha=0.3,
-        legend_label=f"Cluster {cluster_selected}"
-    )
-    p_area_selected.line(
-        x='Year',
-        y='Carbon Emissions (Million Tons)',
-        source=source,
-        line_width=2,
-        color=color_area
-    )
-    p_area_selected.add_tools(HoverTool(tooltips=[
-        ("Tahun", "@Year"),
-        ("Klaster", "@Cluster"),
-        ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0} Juta Ton")
-    ]))
-    p_area_selected.legend.title = "Klaster AI"
-    p_area_selected.legend.location = "top_left"
-    p_area_selected.legend.click_policy = "hide"
-    p_area_selected.title.align = 'center'
-    st.bokeh_chart(p_area_selected, use_container_width=True)
+    cluster_selected = st.selectbox("Pilih Klaster untuk Area Chart", clusters, key="area_chart_cluster")
+    def build_area_cluster(carbon_cluster):
+        color_area = Category10[10][clusters.index(cluster_selected)]
+        p_area_selected = figure(
+            title=f"Rata-Rata Emisi Karbon Global Per Tahun - Klaster {cluster_selected}",
+            x_axis_label="Tahun",
+            y_axis_label="Emisi Karbon (Juta Ton)",
+            width=850,
+            height=450,
+            tools="pan,box_zoom,reset,hover,save"
+        )
+        source = ColumnDataSource(carbon_cluster)
+        p_area_selected.varea(
+            x='Year',
+            y1=0,
+            y2='Carbon Emissions (Million Tons)',
+            source=source,
+            fill_color=color_area,
+            fill_alpha=0.3,
+            legend_label=f"Cluster {cluster_selected}"
+        )
+        p_area_selected.line(
+            x='Year',
+            y='Carbon Emissions (Million Tons)',
+            source=source,
+            line_width=2,
+            color=color_area
+        )
+        p_area_selected.add_tools(HoverTool(tooltips=[
+            ("Tahun", "@Year"),
+            ("Klaster", "@Cluster"),
+            ("Emisi", "@{Carbon Emissions (Million Tons)}{0.0} Juta Ton")
+        ]))
+        p_area_selected.legend.title = "Klaster AI"
+        p_area_selected.legend.location = "top_left"
+        p_area_selected.legend.click_policy = "hide"
+        p_area_selected.title.align = 'center'
+        return p_area_selected
+    charts.add(st, ChartSpec("cluster_area", lambda: profile.year_series("Carbon Emissions (Million Tons)", cluster_selected), build_area_cluster, params=(cluster_selected,)))
 
     # 6. Donut chart komposisi energi per klaster (interaktif)
     st.subheader("Komposisi Sumber Energi Per Klaster (AI)")
     st.info("""
     Visualisasi ini menunjukkan bagaimana komposisi rata-rata sumber energi (terbarukan, fosil, lainnya) berbeda-beda di setiap klaster hasil model AI. Klaster dengan dominasi energi terbarukan menunjukkan proporsi energi ramah lingkungan yang lebih besar dan kemungkinan strategi energi berkelanjutan. Klaster dengan dominasi bahan bakar fosil umumnya menghasilkan emisi karbon lebih tinggi. Perbedaan ini mencerminkan keberagaman strategi dan kemampuan negara-negara dalam transisi energi.
     """)
-    klaster_pilihan = st.selectbox("Pilih Klaster untuk Pie Chart", sorted(df_agglo["Cluster"].unique()), key="donut_klaster")
-    df_klaster = df_agglo[df_agglo["Cluster"] == klaster_pilihan]
-    renew = df_klaster["Renewable Energy Share (%)"].mean()
-    fossil = df_klaster["Fossil Fuel Dependency (%)"].mean()
-    other = 100 - (renew + fossil)
-    data = pd.Series({'Energi Terbarukan': renew, 'Bahan Bakar Fosil': fossil, 'Lainnya': other}).reset_index(name='value').rename(columns={'index': 'sumber'})
-    data['angle'] = data['value'] / data['value'].sum() * 2 * pi
-    data['color'] = Category20c[len(data)]
-    source_donut = ColumnDataSource(data)
-    p_donut = figure(height=600, width=400, title=f"Komposisi Sumber Energi - Klaster {klaster_pilihan}", toolbar_location=None, tools="hover", tooltips="@sumber: @value{0.2f}%", x_range=(-0.5, 1.0))
-    p_donut.wedge(x=0, y=1, radius=0.4, start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'), line_color="white", fill_color='color', legend_field='sumber', source=source_donut)
-    p_donut.annular_wedge(x=0, y=1, inner_radius=0.2, outer_radius=0.4, start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'), fill_color='color', line_color="white", source=source_donut)
-    p_donut.axis.visible = False
-    p_donut.grid.visible = False
-    p_donut.title.align = 'center'
-    st.bokeh_chart(p_donut)
+    klaster_pilihan = st.selectbox("Pilih Klaster untuk Pie Chart", clusters, key="donut_klaster")
+    def prepare_donut_cluster():
+        donut_means = profile.cluster_row(klaster_pilihan)
+        renew = donut_means["Renewable Energy Share (%)"]
+        fossil = donut_means["Fossil Fuel Dependency (%)"]
+        other = 100 - (renew + fossil)
+        data = pd.Series({'Energi Terbarukan': renew, 'Bahan Bakar Fosil': fossil, 'Lainnya': other}).reset_index(name='value').rename(columns={'index': 'sumber'})
+        data['angle'] = data['value'] / data['value'].sum() * 2 * pi
+        data['color'] = Category20c[len(data)]
+        return data
+    def build_donut_cluster(data):
+        source_donut = ColumnDataSource(data)
+        p_donut = figure(height=600, width=400, title=f"Komposisi Sumber Energi - Klaster {klaster_pilihan}", toolbar_location=None, tools="hover", tooltips="@sumber: @value{0.2f}%", x_range=(-0.5, 1.0))
+        p_donut.wedge(x=0, y=1, radius=0.4, start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'), line_color="white", fill_color='color', legend_field='sumber', source=source_donut)
+        p_donut.annular_wedge(x=0, y=1, inner_radius=0.2, outer_radius=0.4, start_angle=cumsum('angle', include_zero=True), end_angle=cumsum('angle'), fill_color='color', line_color="white", source=source_donut)
+        p_donut.axis.visible = False
+        p_donut.grid.visible = False
+        p_donut.title.align = 'center'
+        return p_donut
+    charts.add(st, ChartSpec("cluster_donut", prepare_donut_cluster, build_donut_cluster, params=(klaster_pilihan,), use_container_width=False))
 
     # 7. Heatmap korelasi fitur per klaster (interaktif)
     st.subheader("Heatmap Korelasi Fitur Energi Per Klaster (AI)")
     st.info("""
     Visualisasi ini memperlihatkan hubungan antar fitur-fitur energi utama dalam bentuk matriks korelasi, yang dipisahkan berdasarkan hasil klaster dari model AI. Setiap heatmap mewakili satu klaster, menampilkan sejauh mana dua fitur saling berkorelasi — baik positif maupun negatif. Perbedaan pola korelasi antar klaster ini menegaskan bahwa masing-masing kelompok negara memiliki profil energi yang khas, baik dari segi struktur konsumsi, harga energi, maupun kontribusi terhadap emisi. Visualisasi ini memberikan wawasan penting bagi pembuat kebijakan untuk merancang strategi energi yang disesuaikan dengan karakteristik klaster masing-masing.
     """)
-    klaster_heatmap = st.selectbox("Pilih Klaster untuk Heatmap", sorted(df_agglo["Cluster"].unique()), key="heatmap_klaster")
-    df_heatmap = df_agglo[df_agglo["Cluster"] == klaster_heatmap]
+    klaster_heatmap = st.selectbox("Pilih Klaster untuk Heatmap", clusters, key="heatmap_klaster")
     fitur_heatmap = [
         "Total Energy Consumption (TWh)",
         "Per Capita Energy Use (kWh)",
@@ -476,30 +857,204 @@ elif menu == "Analisis Clustering (AI)":
         "Carbon Emissions (Million Tons)",
         "Energy Price Index (USD/kWh)"
     ]
-    corr_matrix_klaster = df_heatmap[fitur_heatmap].corr().round(2)
-    corr_df_klaster = corr_matrix_klaster.stack().reset_index()
-    corr_df_klaster.columns = ["Feature_X", "Feature_Y", "Correlation"]
-    source_heatmap = ColumnDataSource(corr_df_klaster)
-    mapper_heatmap = LinearColorMapper(palette=Viridis256, low=-1, high=1)
-    p_heatmap = figure(title=f"Heatmap Korelasi Fitur Energi - Klaster {klaster_heatmap}", x_range=fitur_heatmap, y_range=list(reversed(fitur_heatmap)), x_axis_location="above", width=800, height=600, tools="hover,save", tooltips=[('X', '@Feature_X'), ('Y', '@Feature_Y'), ('Korelasi', '@Correlation')])
-    p_heatmap.rect(x="Feature_X", y="Feature_Y", width=1, height=1, source=source_heatmap, fill_color=linear_cmap('Correlation', Viridis256, -1, 1), line_color=None)
-    color_bar_heatmap = ColorBar(color_mapper=mapper_heatmap, ticker=BasicTicker(desired_num_ticks=10), formatter=PrintfTickFormatter(format="%.2f"), label_standoff=12, border_line_color=None, location=(0, 0))
-    p_heatmap.add_layout(color_bar_heatmap, 'right')
-    p_heatmap.xaxis.major_label_orientation = np.pi / 4
-    p_heatmap.title.align = 'center'
-    st.bokeh_chart(p_heatmap, use_container_width=True)
+    corr_cube_agglo = load_corr_cube(df_agglo_full, agglo_key, "Cluster")
+    def prepare_corr_cluster():
+        corr_matrix_klaster = corr_cube_agglo.corr(selected_years, selected_countries, [klaster_heatmap], columns=fitur_heatmap).round(2)
+        corr_df_klaster = corr_matrix_klaster.stack().reset_index()
+        corr_df_klaster.columns = ["Feature_X", "Feature_Y", "Correlation"]
+        return corr_df_klaster
+    def build_corr_cluster(corr_df_klaster):
+        source_heatmap = ColumnDataSource(corr_df_klaster)
+        mapper_heatmap = LinearColorMapper(palette=Viridis256, low=-1, high=1)
+        p_heatmap = figure(title=f"Heatmap Korelasi Fitur Energi - Klaster {klaster_heatmap}", x_range=fitur_heatmap, y_range=list(reversed(fitur_heatmap)), x_axis_location="above", width=800, height=600, tools="hover,save", tooltips=[('X', '@Feature_X'), ('Y', '@Feature_Y'), ('Korelasi', '@Correlation')])
+        p_heatmap.rect(x="Feature_X", y="Feature_Y", width=1, height=1, source=source_heatmap, fill_color=linear_cmap('Correlation', Viridis256, -1, 1), line_color=None)
+        color_bar_heatmap = ColorBar(color_mapper=mapper_heatmap, ticker=BasicTicker(desired_num_ticks=10), formatter=PrintfTickFormatter(format="%.2f"), label_standoff=12, border_line_color=None, location=(0, 0))
+        p_heatmap.add_layout(color_bar_heatmap, 'right')
+        p_heatmap.xaxis.major_label_orientation = np.pi / 4
+        p_heatmap.title.align = 'center'
+        return p_heatmap
+    charts.add(st, ChartSpec("cluster_corr", prepare_corr_cluster, build_corr_cluster, params=(klaster_heatmap,)))
 
     # 8. Scatter plot emisi karbon vs energi terbarukan per klaster (interaktif)
     st.subheader("Scatter Plot: Emisi Karbon vs Energi Terbarukan Per Klaster")
     st.info("""
     Visualisasi ini menampilkan hubungan antara emisi karbon dan proporsi energi terbarukan untuk negara-negara di seluruh dunia, yang telah dikelompokkan berdasarkan klaster hasil model AI. Setiap titik pada scatter plot mewakili satu negara, dan warna menunjukkan klaster AI tempat negara tersebut berada. Visualisasi ini memungkinkan identifikasi perbedaan pola hubungan antar fitur utama energi. Klaster tertentu memperlihatkan negara-negara dengan emisi karbon tinggi dan proporsi energi terbarukan yang rendah, mencerminkan ketergantungan kuat pada energi berbasis fosil. Klaster lainnya menunjukkan negara-negara dengan proporsi energi terbarukan tinggi dan emisi yang lebih rendah, menandakan pendekatan yang lebih bersih dan berkelanjutan terhadap penggunaan energi. Distribusi titik-titik pada masing-masing klaster menggambarkan variasi strategi energi dan efektivitas kebijakan lingkungan yang diambil oleh kelompok negara tersebut. Visualisasi ini memberikan wawasan penting untuk analisis perbandingan lintas negara dan menyusun kebijakan berbasis kelompok dengan karakteristik serupa.
     """)
-    klaster_pilihan2 = st.selectbox("Pilih Klaster untuk Scatter Plot", sorted(df_agglo["Cluster"].unique()), key="scatter_klaster")
-    df_klaster2 = df_agglo[df_agglo["Cluster"] == klaster_pilihan2]
-    avg_per_country = df_klaster2.groupby("Country")[["Carbon Emissions (Million Tons)", "Renewable Energy Share (%)"]].mean().reset_index()
-    source_scatter = ColumnDataSource(avg_per_country)
-    p_scatter = figure(title=f"Scatter: Emisi Karbon vs Energi Terbarukan (Klaster {klaster_pilihan2})", x_axis_label="Proporsi Energi Terbarukan (%)", y_axis_label="Emisi Karbon (Juta Ton)", width=850, height=500, tools="pan,box_zoom,reset,hover,save")
-    p_scatter.circle(x='Renewable Energy Share (%)', y='Carbon Emissions (Million Tons)', size=10, source=source_scatter, fill_color="navy", line_color="black", fill_alpha=0.7)
-    p_scatter.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi Terbarukan", "@{Renewable Energy Share (%)}{0.0}%"), ("Emisi Karbon", "@{Carbon Emissions (Million Tons)}{0.0} Juta Ton")]))
-    p_scatter.title.align = 'center'
-    st.bokeh_chart(p_scatter, use_container_width=True) 
\ No newline at end of file
+    klaster_pilihan2 = st.selectbox("Pilih Klaster untuk Scatter Plot", clusters, key="scatter_klaster")
+    def prepare_scatter_cluster():
+        return profile.country_means(["Carbon Emissions (Million Tons)", "Renewable Energy Share (%)"], klaster_pilihan2)
+    def build_scatter_cluster(avg_per_country):
+        source_scatter = ColumnDataSource(avg_per_country)
+        p_scatter = figure(title=f"Scatter: Emisi Karbon vs Energi Terbarukan (Klaster {klaster_pilihan2})", x_axis_label="Proporsi Energi Terbarukan (%)", y_axis_label="Emisi Karbon (Juta Ton)", width=850, height=500, tools="pan,box_zoom,reset,hover,save")
+        p_scatter.circle(x='Renewable Energy Share (%)', y='Carbon Emissions (Million Tons)', size=10, source=source_scatter, fill_color="navy", line_color="black", fill_alpha=0.7)
+        p_scatter.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Energi Terbarukan", "@{Renewable Energy Share (%)}{0.0}%"), ("Emisi Karbon", "@{Carbon Emissions (Million Tons)}{0.0} Juta Ton")]))
+        p_scatter.title.align = 'center'
+        return p_scatter
+    charts.add(st, ChartSpec("cluster_scatter", prepare_scatter_cluster, build_scatter_cluster, params=(klaster_pilihan2,)))
+
+    # 9. Sebaran PCA seluruh baris (level-of-detail)
+    if {"PC1", "PC2"} <= set(df_agglo_full.columns):
+        st.subheader("Sebaran PCA Seluruh Data Berdasarkan Klaster")
+        st.info("""
+        Setiap baris data diproyeksikan ke dua komponen utama (PC1 dan PC2) hasil PCA. Untuk data besar, titik diringkas menjadi grid densitas: warna sel menunjukkan klaster mayoritas dan intensitasnya menunjukkan jumlah data. Saat grafik diperbesar, grid dihitung ulang untuk area yang terlihat sehingga detail bertambah.
+        """)
+        # Grid dari indeks yang sama dengan halaman Peta Klaster PCA (geometri tetap, mask di-memo)
+        pca_map = load_cluster_map(df_agglo_full, agglo_key)
+        def prepare_pca_density():
+            keep = pca_map.mask(selected_years, selected_countries)
+            if keep.sum() <= RAW_POINT_LIMIT:
+                return pca_map.rows_frame(np.flatnonzero(keep))[["Country", "Year", "Cluster", "PC1", "PC2"]]
+            return DensityGrid(pca_map.x[keep], pca_map.y[keep], pd.Categorical.from_codes(pca_map.codes[keep], pca_map.clusters),
+                               clusters, extent=pca_map.extent)
+        def build_pca_density(data):
+            p_pca = figure(title="Sebaran PCA Berdasarkan Klaster AI", x_axis_label="PC1", y_axis_label="PC2", width=850, height=550, tools="pan,wheel_zoom,box_zoom,reset,save")
+            if not isinstance(data, DensityGrid):
+                data["color"] = [colors[clusters.index(c)] if c in clusters else "gray" for c in data["Cluster"]]
+                source_pca = ColumnDataSource(data)
+                p_pca.circle(x="PC1", y="PC2", source=source_pca, size=5, fill_color="color", line_color=None, fill_alpha=0.6, legend_field="Cluster")
+                p_pca.add_tools(HoverTool(tooltips=[("Negara", "@Country"), ("Tahun", "@Year"), ("Klaster", "@Cluster")]))
+            else:
+                fine = ColumnDataSource(data.fine_data())
+                shown = ColumnDataSource(data.display_data(colors))
+                p_pca.x_range = Range1d(data.x_min, data.x_max)
+                p_pca.y_range = Range1d(data.y_min, data.y_max)
+                p_pca.rect(x="x", y="y", width="w", height="h", source=shown, fill_color="color", fill_alpha="alpha", line_color=None, legend_field="Cluster")
+                p_pca.add_tools(HoverTool(tooltips=[("Klaster mayoritas", "@Cluster"), ("Jumlah data", "@count")]))
+                rebin = CustomJS(args=dict(fine=fine, shown=shown, xr=p_pca.x_range, yr=p_pca.y_range, **data.js_args(colors)), code=REBIN_JS)
+                for rng in (p_pca.x_range, p_pca.y_range):
+                    rng.js_on_change("start", rebin)
+                    rng.js_on_change("end", rebin)
+            p_pca.legend.title = "Klaster AI"
+            p_pca.legend.click_policy = "hide"
+            p_pca.title.align = 'center'
+            return p_pca
+        charts.add(st, ChartSpec("cluster_pca", prepare_pca_density, build_pca_density))
+
+    profiler.checkpoint("Persiapan halaman")
+    charts.render()
+
+elif menu == "Peta Klaster PCA":
+    st.header("Peta Klaster di Ruang PCA")
+    st.markdown("""
+    Setiap baris data hasil clustering diproyeksikan ke dua komponen utama (PC1 dan PC2) dari PCA di notebook. Titik-titik diringkas per sel grid: warna sel menunjukkan klaster mayoritas dan intensitasnya menunjukkan jumlah data. Gunakan alat **Box Select** atau **Lasso Select** pada peta untuk memilih area; grafik jumlah data dan tabel rata-rata fitur per klaster di sampingnya langsung mengikuti seleksi. Arahkan kursor ke sel untuk melihat titik data yang mewakili sel tersebut.
+    """)
+    if not {"PC1", "PC2"} <= set(df_agglo_full.columns):
+        st.warning("Data klaster tidak memiliki kolom PC1/PC2.")
+    else:
+        charts = ChartPipeline(get_chart_executor(), get_chart_cache(), chart_context)
+        cluster_map = load_cluster_map(df_agglo_full, agglo_key)
+        map_keep = cluster_map.mask(selected_years, selected_countries)
+        map_clusters = cluster_map.clusters.tolist()
+        map_colors = [Category10[10][i % 10] for i in range(len(map_clusters))]
+
+        # Grid yang sama dengan sebaran PCA halaman Analisis Clustering
+        # (lod.DensityGrid): warna, intensitas dan hitung ulang saat zoom
+        def build_cluster_map(data):
+            grid, rep = data
+            cells = grid.display_data(map_colors, rep_columns=rep)
+            source_map = ColumnDataSource(cells)
+            fine_map = ColumnDataSource(grid.fine_data(rep))
+            p_map = figure(title="Peta Klaster PCA", x_axis_label="PC1", y_axis_label="PC2", width=700, height=550, tools="pan,wheel_zoom,reset,save", x_range=Range1d(grid.x_min, grid.x_max), y_range=Range1d(grid.y_min, grid.y_max))
+            cell_renderer = p_map.rect(x="x", y="y", width="w", height="h", source=source_map, fill_color="color", fill_alpha="alpha", line_color=None, nonselection_fill_alpha=0.08)
+            rebin = CustomJS(args=dict(fine=fine_map, shown=source_map, xr=p_map.x_range, yr=p_map.y_range, **grid.js_args(map_colors, rep_columns=rep)), code=REBIN_JS)
+            for rng in (p_map.x_range, p_map.y_range):
+                rng.js_on_change("start", rebin)
+                rng.js_on_change("end", rebin)
+            # Titik pusat sel (tak terlihat) sebagai target seleksi lasso/kotak
+            center_renderer = p_map.scatter(x="x", y="y", source=source_map, size=4, alpha=0)
+            p_map.add_tools(BoxSelectTool(renderers=[center_renderer]), LassoSelectTool(renderers=[center_renderer]))
+            p_map.add_tools(HoverTool(renderers=[cell_renderer], tooltips=[
+                ("Jumlah data", "@count"), ("Klaster mayoritas", "@Cluster"),
+                ("Titik perwakilan", "@Country (@Year), klaster @RepCluster"),
+                ("PC1, PC2", "@PC1{0.000}, @PC2{0.000}"),
+            ]))
+            p_map.title.align = 'center'
+
+            source_bar = ColumnDataSource({"Cluster": map_clusters, "count": [int(cells[f"n{c}"].sum()) for c in range(len(map_clusters))], "color": map_colors})
+            p_bar = figure(x_range=map_clusters, title="Jumlah Data per Klaster (Seleksi)", width=350, height=260, tools="save")
+            p_bar.vbar(x="Cluster", top="count", source=source_bar, width=0.6, fill_color="color")
+            p_bar.add_tools(HoverTool(tooltips=[("Klaster", "@Cluster"), ("Jumlah", "@count")]))
+            p_bar.title.align = 'center'
+            summary = Div(width=350)
+
+            select_js = CustomJS(args=dict(cells=source_map, bar=source_bar, summary=summary, clusters=map_clusters, features=cluster_map.features), code="""
+                const data = cells.data;
+                const total = data['count'].length;
+                let idx = cells.selected.indices;
+                if (idx.length === 0) { idx = Array.from({length: total}, (_, i) => i); }
+                const counts = clusters.map(() => 0);
+                const sums = clusters.map(() => features.map(() => 0));
+                for (const i of idx) {
+                    for (let c = 0; c < clusters.length; c++) {
+                        counts[c] += data['n' + c][i];
+                        for (let f = 0; f < features.length; f++) { sums[c][f] += data['s' + c + '_' + f][i]; }
+                    }
+                }
+                bar.data = {Cluster: clusters, count: counts, color: bar.data['color']};
+                let html = '<table style="font-size:12px"><tr><th>Fitur</th>' + clusters.map((c) => '<th>Klaster ' + c + '</th>').join('') + '</tr>';
+                for (let f = 0; f < features.length; f++) {
+                    html += '<tr><td>' + features[f] + '</td>' + clusters.map((_, c) => '<td>' + (counts[c] ? (sums[c][f] / counts[c]).toFixed(2) : '-') + '</td>').join('') + '</tr>';
+                }
+                summary.text = html + '</table><p>' + counts.reduce((a, b) => a + b, 0) + ' data dalam seleksi</p>';
+            """)
+            source_map.selected.js_on_change("indices", select_js)
+            # Ringkasan awal (tanpa seleksi) dihitung di Python
+            counts = [cells[f"n{c}"].sum() for c in range(len(map_clusters))]
+            rows_html = "".join(
+                f"<tr><td>{feat}</td>" + "".join(
+                    f"<td>{cells[f's{c}_{f}'].sum() / counts[c]:.2f}</td>" if counts[c] else "<td>-</td>"
+                    for c in range(len(map_clusters))) + "</tr>"
+                for f, feat in enumerate(cluster_map.features))
+            summary.text = ('<table style="font-size:12px"><tr><th>Fitur</th>'
+                            + "".join(f"<th>Klaster {c}</th>" for c in map_clusters) + "</tr>"
+                            + rows_html + f"</table><p>{int(sum(counts))} data dalam seleksi</p>")
+            return row(p_map, column(p_bar, summary))
+        charts.add(st, ChartSpec("pca_map", lambda: cluster_map.cells(map_keep), build_cluster_map, use_container_width=False))
+
+        # Pencarian titik terdekat di server lewat KD-tree
+        st.subheader("Cari Titik Terdekat")
+        col_pc1, col_pc2, col_k = st.columns(3)
+        cari_pc1 = col_pc1.number_input("PC1", value=0.0, step=0.1, format="%.3f")
+        cari_pc2 = col_pc2.number_input("PC2", value=0.0, step=0.1, format="%.3f")
+        cari_k = col_k.slider("Jumlah titik", min_value=1, max_value=50, value=10)
+        t0 = time.perf_counter()
+        nearest_pos, nearest_dist = cluster_map.nearest(cari_pc1, cari_pc2, cari_k, map_keep)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        st.dataframe(cluster_map.rows_frame(nearest_pos, nearest_dist), hide_index=True)
+        st.caption(f"{len(nearest_pos)} titik terdekat dari {int(map_keep.sum()):,} titik terfilter, dijawab dalam {elapsed_ms:.1f} ms.")
+
+        profiler.checkpoint("Persiapan halaman")
+        charts.render()
+
+# Laporan memori per sesi: frame yang dipegang sesi ini dan berapa yang benar-benar
+# baru dialokasikan (sisanya memory-map bersama atau view hasil filter). Frame
+# hasil filter hanya ada bila halaman ini membuatnya (Eksplorasi Data).
+profiler.checkpoint(f"Render: {menu}")
+with st.sidebar.expander("Laporan Memori Sesi"):
+    session_frames = {"df_full": df_full, "df_agglo_full": df_agglo_full}
+    if menu == "Eksplorasi Data":
+        session_frames.update({"df (filter)": df, "df_agglo (filter)": df_agglo})
+    st.dataframe(memory_report(session_frames), hide_index=True)
+    if warmup is not None:
+        if warmup.error:
+            st.caption(f"Pemanasan gagal: {warmup.error}")
+        elif warmup.ready.is_set():
+            st.caption(f"Pemanasan selesai dalam {warmup.elapsed():.1f} s.")
+        else:
+            st.caption(f"Pemanasan berjalan: {warmup.current or 'memulai'}...")
+    query_stats = queries.stats()
+    st.caption(f"Layanan query: {query_stats['queries']:,} query, {query_stats['hits']:,} dari cache, "
+               f"{query_stats['deduplicated']:,} digabung, {query_stats['cached']:,} hasil tersimpan.")
+profiler.checkpoint("Laporan memori")
+
+# Waktu dinding dan memori per bagian untuk rerun ini. Hasilnya juga disimpan di
+# session_state["profile_report"] agar bisa dibaca benchmark.py.
+with st.sidebar.expander("Profiling"):
+    st.checkbox("Aktifkan profiling per bagian", key="profiling",
+                help="Mulai berlaku pada rerun berikutnya. Memori diukur dengan tracemalloc sehingga skrip sedikit melambat.")
+    if profiler.enabled:
+        st.session_state["profile_report"] = profiler.finish()
+        st.dataframe(profiler.table(), hide_index=True)
+        if profiler.shared:
+            st.caption("Sesi lain juga sedang diprofil: puncak memori per bagian tidak tersedia dan alokasi bisa tercampur.")
+        st.download_button("Unduh profil (JSON)", profiler.to_json(), file_name="profil_rerun.json", mime="application/json")
@@ -0,0 +1,215 @@
+# Mode append: tambahkan baris baru (mis. tahun terbaru) tanpa menghitung ulang
+# semuanya.
+#
+# Baris baru ditambahkan ke global_energy_consumption.csv dan
+# hasil_agglo_clustering.csv beserta store kolomnya (data_store.append_store),
+# sehingga app.py cukup mengagregasi baris baru lalu menggabungkannya dengan
+# kubus versi sebelumnya. Klaster baris baru ditentukan dari model yang
+# disimpan (cluster_model.json): scaler, centroid per klaster di ruang
+# terstandardisasi dan komponen PCA. Agglomerative tidak punya predict, jadi
+# baris baru masuk ke centroid terdekat. Profil klaster (profil_agglo_cluster.csv)
+# diperbarui dari jumlah berjalan per klaster.
+#
+# Model juga mencatat statistik baris yang di-append sejak fit terakhir untuk
+# mendeteksi drift; bila salah satu ambang terlewati, clustering ulang penuh
+# (notebook) disarankan, lalu model di-reset dengan --reset-model.
+#
+# Contoh:
+#   python append.py data_2025.csv
+#   python append.py --reset-model
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA
+
+from clustering import FEATURES, RANDOM_STATE
+from data_store import REQUIRED_COLUMNS, _write_json, append_store, read_header_path, validate_columns
+
+DATA_PATH = "global_energy_consumption.csv"
+AGGLO_PATH = "hasil_agglo_clustering.csv"
+PROFILE_PATH = "profil_agglo_cluster.csv"
+MODEL_PATH = "cluster_model.json"
+
+# Ambang drift terhadap data saat fit
+DRIFT_DISTANCE_RATIO = 1.25  # rata-rata jarak ke centroid / baseline
+DRIFT_MEAN_SHIFT = 0.5       # pergeseran rata-rata fitur (dalam satuan std)
+DRIFT_SHARE_TVD = 0.2        # total variation distance proporsi klaster
+
+
+class ClusterModel:
+    def __init__(self, state):
+        self.state = state
+        self.mean = np.array(state["mean"])
+        self.scale = np.array(state["scale"])
+        self.clusters = state["clusters"]
+        self.centroids = np.array(state["centroids"])
+        self.pca_mean = np.array(state["pca_mean"])
+        self.components = np.array(state["components"])
+
+    @classmethod
+    def fit(cls, agglo):
+        # Bangun ulang dari hasil clustering yang ada (label tidak diubah)
+        data = agglo.dropna(subset=FEATURES + ["Cluster"])
+        X = data[FEATURES].to_numpy(dtype=np.float64)
+        mean, scale = X.mean(axis=0), X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = (X - mean) / scale
+        labels = data["Cluster"].astype(str).to_numpy()
+        clusters = sorted(np.unique(labels).tolist(), key=lambda c: (len(c), c))
+        centroids = np.array([Z[labels == c].mean(axis=0) for c in clusters])
+
+        pca = PCA(n_components=2, random_state=RANDOM_STATE).fit(Z)
+        components = pca.components_
+        if {"PC1", "PC2"} <= set(data.columns):
+            # Samakan tanda komponen dengan PC1/PC2 yang sudah tersimpan
+            projected = (Z - pca.mean_) @ components.T
+            stored = data[["PC1", "PC2"]].to_numpy(dtype=np.float64)
+            signs = np.sign((projected * stored).sum(axis=0))
+            components = components * np.where(signs == 0, 1, signs)[:, None]
+
+        model = cls({
+            "features": FEATURES, "mean": mean.tolist(), "scale": scale.tolist(),
+            "clusters": clusters, "centroids": centroids.tolist(),
+            "pca_mean": pca.mean_.tolist(), "components": components.tolist(),
+        })
+        codes, distance = model._nearest(Z)
+        counts = np.bincount(codes, minlength=len(clusters))
+        model.state.update({
+            "fit_rows": len(data),
+            "fit_distance": float(distance.mean()),
+            "fit_shares": (counts / counts.sum()).tolist(),
+            # Jumlah berjalan untuk profil klaster (label asli, bukan centroid terdekat)
+            "counts": [int((labels == c).sum()) for c in clusters],
+            "sums": [X[labels == c].sum(axis=0).tolist() for c in clusters],
+            "appended": {"rows": 0, "distance": 0.0, "sum": [0.0] * len(FEATURES),
+                         "counts": [0] * len(clusters)},
+        })
+        return model
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        _write_json(path, self.state)
+
+    def _nearest(self, Z):
+        distance = np.sqrt(((Z[:, None, :] - self.centroids[None, :, :]) ** 2).sum(axis=2))
+        codes = distance.argmin(axis=1)
+        return codes, distance[np.arange(len(Z)), codes]
+
+    def assign(self, frame):
+        # Salinan baris lengkap (tanpa NaN pada FEATURES) dengan Cluster, PC1, PC2,
+        # dan statistik drift diperbarui
+        data = frame.dropna(subset=FEATURES).reset_index(drop=True)
+        X = data[FEATURES].to_numpy(dtype=np.float64)
+        Z = (X - self.mean) / self.scale
+        codes, distance = self._nearest(Z)
+        pcs = (Z - self.pca_mean) @ self.components.T
+        data["Cluster"] = np.array(self.clusters, dtype=object)[codes]
+        data["PC1"] = pcs[:, 0]
+        data["PC2"] = pcs[:, 1]
+
+        counts = np.bincount(codes, minlength=len(self.clusters))
+        appended = self.state["appended"]
+        appended["rows"] += len(data)
+        appended["distance"] += float(distance.sum())
+        appended["sum"] = (np.array(appended["sum"]) + X.sum(axis=0)).tolist()
+        appended["counts"] = (np.array(appended["counts"]) + counts).tolist()
+        self.state["counts"] = (np.array(self.state["counts"]) + counts).tolist()
+        sums = np.array(self.state["sums"])
+        np.add.at(sums, codes, X)
+        self.state["sums"] = sums.tolist()
+        return data
+
+    def profile(self):
+        counts = np.array(self.state["counts"], dtype=np.float64)
+        means = np.array(self.state["sums"]) / np.maximum(counts, 1)[:, None]
+        frame = pd.DataFrame(means.round(2), columns=FEATURES)
+        frame.insert(0, "Cluster", [int(c) if c.isdigit() else c for c in self.clusters])
+        return frame[counts > 0]
+
+    def drift(self):
+        # Dibandingkan dengan data saat fit, atas semua baris yang di-append sejak itu
+        appended = self.state["appended"]
+        if appended["rows"] == 0:
+            return {"rows": 0, "refit": False, "checks": []}
+        rows = appended["rows"]
+        distance_ratio = appended["distance"] / rows / max(self.state["fit_distance"], 1e-12)
+        shift = np.abs(np.array(appended["sum"]) / rows - self.mean) / self.scale
+        shares = np.array(appended["counts"]) / rows
+        tvd = 0.5 * np.abs(shares - np.array(self.state["fit_shares"])).sum()
+        checks = [
+            {"check": "Rasio jarak ke centroid", "value": float(distance_ratio),
+             "threshold": DRIFT_DISTANCE_RATIO},
+            {"check": f"Pergeseran rata-rata ({FEATURES[int(shift.argmax())]})", "value": float(shift.max()),
+             "threshold": DRIFT_MEAN_SHIFT},
+            {"check": "TVD proporsi klaster", "value": float(tvd), "threshold": DRIFT_SHARE_TVD},
+        ]
+        for check in checks:
+            check["exceeded"] = check["value"] > check["threshold"]
+        return {"rows": rows, "refit": any(c["exceeded"] for c in checks), "checks": checks}
+
+
+def load_model(model_path, agglo_path):
+    if os.path.exists(model_path):
+        return ClusterModel.load(model_path)
+    return ClusterModel.fit(pd.read_csv(agglo_path))
+
+
+def append_rows(new_rows, data_path=DATA_PATH, agglo_path=AGGLO_PATH,
+                profile_path=PROFILE_PATH, model_path=MODEL_PATH):
+    # Kembalikan ringkasan: jumlah baris per file, status store dan laporan drift
+    validate_columns(list(new_rows.columns), read_header_path(data_path))
+    new_rows = new_rows.dropna(subset=list(REQUIRED_COLUMNS))
+    model = load_model(model_path, agglo_path)
+    clustered = model.assign(new_rows)
+
+    data_in_place = append_store(data_path, new_rows)
+    agglo_in_place = append_store(agglo_path, clustered[read_header_path(agglo_path)])
+    model.profile().to_csv(profile_path, index=False)
+    report = model.drift()
+    model.state["last_drift"] = report
+    model.save(model_path)
+    return {"rows": len(new_rows), "clustered_rows": len(clustered),
+            "store_in_place": data_in_place and agglo_in_place, "drift": report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tambahkan baris baru ke data energi dan hasil clustering.")
+    parser.add_argument("csv", nargs="?", help="CSV baris baru dengan layout global_energy_consumption.csv")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--agglo", default=AGGLO_PATH)
+    parser.add_argument("--profile", default=PROFILE_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--reset-model", action="store_true",
+                        help="Bangun ulang model dari hasil clustering saat ini (setelah clustering ulang)")
+    args = parser.parse_args()
+
+    if args.reset_model:
+        ClusterModel.fit(pd.read_csv(args.agglo)).save(args.model)
+        print(f"Model disimpan ke {args.model}")
+    if args.csv is None:
+        if not args.reset_model:
+            parser.error("CSV baris baru wajib diisi")
+        return
+
+    summary = append_rows(pd.read_csv(args.csv), args.data, args.agglo, args.profile, args.model)
+    print(f"{summary['rows']:,} baris ditambahkan ({summary['clustered_rows']:,} diklaster).")
+    if not summary["store_in_place"]:
+        print("Store akan dibangun ulang saat aplikasi dibuka (urutan tahun / store belum sinkron).")
+    drift = summary["drift"]
+    print(f"Drift atas {drift['rows']:,} baris sejak fit:")
+    for check in drift["checks"]:
+        flag = "MELEWATI AMBANG" if check["exceeded"] else "ok"
+        print(f"  {check['check']:<60} {check['value']:>8.3f} (ambang {check['threshold']})  {flag}")
+    if drift["refit"]:
+        print("Drift terdeteksi: jalankan clustering ulang penuh, lalu append.py --reset-model.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# Benchmark headless untuk app.py.
+#
+# Membuat dataset sintetis dengan skema global_energy_consumption.csv dalam
+# beberapa ukuran, lalu menjalankan app.py lewat streamlit.testing AppTest untuk
+# setiap halaman dan beberapa kondisi sidebar. Setiap rerun diukur dari luar
+# (waktu dinding AppTest.run) dan dari dalam (profiling per bagian, lihat
+# profiling.py). Hasil dicetak sebagai tabel dan bisa disimpan sebagai JSON.
+#
+# Jumlah entitas (negara) diatur terpisah dari jumlah baris: 0 berarti hanya
+# negara data asli, angka lain menambah negara sintetis hingga sebanyak itu,
+# sehingga jalur banyak-entitas (kubus jarang, peringkat, filter negara) ikut
+# terukur.
+#
+# Contoh:
+#   python benchmark.py --rows 10000 100000 1000000 --countries 0 50000 --repeat 3 --out benchmark.json
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from clustering import cluster_frame
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+REFERENCE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "global_energy_consumption.csv")
+
+PAGES = ["Eksplorasi Data", "Visualisasi Interaktif", "Analisis Clustering (AI)", "Peta Klaster PCA"]
+YEAR_SLIDER = "Pilih Rentang Tahun"
+COUNTRY_SELECT = "Pilih Negara (Visualisasi Interaktif)"
+
+
+def synthetic_frame(rows, countries=0, reference_csv=REFERENCE_CSV, seed=0):
+    # Rentang tahun dan rentang nilai tiap fitur diambil dari data asli;
+    # countries > 0: negara asli ditambah negara sintetis hingga sebanyak itu
+    reference = pd.read_csv(reference_csv)
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col in reference.columns:
+        values = reference[col].dropna()
+        if col == "Country":
+            names = values.unique()
+            if countries > len(names):
+                extra = [f"Negara {i:06d}" for i in range(countries - len(names))]
+                names = np.concatenate([names, extra])
+            elif countries:
+                names = names[:countries]
+            data[col] = rng.choice(names, size=rows)
+        elif col == "Year":
+            data[col] = rng.integers(values.min(), values.max() + 1, size=rows)
+        else:
+            data[col] = rng.uniform(values.min(), values.max(), size=rows).round(2)
+    return pd.DataFrame(data)
+
+
+def write_dataset(rows, countries, workdir):
+    # CSV energi dan CSV hasil clustering (pengganti hasil notebook)
+    data_path = os.path.join(workdir, f"energy_{rows}_{countries}.csv")
+    agglo_path = os.path.join(workdir, f"agglo_{rows}_{countries}.csv")
+    if not os.path.exists(data_path):
+        frame = synthetic_frame(rows, countries)
+        frame.to_csv(data_path, index=False)
+        cluster_frame(frame, k=3, mode="minibatch").frame.to_csv(agglo_path, index=False)
+    return data_path, agglo_path
+
+
+def _by_label(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def _scenarios(years, countries):
+    return {
+        "default": {},
+        "satu_negara": {COUNTRY_SELECT: countries[:1]},
+        # Separuh negara terpilih: filter negara dengan ribuan entitas
+        "separuh_negara": {COUNTRY_SELECT: countries[:max(1, len(countries) // 2)]},
+        "rentang_5_tahun": {YEAR_SLIDER: (years[1] - 4, years[1])},
+    }
+
+
+def run_case(page, scenario_name, repeat, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state["profiling"] = True
+    at.run()
+    slider = _by_label(at.sidebar.slider, YEAR_SLIDER)
+    countries = _by_label(at.sidebar.multiselect, COUNTRY_SELECT).options
+    settings = _scenarios((slider.min, slider.max), countries)[scenario_name]
+
+    results = []
+    for i in range(repeat):
+        at.sidebar.radio[0].set_value(page)
+        for label, value in settings.items():
+            widgets = at.sidebar.slider if label == YEAR_SLIDER else at.sidebar.multiselect
+            _by_label(widgets, label).set_value(value)
+        start = time.perf_counter()
+        at.run()
+        wall = time.perf_counter() - start
+        errors = [str(e.value) for e in at.exception]
+        results.append({
+            "run": i,
+            "wall_ms": round(wall * 1000, 2),
+            "sections": at.session_state["profile_report"] if "profile_report" in at.session_state else [],
+            "errors": errors,
+        })
+    return results
+
+
+def run_benchmark(row_counts, country_counts, pages, scenarios, repeat, workdir, timeout):
+    import streamlit as st
+
+    # Tanpa pemanasan latar belakang agar setiap halaman diukur dingin dan tidak
+    # berebut CPU dengan thread pemanasan
+    os.environ["ENERGY_WARMUP"] = "0"
+    report = []
+    for rows in row_counts:
+        for countries in country_counts:
+            data_path, agglo_path = write_dataset(rows, countries, workdir)
+            os.environ["ENERGY_DATA_PATH"] = data_path
+            os.environ["ENERGY_AGGLO_PATH"] = agglo_path
+            # Mulai dingin untuk setiap ukuran data: store, kubus dan cache grafik dibangun ulang
+            st.cache_resource.clear()
+            for page in pages:
+                for scenario in scenarios:
+                    runs = run_case(page, scenario, repeat, timeout)
+                    walls = [r["wall_ms"] for r in runs]
+                    report.append({
+                        "rows": rows, "countries": countries, "page": page, "scenario": scenario,
+                        "first_ms": walls[0], "median_ms": statistics.median(walls),
+                        "errors": sorted({e for r in runs for e in r["errors"]}),
+                        "runs": runs,
+                    })
+                    print(f"{rows:>9,}  {countries or 'asli':>7}  {page:<26} {scenario:<16} "
+                          f"pertama {walls[0]:>9.1f} ms  median {statistics.median(walls):>9.1f} ms"
+                          + ("  ERROR" if report[-1]["errors"] else ""))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark headless app.py dengan data sintetis.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--countries", type=int, nargs="+", default=[0, 50_000],
+                        help="Jumlah negara per dataset; 0 = hanya negara data asli")
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--scenarios", nargs="+", default=list(_scenarios((0, 0), [])),
+                        choices=list(_scenarios((0, 0), [])))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "energy-benchmark"))
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--out", help="Simpan hasil lengkap (termasuk profil per bagian) sebagai JSON")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    report = run_benchmark(args.rows, args.countries, args.pages, args.scenarios, args.repeat, args.workdir, args.timeout)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if any(entry["errors"] for entry in report):
+        for entry in report:
+            for error in entry["errors"]:
+                print(f"{entry['rows']:,} {entry['countries'] or 'asli'} {entry['page']} {entry['scenario']}: {error}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# Pipeline grafik Bokeh.
+#
+# Setiap grafik dideklarasikan sebagai ChartSpec: fungsi persiapan data dan
+# fungsi pembuat figure. ChartPipeline memasang placeholder sesuai urutan
+# halaman, lalu menjalankan semua spec secara paralel di thread pool (persiapan,
+# pembuatan figure, dan serialisasi JSON). Placeholder diisi begitu grafiknya
+# selesai, dari thread skrip Streamlit.
+#
+# Hasil serialisasi disimpan di ChartCache (LRU dengan batas memori, dibagi ke
+# semua sesi) dengan kunci (chart id, konteks filter, nilai widget grafik), jadi
+# perubahan satu widget hanya merender ulang grafik yang terdampak.
+#
+# Mengirim JSON yang sudah jadi memerlukan internal Streamlit (proto BokehChart,
+# DeltaGenerator._get_delta_path_str/_enqueue). Jalur itu hanya dipakai pada
+# versi Streamlit yang sudah diverifikasi (STREAMLIT_VERIFIED); pada versi lain
+# grafik dikirim lewat st.bokeh_chart publik tanpa cache JSON.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import as_completed
+
+import bokeh
+import streamlit
+from bokeh.embed import json_item
+from streamlit.delta_generator import DeltaGenerator
+from streamlit.elements import bokeh_chart
+from streamlit.errors import StreamlitAPIException
+
+# Awalan versi Streamlit yang internalnya cocok dengan emit_chart
+STREAMLIT_VERIFIED = ("1.32.",)
+
+
+def _json_emit_supported():
+    if not streamlit.__version__.startswith(STREAMLIT_VERIFIED):
+        return False
+    try:
+        from streamlit.proto.BokehChart_pb2 import BokehChart  # noqa: F401
+    except ImportError:
+        return False
+    return (hasattr(DeltaGenerator, "_enqueue") and hasattr(DeltaGenerator, "_get_delta_path_str")
+            and hasattr(bokeh_chart, "ST_BOKEH_VERSION"))
+
+
+JSON_EMIT = _json_emit_supported()
+
+
+class ChartCache:
+    # Nilai berupa JSON Bokeh (str) atau PNG (bytes); ukuran dihitung dari len()
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class ChartSpec:
+    # params: nilai widget khusus grafik ini (mis. klaster yang dipilih) yang
+    # ikut menentukan hasilnya dan karena itu menjadi bagian kunci cache.
+    def __init__(self, chart_id, prepare, build, params=(), use_container_width=True):
+        self.chart_id = chart_id
+        self.prepare = prepare
+        self.build = build
+        self.params = params
+        self.use_container_width = use_container_width
+
+    def render(self, serialize=True):
+        # serialize=False: figure Bokeh untuk jalur publik st.bokeh_chart
+        figure = self.build(self.prepare())
+        return json.dumps(json_item(figure)) if serialize else figure
+
+
+def emit_chart(container, chart, use_container_width=False):
+    # chart: JSON dari ChartSpec.render() (hanya bila JSON_EMIT) atau figure.
+    # Satu-satunya tempat yang menyentuh internal Streamlit.
+    if not isinstance(chart, str):
+        return container.bokeh_chart(chart, use_container_width=use_container_width)
+    # Sama dengan st.bokeh_chart, tetapi menerima figure yang sudah
+    # diserialisasi sehingga serialisasi bisa dilakukan di thread pool.
+    from streamlit.proto.BokehChart_pb2 import BokehChart as BokehChartProto
+
+    if bokeh.__version__ != bokeh_chart.ST_BOKEH_VERSION:
+        raise StreamlitAPIException(
+            f"Streamlit only supports Bokeh version {bokeh_chart.ST_BOKEH_VERSION}, "
+            f"but you have version {bokeh.__version__} installed."
+        )
+    proto = BokehChartProto()
+    proto.figure = chart
+    proto.use_container_width = use_container_width
+    proto.element_id = hashlib.md5(container._get_delta_path_str().encode()).hexdigest()
+    return container._enqueue("bokeh_chart", proto)
+
+
+class ChartPipeline:
+    # context: semua state di luar spec yang memengaruhi grafik (fingerprint
+    # dataset, rentang tahun, daftar negara)
+    def __init__(self, executor, cache=None, context=()):
+        self._executor = executor
+        self._cache = cache
+        self._context = context
+        self._slots = []
+
+    def add(self, container, spec):
+        # Placeholder dipasang sekarang agar urutan halaman tetap terjaga
+        slot = container.empty()
+        slot.caption("Memuat grafik...")
+        self._slots.append((slot, spec))
+
+    def _key(self, spec):
+        return (spec.chart_id, self._context, spec.params)
+
+    def render(self):
+        # Tanpa JSON_EMIT, figure dibangun paralel tetapi diserialisasi oleh
+        # st.bokeh_chart di thread skrip, dan cache JSON tidak dipakai
+        cache = self._cache if JSON_EMIT else None
+        futures = {}
+        for slot, spec in self._slots:
+            cached = cache.get(self._key(spec)) if cache is not None else None
+            if cached is not None:
+                emit_chart(slot, cached, spec.use_container_width)
+            else:
+                futures[self._executor.submit(spec.render, JSON_EMIT)] = (slot, spec)
+        self._slots = []
+        for future in as_completed(futures):
+            slot, spec = futures[future]
+            chart = future.result()
+            if cache is not None:
+                cache.put(self._key(spec), chart)
+            emit_chart(slot, chart, spec.use_container_width)
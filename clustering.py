@@ -0,0 +1,113 @@
+# Mesin clustering di dalam aplikasi.
+#
+# Mengulang pipeline notebook (StandardScaler -> clustering -> PCA ->
+# silhouette) untuk data yang diunggah, dengan mode yang skalabel untuk data
+# besar. Pekerjaan dijalankan di thread pool terpisah dari thread skrip
+# Streamlit, dan hasilnya di-cache per (dataset, mode, k) untuk semua sesi.
+# scikit-learn diimpor di dalam fungsi: app.py mengimpor modul ini untuk
+# FEATURES/MODES di setiap halaman, sedangkan sklearn hanya dibutuhkan saat
+# clustering benar-benar dijalankan.
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Fitur yang sama dengan sel "FITUR UNTUK CLUSTERING" di notebook
+FEATURES = [
+    "Total Energy Consumption (TWh)",
+    "Per Capita Energy Use (kWh)",
+    "Renewable Energy Share (%)",
+    "Fossil Fuel Dependency (%)",
+    "Carbon Emissions (Million Tons)",
+    "Energy Price Index (USD/kWh)"
+]
+
+MODES = {
+    "minibatch": "MiniBatch K-Means",
+    "birch": "BIRCH (CF-tree)",
+    "agglomerative": "Agglomerative (eksak)",
+}
+# Agglomerative butuh memori O(n^2); di atas batas ini pakai mode skalabel
+AGGLOMERATIVE_MAX_ROWS = 20000
+SILHOUETTE_SAMPLE = 5000
+RANDOM_STATE = 42
+
+
+class ClusteringResult:
+    def __init__(self, frame, silhouette, mode, k):
+        self.frame = frame
+        self.silhouette = silhouette
+        self.mode = mode
+        self.k = k
+
+
+def _make_model(mode, k):
+    from sklearn.cluster import AgglomerativeClustering, Birch, MiniBatchKMeans
+
+    if mode == "minibatch":
+        return MiniBatchKMeans(n_clusters=k, batch_size=4096, n_init=3, random_state=RANDOM_STATE)
+    if mode == "birch":
+        # threshold pada ruang terstandardisasi; cukup besar agar CF-tree tetap kecil
+        return Birch(n_clusters=k, threshold=1.0)
+    if mode == "agglomerative":
+        return AgglomerativeClustering(n_clusters=k)
+    raise ValueError(f"Mode clustering tidak dikenal: {mode}")
+
+
+def cluster_frame(frame, k=3, mode="minibatch"):
+    # Kembalikan salinan baris lengkap (tanpa NaN pada FEATURES) dengan kolom
+    # Cluster, PC1 dan PC2, seperti hasil_agglo_clustering.csv.
+    from sklearn.decomposition import PCA
+    from sklearn.metrics import silhouette_score
+    from sklearn.preprocessing import StandardScaler
+
+    missing = [col for col in FEATURES if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Kolom fitur tidak ditemukan: {', '.join(missing)}")
+    data = frame.dropna(subset=FEATURES).reset_index(drop=True)
+    if len(data) <= k:
+        raise ValueError(f"Data terlalu sedikit untuk {k} klaster.")
+    if mode == "agglomerative" and len(data) > AGGLOMERATIVE_MAX_ROWS:
+        mode = "minibatch"
+
+    X_scaled = StandardScaler().fit_transform(data[FEATURES].to_numpy(dtype=np.float64))
+    labels = _make_model(mode, k).fit_predict(X_scaled)
+    X_pca = PCA(n_components=2, random_state=RANDOM_STATE).fit_transform(X_scaled)
+
+    silhouette = np.nan
+    if len(np.unique(labels)) > 1:
+        # Estimasi dari sampel acak: silhouette penuh juga O(n^2)
+        silhouette = silhouette_score(
+            X_scaled, labels,
+            sample_size=min(len(data), SILHOUETTE_SAMPLE),
+            random_state=RANDOM_STATE,
+        )
+
+    # Layout ringkas yang sama dengan data_store.compact_frame
+    data["Cluster"] = pd.Categorical(labels.astype(str))
+    data["PC1"] = X_pca[:, 0].astype(np.float32)
+    data["PC2"] = X_pca[:, 1].astype(np.float32)
+    return ClusteringResult(data, float(silhouette), mode, k)
+
+
+class ClusteringEngine:
+    def __init__(self, max_workers=2, max_results=8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="clustering")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_results = max_results
+
+    def submit(self, frame, dataset_key, k=3, mode="minibatch"):
+        # Permintaan identik (juga dari sesi lain) berbagi Future yang sama
+        key = (dataset_key, mode, k)
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(cluster_frame, frame, k, mode)
+                self._jobs[key] = future
+            self._jobs.move_to_end(key)
+            while len(self._jobs) > self._max_results:
+                self._jobs.popitem(last=False)
+        return future
@@ -0,0 +1,399 @@
+# Kubus agregat (Year x Country x Cluster) untuk semua fitur numerik.
+#
+# Setiap sel terisi menyimpan jumlah baris, sum, count (nilai non-NaN) dan sum
+# of squares per fitur. Sel kosong tidak disimpan, jadi ukuran kubus mengikuti
+# jumlah kombinasi yang benar-benar ada di data (penting untuk ratusan ribu
+# entitas). Filter sidebar cukup memilih sel, lalu rata-rata, ranking top-N, dan
+# proporsi donut dihitung dari jumlah per grup (np.add.reduceat); data mentah
+# tidak perlu discan ulang untuk setiap grafik.
+#
+# CorrelationCube memakai sel yang sama untuk menyimpan co-moment sehingga
+# heatmap korelasi juga tidak perlu memindai data mentah. HistogramCube
+# menyimpan histogram per sel untuk histogram dan box plot halaman Eksplorasi.
+#
+# AggregateCube dan CorrelationCube bisa digabung (merge) dengan kubus dari baris
+# tambahan, jadi data yang di-append cukup diagregasi untuk baris barunya saja.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ("Year", "Country", "Cluster")
+
+
+def _group_sum(keys, *arrays):
+    # Jumlahkan baris setiap array per kunci: (kunci unik terurut, [jumlah per array])
+    if not len(keys):
+        return keys, [np.zeros((0,) + a.shape[1:], dtype=a.dtype) for a in arrays]
+    if np.any(keys[1:] < keys[:-1]):
+        order = np.argsort(keys, kind="stable")
+        keys, arrays = keys[order], [a[order] for a in arrays]
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    return keys[starts], [np.add.reduceat(a, starts, axis=0) for a in arrays]
+
+
+class _CellIndex:
+    # Pemetaan setiap baris ke sel (Year, Country, Cluster); dipakai bersama
+    # oleh semua kubus. Hanya sel yang memiliki baris yang disimpan: cells
+    # berisi indeks datar sel (unik, terurut), codes posisi sumbunya, dan array
+    # statistik subclass sejajar dengan cells. Memori mengikuti jumlah sel
+    # terisi, bukan tahun x negara x klaster.
+    def __init__(self, frame, cluster_col=None):
+        country = frame["Country"]
+        if not isinstance(country.dtype, pd.CategoricalDtype):
+            country = country.astype("category")
+        self.years = np.unique(frame["Year"].to_numpy())
+        self.countries = np.asarray(country.cat.categories.astype(str))
+        if cluster_col is None:
+            self.clusters = np.array(["all"])
+            cluster_idx = np.zeros(len(frame), dtype=np.int64)
+        else:
+            labels = frame[cluster_col].astype(str).to_numpy()
+            self.clusters, cluster_idx = np.unique(labels, return_inverse=True)
+
+        year_idx = np.searchsorted(self.years, frame["Year"].to_numpy())
+        country_idx = country.cat.codes.to_numpy().astype(np.int64)
+        self.shape = (len(self.years), len(self.countries), len(self.clusters))
+        self.keep = country_idx >= 0
+        flat = np.ravel_multi_index(
+            (year_idx[self.keep], country_idx[self.keep], cluster_idx[self.keep]), self.shape
+        )
+        # inverse: posisi sel untuk setiap baris (hanya dipakai saat membangun)
+        self.cells, self.inverse = np.unique(flat, return_inverse=True)
+        self._set_codes()
+
+    def _set_codes(self):
+        self.codes = np.unravel_index(self.cells, self.shape)
+
+    def _merged_shell(self, other):
+        # Kubus kosong dengan sumbu gabungan, dan indeks datar sel self lalu
+        # other di dalamnya (sejajar dengan concatenate array keduanya)
+        merged = object.__new__(type(self))
+        keys = []
+        axes = [np.union1d(mine, theirs) for mine, theirs in (
+            (self.years, other.years), (self.countries, other.countries), (self.clusters, other.clusters))]
+        merged.years, merged.countries, merged.clusters = axes
+        merged.shape = tuple(len(axis) for axis in axes)
+        # keep/inverse hanya dipakai saat membangun dari frame
+        merged.keep = merged.inverse = None
+        for cube in (self, other):
+            codes = [np.searchsorted(union, axis)[code]
+                     for union, axis, code in zip(axes, (cube.years, cube.countries, cube.clusters), cube.codes)]
+            keys.append(np.ravel_multi_index(tuple(codes), merged.shape))
+        return merged, np.concatenate(keys)
+
+    def _axis_masks(self, year_range=None, countries=None, clusters=None):
+        year_mask = np.ones(len(self.years), dtype=bool)
+        if year_range is not None:
+            year_mask = (self.years >= year_range[0]) & (self.years <= year_range[1])
+        # Lookup hash (pd.Index.isin): np.isin pada string melambat drastis
+        # untuk pilihan ribuan negara
+        country_mask = np.ones(len(self.countries), dtype=bool)
+        if countries is not None:
+            country_mask = pd.Index(self.countries).isin([str(c) for c in countries])
+        cluster_mask = np.ones(len(self.clusters), dtype=bool)
+        if clusters is not None:
+            cluster_mask = pd.Index(self.clusters).isin([str(c) for c in clusters])
+        return year_mask, country_mask, cluster_mask
+
+    def _cell_mask(self, year_range=None, countries=None, clusters=None):
+        # Sel terisi yang lolos filter
+        masks = self._axis_masks(year_range, countries, clusters)
+        return masks[0][self.codes[0]] & masks[1][self.codes[1]] & masks[2][self.codes[2]]
+
+
+class AggregateCube(_CellIndex):
+    def __init__(self, frame, cluster_col=None):
+        super().__init__(frame, cluster_col)
+        self.features = [
+            col for col in frame.select_dtypes(include="number").columns
+            if col not in ("Year", cluster_col)
+        ]
+        n, inverse = len(self.cells), self.inverse
+        values = frame[self.features].to_numpy(dtype=np.float64)[self.keep]
+        valid = ~np.isnan(values)
+
+        self.rows = np.bincount(inverse, minlength=n)
+        self.sum = np.zeros((n, len(self.features)))
+        self.count = np.zeros_like(self.sum)
+        self.sumsq = np.zeros_like(self.sum)
+        for f in range(len(self.features)):
+            idx, v = inverse[valid[:, f]], values[valid[:, f], f]
+            self.sum[:, f] = np.bincount(idx, weights=v, minlength=n)
+            self.count[:, f] = np.bincount(idx, minlength=n)
+            self.sumsq[:, f] = np.bincount(idx, weights=v * v, minlength=n)
+
+    def select(self, year_range=None, countries=None, clusters=None):
+        return CubeSlice(self, self._cell_mask(year_range, countries, clusters))
+
+    def merge(self, other):
+        # Kubus baru = self + other (mis. kubus dari baris yang baru di-append)
+        if other.features != self.features:
+            raise ValueError("Fitur kubus tidak sama")
+        merged, keys = self._merged_shell(other)
+        merged.features = self.features
+        names = ("rows", "sum", "count", "sumsq")
+        merged.cells, sums = _group_sum(keys, *(np.concatenate([getattr(self, name), getattr(other, name)])
+                                                for name in names))
+        for name, values in zip(names, sums):
+            setattr(merged, name, values)
+        merged._set_codes()
+        return merged
+
+
+class CorrelationCube(_CellIndex):
+    # Co-moment per sel: n, sum x, dan sum x*y untuk setiap pasangan kolom
+    # (segitiga atas saja, cross[:, p] untuk pasangan pairs[p]). Matriks
+    # Pearson untuk filter apa pun = jumlah sel terpilih, lalu beberapa operasi
+    # matriks kecil. Baris dengan NaN di salah satu kolom diabaikan (listwise,
+    # seperti dropna di notebook). Hasil di-memo per filter.
+    def __init__(self, frame, columns, cluster_col=None, memo_size=64):
+        super().__init__(frame, cluster_col)
+        self.columns = list(columns)
+        self.pairs = np.triu_indices(len(self.columns))
+        values = frame[self.columns].to_numpy(dtype=np.float64)[self.keep]
+        complete = ~np.isnan(values).any(axis=1)
+        values, inverse = values[complete], self.inverse[complete]
+        # Dipusatkan pada rata-rata global agar sum x*y tidak kehilangan presisi
+        self.center = values.mean(axis=0) if len(values) else np.zeros(len(self.columns))
+        values = values - self.center
+        n = len(self.cells)
+
+        self.n = np.bincount(inverse, minlength=n).astype(np.float64)
+        self.sum = np.zeros((n, len(self.columns)))
+        self.cross = np.zeros((n, len(self.pairs[0])))
+        for i in range(len(self.columns)):
+            self.sum[:, i] = np.bincount(inverse, weights=values[:, i], minlength=n)
+        for p, (i, j) in enumerate(zip(*self.pairs)):
+            self.cross[:, p] = np.bincount(inverse, weights=values[:, i] * values[:, j], minlength=n)
+        self._init_memo(memo_size)
+
+    def _init_memo(self, memo_size):
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    def merge(self, other):
+        # Co-moment other digeser ke pusat self: sum(x-c) = sum(x-c') + n(c'-c),
+        # sum(x-c)(y-c) = cross' + d sum(y-c') + e sum(x-c') + n d e
+        if other.columns != self.columns:
+            raise ValueError("Kolom kubus tidak sama")
+        merged, keys = self._merged_shell(other)
+        merged.columns = self.columns
+        merged.pairs = self.pairs
+        merged.center = self.center
+        shift = other.center - self.center
+        i, j = self.pairs
+        n = other.n[:, None]
+        total = other.sum + n * shift
+        cross = other.cross + other.sum[:, i] * shift[j] + shift[i] * other.sum[:, j] + n * (shift[i] * shift[j])
+        merged.cells, (merged.n, merged.sum, merged.cross) = _group_sum(
+            keys, np.concatenate([self.n, other.n]), np.concatenate([self.sum, total]),
+            np.concatenate([self.cross, cross]))
+        merged._set_codes()
+        merged._init_memo(self._memo_size)
+        return merged
+
+    def corr(self, year_range=None, countries=None, clusters=None, columns=None):
+        # Setara frame_terfilter[columns].corr() untuk filter yang sama
+        key = (
+            tuple(year_range) if year_range is not None else None,
+            tuple(sorted(map(str, countries))) if countries is not None else None,
+            tuple(sorted(map(str, clusters))) if clusters is not None else None,
+        )
+        with self._lock:
+            matrix = self._memo.get(key)
+            if matrix is not None:
+                self._memo.move_to_end(key)
+        if matrix is None:
+            matrix = self._pearson(self._cell_mask(year_range, countries, clusters))
+            with self._lock:
+                self._memo[key] = matrix
+                while len(self._memo) > self._memo_size:
+                    self._memo.popitem(last=False)
+        if columns is not None:
+            matrix = matrix.loc[list(columns), list(columns)]
+        return matrix.copy()
+
+    def _pearson(self, mask):
+        k = len(self.columns)
+        n = self.n[mask].sum()
+        total = self.sum[mask].sum(axis=0)
+        cross = np.zeros((k, k))
+        cross[self.pairs] = self.cross[mask].sum(axis=0)
+        cross[self.pairs[::-1]] = cross[self.pairs]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = cross - np.outer(total, total) / n
+            std = np.sqrt(np.diag(cov))
+            corr = cov / np.outer(std, std)
+        if n < 2:
+            corr[:] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class HistogramCube(_CellIndex):
+    # Histogram per sel dengan tepi bin global per kolom. Histogram 30 bin
+    # dan kuartil box plot untuk filter apa pun diturunkan dari jumlah sel
+    # terpilih. Per kolom hanya bin yang terisi yang disimpan (posisi sel, bin,
+    # count), jadi jumlah entri tidak pernah melebihi jumlah baris valid maupun
+    # sel x bin. Bin halus (kelipatan 30, sampai 8x) hanya dipakai selama
+    # perkiraan jumlah entri tetap di bawah MAX_ENTRIES.
+    MAX_ENTRIES = 20_000_000
+
+    def __init__(self, frame, columns, cluster_col=None, plot_bins=30):
+        super().__init__(frame, cluster_col)
+        self.columns = list(columns)
+        self.plot_bins = plot_bins
+        n_cells = len(self.cells)
+        values = frame[self.columns].to_numpy(dtype=np.float64)[self.keep]
+
+        def entries(factor):
+            return len(self.columns) * min(len(values), n_cells * plot_bins * factor)
+        factor = next((f for f in range(8, 1, -1) if entries(f) <= self.MAX_ENTRIES), 1)
+        self.bins = plot_bins * factor
+
+        self.edges = []
+        self.entries = []
+        for f in range(len(self.columns)):
+            v = values[:, f]
+            valid = ~np.isnan(v)
+            lo, hi = (v[valid].min(), v[valid].max()) if valid.any() else (0.0, 1.0)
+            if lo == hi:
+                lo, hi = lo - 0.5, hi + 0.5
+            edges = np.linspace(lo, hi, self.bins + 1)
+            self.edges.append(edges)
+            bin_idx = np.clip(np.searchsorted(edges, v[valid], side="right") - 1, 0, self.bins - 1)
+            keys = self.inverse[valid] * self.bins + bin_idx
+            if n_cells * self.bins <= self.MAX_ENTRIES:
+                dense = np.bincount(keys, minlength=n_cells * self.bins)
+                keys = np.flatnonzero(dense)
+                counts = dense[keys]
+            else:
+                keys, counts = np.unique(keys, return_counts=True)
+            # (posisi sel, bin, count) untuk setiap bin terisi
+            self.entries.append((keys // self.bins, (keys % self.bins).astype(np.int16), counts.astype(np.int32)))
+
+    def _selected(self, year_range, countries, clusters):
+        mask = self._cell_mask(year_range, countries, clusters)
+        counts = np.zeros((len(self.columns), self.bins), dtype=np.int64)
+        for f, (cells, bins, cell_counts) in enumerate(self.entries):
+            keep = mask[cells]
+            counts[f] = np.bincount(bins[keep], weights=cell_counts[keep], minlength=self.bins)
+        return counts
+
+    def histograms(self, year_range=None, countries=None, clusters=None):
+        # {kolom: (counts, edges)} dengan plot_bins bin
+        counts = self._selected(year_range, countries, clusters)
+        factor = self.bins // self.plot_bins
+        return {
+            col: (counts[f].reshape(self.plot_bins, factor).sum(axis=1), self.edges[f][::factor])
+            for f, col in enumerate(self.columns)
+        }
+
+    def box_stats(self, year_range=None, countries=None, clusters=None):
+        # Statistik untuk Axes.bxp: kuartil diinterpolasi dari CDF histogram,
+        # whisker 1.5 IQR, dan outlier diwakili titik tengah bin di luar whisker.
+        counts = self._selected(year_range, countries, clusters)
+        stats = []
+        for f, col in enumerate(self.columns):
+            c, edges = counts[f], self.edges[f]
+            total = c.sum()
+            if total == 0:
+                continue
+            cdf = np.concatenate([[0], np.cumsum(c)]) / total
+            q1, med, q3 = np.interp([0.25, 0.5, 0.75], cdf, edges)
+            iqr = q3 - q1
+            nonzero = np.nonzero(c)[0]
+            lower, upper = edges[nonzero], edges[nonzero + 1]
+            centers = (lower + upper) / 2
+            inside = (lower >= q1 - 1.5 * iqr) & (upper <= q3 + 1.5 * iqr)
+            whislo = lower[inside].min() if inside.any() else q1
+            whishi = upper[inside].max() if inside.any() else q3
+            stats.append({
+                "label": col, "q1": q1, "med": med, "q3": q3,
+                "whislo": min(whislo, q1), "whishi": max(whishi, q3),
+                "fliers": centers[~inside],
+            })
+        return stats
+
+
+class CubeSlice:
+    def __init__(self, cube, mask):
+        self.features = cube.features
+        self.labels = {"Year": cube.years, "Country": cube.countries, "Cluster": cube.clusters}
+        self.shape = cube.shape
+        self.codes = tuple(code[mask] for code in cube.codes)
+        self.rows = cube.rows[mask]
+        self.sum = cube.sum[mask]
+        self.count = cube.count[mask]
+        self.sumsq = cube.sumsq[mask]
+
+    def __len__(self):
+        return int(self.rows.sum())
+
+    def _reduce(self, by):
+        # Jumlah per grup dimensi by (urutan DIMENSIONS): (kode sumbu per grup, rows, sum, count, sumsq)
+        dims = [i for i, dim in enumerate(DIMENSIONS) if dim in by]
+        shape = tuple(self.shape[i] for i in dims)
+        keys = np.ravel_multi_index(tuple(self.codes[i] for i in dims), shape) if dims else np.zeros(len(self.rows), dtype=np.int64)
+        keys, sums = _group_sum(keys, self.rows, self.sum, self.count, self.sumsq)
+        codes = np.unravel_index(keys, shape) if dims else ()
+        return (codes, *sums)
+
+    def _columns(self, features):
+        if isinstance(features, str):
+            features = [features]
+        return list(features), [self.features.index(f) for f in features]
+
+    def count_by(self, by):
+        # Jumlah baris per grup, setara df.groupby(by).size() (grup kosong dibuang)
+        codes, rows, _, _, _ = self._reduce((by,))
+        present = rows > 0
+        return pd.DataFrame({by: self.labels[by][codes[0][present]], "count": rows[present]})
+
+    def present(self, dim):
+        # Label dimensi yang memiliki minimal satu baris setelah filter
+        codes, rows, _, _, _ = self._reduce((dim,))
+        return self.labels[dim][codes[0][rows > 0]].tolist()
+
+    def mean(self, feature):
+        _, f = self._columns(feature)
+        total, count = self.sum[:, f[0]].sum(), self.count[:, f[0]].sum()
+        return total / count if count else np.nan
+
+    def mean_by(self, by, features):
+        # Setara df.groupby(by)[features].mean().reset_index()
+        if isinstance(by, str):
+            by = [by]
+        by = [dim for dim in DIMENSIONS if dim in by]
+        names, f = self._columns(features)
+        codes, rows, total, count, _ = self._reduce(by)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = total[:, f] / count[:, f]
+        present = rows > 0
+        out = pd.DataFrame({dim: self.labels[dim][code[present]] for dim, code in zip(by, codes)})
+        for j, name in enumerate(names):
+            out[name] = means[present, j]
+        return out
+
+    def std_by(self, by, features):
+        # Standar deviasi sampel (ddof=1) dari sum dan sum of squares
+        if isinstance(by, str):
+            by = [by]
+        by = [dim for dim in DIMENSIONS if dim in by]
+        names, f = self._columns(features)
+        codes, rows, total, count, sumsq = self._reduce(by)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            n = count[:, f]
+            var = (sumsq[:, f] - total[:, f] ** 2 / n) / (n - 1)
+        present = rows > 0
+        out = pd.DataFrame({dim: self.labels[dim][code[present]] for dim, code in zip(by, codes)})
+        for j, name in enumerate(names):
+            out[name] = np.sqrt(np.clip(var[present, j], 0, None))
+        return out
+
+    def top_n(self, by, feature, n=10):
+        means = self.mean_by(by, feature)
+        return means.sort_values(by=feature, ascending=False).head(n)
@@ -0,0 +1,426 @@
+# Data store kolumnar untuk CSV yang dipakai app.py.
+#
+# Setiap CSV dikonversi sekali menjadi kolom NumPy (.npy) di direktori
+# `.datastore/`, lalu dibuka dengan memory-map (read-only). Kolom teks seperti
+# `Country` disimpan sebagai kode integer + kamus kategori. Konversi ulang hanya
+# terjadi bila mtime/ukuran file sumber berubah DAN isi file (hash) berbeda.
+#
+# File unggahan dibaca per chunk dengan skema eksplisit (Country kategori, Year
+# int16, fitur float32) dan kolomnya divalidasi di awal terhadap layout
+# global_energy_consumption.csv, sehingga memori puncak tetap terbatas.
+#
+# Semua frame memakai layout ringkas yang sama (compact_frame): Country dan
+# Cluster kategori, Year int16, metrik float32, dan baris terurut per Year.
+# Urutan ini membuat filter rentang tahun cukup berupa irisan (view) tanpa
+# salinan; lihat filter_view.
+#
+# append_store menambahkan baris baru (tahun terbaru) ke CSV dan ke store yang
+# sudah ada tanpa membangun ulang: kolom .npy diperpanjang di tempat, dan
+# manifest mencatat segmen (jumlah baris + stamp) setiap versi sehingga app.py
+# bisa memperbarui agregat hanya dari baris baru (frame.attrs["segments"]).
+# Store yang diperpanjang dipindah ke path berbasis stamp (_appended_path)
+# karena path digest menyatakan isi CSV sebelum append; CSV lama yang
+# dikembalikan (checkout, rollback) lalu dibangun ulang, bukan membuka store
+# yang sudah berisi baris tambahan.
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = ".datastore"
+# Naikkan bila layout di disk berubah agar store lama dibangun ulang
+STORE_FORMAT = 2
+CATEGORICAL_COLUMNS = ("Country", "Cluster")
+REQUIRED_COLUMNS = ("Country", "Year")
+INGEST_CHUNK_ROWS = 100_000
+_MANIFEST = "manifest.json"
+
+
+def invalid_years(values):
+    # Mask Year yang berubah nilai bila di-cast ke int16: pecahan (2001.5) atau
+    # di luar rentang int16. NaN tidak termasuk (ditangani sebagai Year kosong).
+    values = np.asarray(values, dtype=np.float64)
+    info = np.iinfo(np.int16)
+    with np.errstate(invalid="ignore"):
+        return ~np.isnan(values) & ((values != np.floor(values)) | (values < info.min) | (values > info.max))
+
+
+def year_array(values):
+    # Cast Year ke int16 tanpa pemotongan/wrap diam-diam
+    values = np.asarray(values, dtype=np.float64)
+    bad = invalid_years(values)
+    if bad.any():
+        raise ValueError(
+            f"Kolom Year berisi {int(bad.sum()):,} nilai yang bukan tahun bulat dalam rentang "
+            f"int16 (mis. {values[bad][0]:g})."
+        )
+    return values.astype(np.int16)
+
+
+def source_stamp(csv_path):
+    # Penanda murah (tanpa membaca isi file) untuk kunci cache di app.py
+    stat = os.stat(csv_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_digest(csv_path):
+    digest = hashlib.sha1()
+    with open(csv_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_root(csv_path):
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), STORE_DIR)
+
+
+def _index_path(csv_path):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(_store_root(csv_path), f"{stem}.json")
+
+
+def _store_path(csv_path, digest):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(_store_root(csv_path), f"{stem}-v{STORE_FORMAT}-{digest[:16]}")
+
+
+def _appended_path(csv_path, stamp):
+    # Tidak pernah sama dengan _store_path: isinya tidak diwakili digest mana pun
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(_store_root(csv_path), f"{stem}-v{STORE_FORMAT}-append-{stamp[0]}-{stamp[1]}")
+
+
+def _write_json(path, payload):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def compact_frame(df):
+    data = {}
+    for col in df.columns:
+        values = df[col]
+        if col in CATEGORICAL_COLUMNS or not pd.api.types.is_numeric_dtype(values):
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("category")
+            values = values.cat.rename_categories(values.cat.categories.astype(str))
+        elif col == "Year" and values.notna().all():
+            values = pd.Series(year_array(values), index=values.index, name=col)
+        elif pd.api.types.is_float_dtype(values):
+            values = values.astype(np.float32)
+        data[col] = values
+    frame = pd.DataFrame(data)
+    if "Year" in frame.columns:
+        frame = frame.sort_values("Year", kind="stable", ignore_index=True)
+    return frame
+
+
+def filter_view(frame, year_range, countries=None):
+    # frame harus terurut per Year (dijamin oleh compact_frame/ingest_csv):
+    # rentang tahun dipotong dengan searchsorted sehingga hasilnya view, dan
+    # view dikembalikan tanpa salinan bila semua barisnya lolos filter negara.
+    years = frame["Year"].to_numpy()
+    start = np.searchsorted(years, year_range[0], side="left")
+    stop = np.searchsorted(years, year_range[1], side="right")
+    view = frame.iloc[start:stop]
+    if countries is None:
+        return view
+    keep = view["Country"].isin(countries).to_numpy()
+    return view if keep.all() else view[keep]
+
+
+def memory_report(frames):
+    # Rincian memori per frame. Buffer memory-map dan buffer yang sudah dihitung
+    # pada frame sebelumnya (mis. view hasil filter) masuk kolom "Dibagi / view".
+    seen = set()
+    rows = []
+    for name, frame in frames.items():
+        own = shared = 0
+        local = set()
+        for col in frame.columns:
+            values = frame[col].array
+            arr = values.codes if isinstance(values, pd.Categorical) else np.asarray(values)
+            root = arr
+            while isinstance(root.base, np.ndarray):
+                root = root.base
+            if isinstance(root, np.memmap) or id(root) in seen:
+                shared += arr.nbytes
+            elif id(root) not in local:
+                # Blok 2D pandas: beberapa kolom berbagi satu buffer, hitung sekali
+                local.add(id(root))
+                own += root.nbytes
+        seen |= local
+        rows.append({"Frame": name, "Baris": len(frame),
+                     "Memori sendiri (MB)": round(own / 2**20, 3),
+                     "Dibagi / view (MB)": round(shared / 2**20, 3)})
+    return pd.DataFrame(rows)
+
+
+def write_store(df, store_path):
+    # Tulis ke direktori sementara lalu rename agar pembaca lain tidak pernah
+    # melihat store yang setengah jadi.
+    root = os.path.dirname(store_path)
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=root, prefix=".build-")
+    columns = []
+    for i, col in enumerate(df.columns):
+        fname = f"col{i:03d}.npy"
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            cat = values
+            np.save(os.path.join(tmp_dir, fname), cat.cat.codes.to_numpy())
+            columns.append({"name": col, "file": fname, "kind": "category",
+                            "categories": cat.cat.categories.astype(str).tolist()})
+        else:
+            np.save(os.path.join(tmp_dir, fname), values.to_numpy())
+            columns.append({"name": col, "file": fname, "kind": "numeric"})
+    _write_json(os.path.join(tmp_dir, _MANIFEST), {"columns": columns, "rows": len(df)})
+    try:
+        os.rename(tmp_dir, store_path)
+    except OSError:
+        # Proses lain sudah membangun store yang sama lebih dulu
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def read_store(store_path):
+    with open(os.path.join(store_path, _MANIFEST)) as f:
+        manifest = json.load(f)
+    rows = manifest["rows"]
+    data = {}
+    for col in manifest["columns"]:
+        # Manifest menentukan jumlah baris; append yang terputus bisa
+        # meninggalkan kolom lebih panjang
+        values = np.load(os.path.join(store_path, col["file"]), mmap_mode="r")[:rows]
+        if col["kind"] == "category":
+            dtype = pd.CategoricalDtype(col["categories"])
+            values = pd.Categorical.from_codes(values, dtype=dtype)
+        data[col["name"]] = values
+    frame = pd.DataFrame(data, copy=False)
+    frame.attrs["segments"] = manifest.get("segments", [])
+    return frame
+
+
+def _prune(csv_path, keep):
+    root = _store_root(csv_path)
+    prefix = os.path.splitext(os.path.basename(csv_path))[0] + "-"
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(prefix) and path != keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def open_store(csv_path):
+    # Kembalikan DataFrame read-only yang kolomnya di-memory-map dari store.
+    index_path = _index_path(csv_path)
+    stamp = list(source_stamp(csv_path))
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+    if (index is not None and index.get("format") == STORE_FORMAT
+            and index["stamp"] == stamp and os.path.isdir(index["path"])):
+        try:
+            return read_store(index["path"])
+        except FileNotFoundError:
+            # Store baru saja dipindah oleh append_store; cari lewat digest
+            pass
+
+    digest = file_digest(csv_path)
+    store_path = _store_path(csv_path, digest)
+    if not os.path.isdir(store_path):
+        write_store(compact_frame(pd.read_csv(csv_path)), store_path)
+        _prune(csv_path, store_path)
+    _write_json(index_path, {"format": STORE_FORMAT, "stamp": stamp, "digest": digest, "path": store_path})
+    return read_store(store_path)
+
+
+def _append_npy(path, values):
+    # Perpanjang array 1D .npy di tempat. Header numpy diberi ruang agar shape
+    # bisa bertambah tanpa menggeser data; data ditulis dulu, header terakhir.
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        shape, fortran_order, dtype = np.lib.format._read_array_header(f, version)
+        header_end = f.tell()
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": fortran_order,
+                  "shape": (shape[0] + len(values),)}
+        buf = io.BytesIO()
+        np.lib.format._write_array_header(buf, header, version)
+        if buf.tell() != header_end:
+            raise ValueError("Header .npy tidak bisa diperbarui di tempat")
+        f.seek(0)
+        f.write(buf.getvalue())
+
+
+def _encode_append(manifest, store, new_rows):
+    # Array per kolom dengan dtype store; kategori baru ditambahkan ke kamus di
+    # manifest. None bila kode kategori tidak muat di dtype kode yang tersimpan.
+    columns = []
+    for col in manifest["columns"]:
+        values = new_rows[col["name"]]
+        stored = store[col["name"]]
+        if col["kind"] == "category":
+            categories = col["categories"]
+            lookup = {name: i for i, name in enumerate(categories)}
+            for name in values.dropna().astype(str).unique():
+                if name not in lookup:
+                    lookup[name] = len(categories)
+                    categories.append(name)
+            code_dtype = stored.cat.codes.dtype
+            if len(categories) - 1 > np.iinfo(code_dtype).max:
+                return None
+            codes = values.astype(str).map(lookup).where(values.notna(), -1)
+            columns.append(codes.to_numpy().astype(code_dtype))
+        else:
+            columns.append(values.to_numpy().astype(stored.dtype))
+    return columns
+
+
+def append_store(csv_path, new_rows):
+    # Tambahkan new_rows (kolom sama dengan CSV) ke CSV dan store-nya.
+    # Kembalikan True bila store diperbarui di tempat; False bila store akan
+    # dibangun ulang pada open_store berikutnya (store belum sinkron, atau baris
+    # baru tidak menjaga urutan Year).
+    index_path = _index_path(csv_path)
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+    header = read_header_path(csv_path)
+    validate_columns(list(new_rows.columns), header)
+    new_rows = new_rows[header]
+    if "Year" in header:
+        # Ditolak sebelum CSV ditulis; compact_frame akan menolak hal yang sama
+        year_array(new_rows["Year"])
+
+    in_sync = (index is not None and index.get("format") == STORE_FORMAT
+               and index["stamp"] == list(source_stamp(csv_path)) and os.path.isdir(index["path"]))
+    store = read_store(index["path"]) if in_sync else None
+    columns = None
+    if (store is not None and "Year" in header
+            and (len(store) == 0 or new_rows["Year"].min() >= store["Year"].iloc[-1])):
+        with open(os.path.join(index["path"], _MANIFEST)) as f:
+            manifest = json.load(f)
+        columns = _encode_append(manifest, store, new_rows.sort_values("Year", kind="stable"))
+
+    # CSV lebih dulu: bila proses terhenti setelah ini, stamp tidak cocok dan
+    # store dibangun ulang dari CSV yang sudah lengkap
+    with open(csv_path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    new_rows.to_csv(csv_path, mode="a", header=False, index=False)
+    if columns is None:
+        return False
+
+    # Pindahkan dulu (memory-map yang sudah terbuka tetap berlaku), baru perpanjang
+    stamp = list(source_stamp(csv_path))
+    store_path = _appended_path(csv_path, stamp)
+    os.rename(index["path"], store_path)
+    for col, values in zip(manifest["columns"], columns):
+        _append_npy(os.path.join(store_path, col["file"]), values)
+
+    segments = manifest.get("segments") or [{"rows": manifest["rows"], "stamp": index["stamp"]}]
+    manifest["rows"] += len(new_rows)
+    manifest["segments"] = segments + [{"rows": manifest["rows"], "stamp": stamp}]
+    _write_json(os.path.join(store_path, _MANIFEST), manifest)
+    # Digest isi tidak dihitung ulang (O(seluruh file)); stamp cukup untuk open_store
+    _write_json(index_path, {**index, "stamp": stamp, "digest": None, "path": store_path})
+    return True
+
+
+def read_header_path(csv_path):
+    return pd.read_csv(csv_path, nrows=0).columns.tolist()
+
+
+def read_header(csv_file):
+    # Baca hanya baris header lalu kembalikan posisi file ke awal
+    header = pd.read_csv(csv_file, nrows=0).columns.tolist()
+    csv_file.seek(0)
+    return header
+
+
+def validate_columns(columns, reference_columns):
+    missing = [col for col in reference_columns if col not in columns]
+    if missing:
+        raise ValueError(
+            "Kolom wajib tidak ditemukan: " + ", ".join(missing)
+            + ". Gunakan layout yang sama dengan global_energy_consumption.csv."
+        )
+
+
+def ingest_schema(columns):
+    return {
+        col: ("category" if col in CATEGORICAL_COLUMNS
+              else "float64" if col == "Year"
+              else "float32")
+        for col in columns
+    }
+
+
+def ingest_csv(csv_file, reference_columns, chunksize=INGEST_CHUNK_ROWS, progress=None):
+    # csv_file: objek file biner yang bisa di-seek (mis. UploadedFile Streamlit).
+    # progress(fraksi) dipanggil setelah setiap chunk.
+    # Kolom di luar layout referensi diabaikan (usecols)
+    validate_columns(read_header(csv_file), reference_columns)
+    columns = list(reference_columns)
+    csv_file.seek(0, os.SEEK_END)
+    total_bytes = max(csv_file.tell(), 1)
+    csv_file.seek(0)
+
+    # Year dibaca float dulu agar baris tanpa tahun, atau dengan tahun pecahan /
+    # di luar rentang int16, bisa dibuang (dan dihitung) sebelum cast
+    schema = ingest_schema(columns)
+    parts = {col: [] for col in columns}
+    categories = {col: {} for col in CATEGORICAL_COLUMNS if col in columns}
+    dropped = 0
+    for chunk in pd.read_csv(csv_file, usecols=columns, dtype=schema, chunksize=chunksize):
+        valid = chunk[list(REQUIRED_COLUMNS)].notna().all(axis=1) & ~invalid_years(chunk["Year"])
+        dropped += int((~valid).sum())
+        chunk = chunk[valid]
+        for col in columns:
+            values = chunk[col]
+            if col in categories:
+                # Kamus kategori global; kode per chunk dipetakan ulang ke kamus ini
+                lookup = categories[col]
+                for name in values.cat.categories:
+                    lookup.setdefault(name, len(lookup))
+                remap = np.array([lookup[name] for name in values.cat.categories], dtype=np.int32)
+                codes = values.cat.codes.to_numpy()
+                parts[col].append(np.where(codes >= 0, remap[codes] if len(remap) else codes, -1).astype(np.int32))
+            elif col == "Year":
+                parts[col].append(year_array(values))
+            else:
+                parts[col].append(values.to_numpy())
+        if progress is not None:
+            progress(min(csv_file.tell() / total_bytes, 1.0))
+
+    data = {}
+    for col in columns:
+        chunks = parts.pop(col)
+        values = np.concatenate(chunks) if chunks else np.array([])
+        if col in categories:
+            names = sorted(categories[col], key=categories[col].get)
+            order = np.argsort(names)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            codes = np.where(values >= 0, rank[values] if len(rank) else values, -1)
+            values = pd.Categorical.from_codes(codes, categories=np.asarray(names)[order])
+        elif col == "Year":
+            values = values.astype(np.int16)
+        data[col] = values
+    # Urutkan per Year seperti store default (lihat filter_view)
+    order = np.argsort(data["Year"], kind="stable")
+    for col in columns:
+        data[col] = data[col][order]
+    return pd.DataFrame(data, copy=False), dropped
@@ -0,0 +1,51 @@
+# Ekspor data hasil filter untuk tombol "Unduh Data".
+#
+# Payload hanya dibuat saat pengguna meminta unduhan, bukan di setiap rerun.
+# CSV ditulis per chunk baris langsung ke buffer biner (opsional lewat gzip),
+# jadi tidak ada string CSV penuh plus salinan bytes-nya. Parquet dan Feather
+# memakai pyarrow yang sudah menjadi dependensi Streamlit.
+import gzip
+import io
+
+EXPORT_CHUNK_ROWS = 50_000
+
+# format: (label, mime, ekstensi)
+FORMATS = {
+    "csv": ("CSV", "text/csv", ".csv"),
+    "csv.gz": ("CSV (gzip)", "application/gzip", ".csv.gz"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet", ".parquet"),
+    "feather": ("Feather", "application/vnd.apache.arrow.file", ".feather"),
+}
+
+
+def iter_csv_chunks(frame, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Bytes CSV (UTF-8) per chunk; header hanya pada chunk pertama
+    if len(frame) == 0:
+        yield frame.to_csv(index=False).encode("utf-8")
+        return
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def export_frame(frame, fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+    buf = io.BytesIO()
+    if fmt == "csv":
+        for chunk in iter_csv_chunks(frame):
+            buf.write(chunk)
+    elif fmt == "csv.gz":
+        with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6, mtime=0) as gz:
+            for chunk in iter_csv_chunks(frame):
+                gz.write(chunk)
+    elif fmt == "parquet":
+        frame.to_parquet(buf, index=False)
+    else:
+        # Feather tidak menerima index non-default (hasil filter)
+        frame.reset_index(drop=True).to_feather(buf)
+    return buf.getvalue()
+
+
+def export_file_name(stem, fmt):
+    return stem + FORMATS[fmt][2]
@@ -0,0 +1,281 @@
+# Level-of-detail untuk grafik Bokeh berbasis titik mentah.
+#
+# Data mentah (PC1/PC2 per baris, deret per negara) bisa berjumlah jutaan titik.
+# Yang dikirim ke browser bukan baris mentah, melainkan satu level "halus" yang
+# ukurannya dibatasi resolusi:
+#   - scatter: grid densitas FINE_BINS x FINE_BINS per klaster (sel kosong dibuang),
+#     dipakai sebaran PCA halaman Analisis Clustering dan peta klaster
+#     (spatial.ClusterMap),
+#   - garis: hasil LTTB (Largest-Triangle-Three-Buckets) dengan FINE_POINTS titik.
+# Tampilan awal dihitung di Python; saat zoom/pan, callback range (CustomJS)
+# menghitung ulang tampilan dari level halus untuk jendela yang terlihat, jadi
+# detail bertambah saat diperbesar tanpa round-trip ke server.
+import numpy as np
+import pandas as pd
+
+FINE_BINS = 192
+DISPLAY_BINS = (120, 80)
+FINE_POINTS = 4096
+DISPLAY_POINTS = 800
+# Di bawah batas ini titik mentah dikirim apa adanya
+RAW_POINT_LIMIT = 5000
+
+
+def lttb(x, y, n_out):
+    # Kembalikan indeks titik terpilih; x harus terurut naik
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (n_out - 2)
+    edges = np.floor(np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_stop = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_stop = n - 1, n
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        # Luas segitiga (a, kandidat, rata-rata bucket berikutnya)
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def line_levels(x, y, fine_points=FINE_POINTS, display_points=DISPLAY_POINTS):
+    # (x_halus, y_halus, x_tampil, y_tampil)
+    order = np.argsort(x, kind="stable")
+    x = np.asarray(x, dtype=np.float64)[order]
+    y = np.asarray(y, dtype=np.float64)[order]
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    fine = lttb(x, y, fine_points)
+    x, y = x[fine], y[fine]
+    shown = lttb(x, y, display_points)
+    return x, y, x[shown], y[shown]
+
+
+class DensityGrid:
+    # Grid densitas jarang: untuk setiap (sel, klaster) yang tidak kosong
+    # disimpan indeks sel ix/iy, kode klaster dan jumlah titik. Opsional:
+    #   - extent (x_min, x_max, y_min, y_max): geometri grid tetap, mis. sama
+    #     untuk semua filter,
+    #   - values (titik x fitur): jumlah fitur per entri (s{f}, NaN dilewati),
+    #   - representatives: rep_index, posisi titik terdekat ke rata-rata
+    #     posisi setiap entri (untuk hover).
+    def __init__(self, x, y, labels, categories, bins=FINE_BINS, extent=None, values=None, representatives=False):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.categories = list(categories)
+        if not isinstance(labels, pd.Categorical):
+            labels = np.asarray(labels).astype(str)
+        codes = pd.Categorical(labels, categories=self.categories).codes
+        valid = ~(np.isnan(x) | np.isnan(y)) & (codes >= 0)
+        x, y, codes = x[valid], y[valid], codes[valid].astype(np.int64)
+        self.bins = bins
+        self.total = len(x)
+        if extent is None:
+            extent = (x.min(), x.max(), y.min(), y.max()) if len(x) else (0.0, 1.0, 0.0, 1.0)
+        self.x_min, self.x_max, self.y_min, self.y_max = map(float, extent)
+        if self.x_max == self.x_min:
+            self.x_max = self.x_min + 1.0
+        if self.y_max == self.y_min:
+            self.y_max = self.y_min + 1.0
+        self.cell_w = (self.x_max - self.x_min) / bins
+        self.cell_h = (self.y_max - self.y_min) / bins
+
+        ix = np.clip(((x - self.x_min) / self.cell_w).astype(np.int64), 0, bins - 1)
+        iy = np.clip(((y - self.y_min) / self.cell_h).astype(np.int64), 0, bins - 1)
+        n_cat = max(len(self.categories), 1)
+        key = (iy * bins + ix) * n_cat + codes
+        counts = np.bincount(key, minlength=bins * bins * n_cat)
+        nonzero = np.nonzero(counts)[0]
+        self.count = counts[nonzero].astype(np.int32)
+        self.code = (nonzero % n_cat).astype(np.int16)
+        cell = nonzero // n_cat
+        self.ix = (cell % bins).astype(np.int16)
+        self.iy = (cell // bins).astype(np.int16)
+
+        entry = np.searchsorted(nonzero, key)
+        self.sums = None
+        if values is not None:
+            values = np.asarray(values, dtype=np.float64)[valid]
+            self.sums = np.zeros((len(nonzero), values.shape[1]), dtype=np.float32)
+            for f in range(values.shape[1]):
+                finite = ~np.isnan(values[:, f])
+                self.sums[:, f] = np.bincount(entry[finite], weights=values[finite, f], minlength=len(nonzero))
+        self.rep_index = None
+        if representatives:
+            mean_x = np.bincount(entry, weights=x, minlength=len(nonzero)) / self.count
+            mean_y = np.bincount(entry, weights=y, minlength=len(nonzero)) / self.count
+            dist = (x - mean_x[entry]) ** 2 + (y - mean_y[entry]) ** 2
+            ranked = np.lexsort((dist, entry))
+            first = ranked[np.searchsorted(entry[ranked], np.arange(len(nonzero)))]
+            self.rep_index = np.flatnonzero(valid)[first]
+
+    def fine_data(self, rep_columns=None):
+        # rep_columns: {nama: nilai per entri}, mis. dari titik rep_index
+        data = {"ix": self.ix, "iy": self.iy, "code": self.code, "count": self.count}
+        if self.sums is not None:
+            for f in range(self.sums.shape[1]):
+                data[f"s{f}"] = self.sums[:, f]
+        data.update(rep_columns or {})
+        return data
+
+    def js_args(self, colors, display_bins=DISPLAY_BINS, rep_columns=None):
+        return {"x_min": float(self.x_min), "y_min": float(self.y_min),
+                "cell_w": float(self.cell_w), "cell_h": float(self.cell_h),
+                "bins": self.bins, "nx": display_bins[0], "ny": display_bins[1],
+                "categories": self.categories, "colors": list(colors),
+                "nfeat": 0 if self.sums is None else self.sums.shape[1],
+                "rep_columns": list(rep_columns or {})}
+
+    def display_data(self, colors, display_bins=DISPLAY_BINS, rep_columns=None):
+        # Tampilan awal (seluruh rentang); algoritme dan kolom sama dengan REBIN_JS:
+        # jumlah per klaster n{c}, jumlah fitur per klaster s{c}_{f}, dan titik
+        # perwakilan dari entri dengan jumlah terbanyak di sel tampilan
+        step_x = max(1, int(np.ceil(self.bins / display_bins[0])))
+        step_y = max(1, int(np.ceil(self.bins / display_bins[1])))
+        cx, cy = self.ix // step_x, self.iy // step_y
+        n_cat = max(len(self.categories), 1)
+        nx = self.bins // step_x + 1
+        cells, slot = np.unique(cy.astype(np.int64) * nx + cx, return_inverse=True)
+        key = slot * n_cat + self.code
+        per_cat = np.bincount(key, weights=self.count, minlength=len(cells) * n_cat).reshape(-1, n_cat)
+        count = per_cat.sum(axis=1)
+        majority = per_cat.argmax(axis=1)
+        peak = count.max() if len(count) else 1
+        data = {
+            "x": self.x_min + ((cells % nx) + 0.5) * step_x * self.cell_w,
+            "y": self.y_min + ((cells // nx) + 0.5) * step_y * self.cell_h,
+            "w": np.full(len(cells), step_x * self.cell_w),
+            "h": np.full(len(cells), step_y * self.cell_h),
+            "count": count.astype(np.int64),
+            "Cluster": [self.categories[c] for c in majority],
+            "color": [colors[c % len(colors)] for c in majority],
+            "alpha": 0.25 + 0.75 * np.log1p(count) / np.log1p(peak),
+        }
+        for c in range(n_cat):
+            data[f"n{c}"] = per_cat[:, c].astype(np.int32)
+        if self.sums is not None:
+            for f in range(self.sums.shape[1]):
+                sums = np.bincount(key, weights=self.sums[:, f], minlength=len(cells) * n_cat).reshape(-1, n_cat)
+                for c in range(n_cat):
+                    data[f"s{c}_{f}"] = sums[:, c].astype(np.float32)
+        if rep_columns:
+            # Seri diputus oleh urutan entri, sama seperti REBIN_JS
+            order = np.lexsort((np.arange(len(slot)), -self.count, slot))
+            best = order[np.searchsorted(slot[order], np.arange(len(cells)))]
+            data["RepCluster"] = [self.categories[c] for c in self.code[best]]
+            for name, values in rep_columns.items():
+                data[name] = np.asarray(values)[best]
+        return data
+
+
+# args: fine, shown, xr, yr, lalu skalar/list dari DensityGrid.js_args (dict Python
+# menjadi Map di BokehJS, jadi dikirim satu per satu). Seleksi di shown dihapus
+# karena indeksnya tidak berlaku lagi setelah sel dihitung ulang.
+REBIN_JS = """
+const fx0 = Math.max(0, Math.floor((xr.start - x_min) / cell_w));
+const fx1 = Math.min(bins, Math.ceil((xr.end - x_min) / cell_w));
+const fy0 = Math.max(0, Math.floor((yr.start - y_min) / cell_h));
+const fy1 = Math.min(bins, Math.ceil((yr.end - y_min) / cell_h));
+if (fx1 <= fx0 || fy1 <= fy0) { return; }
+const sx = Math.max(1, Math.ceil((fx1 - fx0) / nx));
+const sy = Math.max(1, Math.ceil((fy1 - fy0) / ny));
+const ncat = Math.max(categories.length, 1);
+const cols = Math.ceil((fx1 - fx0) / sx);
+const acc = new Map();
+const ix = fine.data.ix, iy = fine.data.iy, code = fine.data.code, count = fine.data.count;
+const sums = [];
+for (let f = 0; f < nfeat; f++) { sums.push(fine.data['s' + f]); }
+for (let i = 0; i < ix.length; i++) {
+    if (ix[i] < fx0 || ix[i] >= fx1 || iy[i] < fy0 || iy[i] >= fy1) { continue; }
+    const cell = Math.floor((iy[i] - fy0) / sy) * cols + Math.floor((ix[i] - fx0) / sx);
+    let e = acc.get(cell);
+    if (e === undefined) { e = {per: new Float64Array(ncat), sums: new Float64Array(ncat * nfeat), best: i}; acc.set(cell, e); }
+    e.per[code[i]] += count[i];
+    for (let f = 0; f < nfeat; f++) { e.sums[code[i] * nfeat + f] += sums[f][i]; }
+    if (count[i] > count[e.best]) { e.best = i; }
+}
+const out = {x: [], y: [], w: [], h: [], count: [], Cluster: [], color: [], alpha: []};
+for (let c = 0; c < ncat; c++) {
+    out['n' + c] = [];
+    for (let f = 0; f < nfeat; f++) { out['s' + c + '_' + f] = []; }
+}
+if (rep_columns.length) {
+    out.RepCluster = [];
+    for (const name of rep_columns) { out[name] = []; }
+}
+let peak = 1;
+for (const e of acc.values()) { peak = Math.max(peak, e.per.reduce((s, v) => s + v, 0)); }
+for (const [cell, e] of acc) {
+    const per = e.per;
+    let total = 0, best = 0;
+    for (let c = 0; c < ncat; c++) { total += per[c]; if (per[c] > per[best]) { best = c; } }
+    out.x.push(x_min + (fx0 + (cell % cols + 0.5) * sx) * cell_w);
+    out.y.push(y_min + (fy0 + (Math.floor(cell / cols) + 0.5) * sy) * cell_h);
+    out.w.push(sx * cell_w);
+    out.h.push(sy * cell_h);
+    out.count.push(total);
+    out.Cluster.push(categories[best]);
+    out.color.push(colors[best % colors.length]);
+    out.alpha.push(0.25 + 0.75 * Math.log1p(total) / Math.log1p(peak));
+    for (let c = 0; c < ncat; c++) {
+        out['n' + c].push(per[c]);
+        for (let f = 0; f < nfeat; f++) { out['s' + c + '_' + f].push(e.sums[c * nfeat + f]); }
+    }
+    if (rep_columns.length) {
+        out.RepCluster.push(categories[code[e.best]]);
+        for (const name of rep_columns) { out[name].push(fine.data[name][e.best]); }
+    }
+}
+shown.selected.indices = [];
+shown.data = out;
+"""
+
+# args: fine, shown, xr, n_out
+LTTB_JS = """
+const xs = fine.data.x, ys = fine.data.y;
+let lo = 0, hi = xs.length;
+while (lo < hi) { const m = (lo + hi) >> 1; if (xs[m] < xr.start) { lo = m + 1; } else { hi = m; } }
+let start = Math.max(0, lo - 1);
+lo = start; hi = xs.length;
+while (lo < hi) { const m = (lo + hi) >> 1; if (xs[m] <= xr.end) { lo = m + 1; } else { hi = m; } }
+const stop = Math.min(xs.length, lo + 1);
+const n = stop - start;
+const out = {x: [], y: []};
+if (n <= n_out || n_out < 3) {
+    for (let i = start; i < stop; i++) { out.x.push(xs[i]); out.y.push(ys[i]); }
+    shown.data = out;
+    return;
+}
+const every = (n - 2) / (n_out - 2);
+let a = start;
+out.x.push(xs[a]); out.y.push(ys[a]);
+for (let i = 0; i < n_out - 2; i++) {
+    const b0 = start + Math.floor(i * every) + 1;
+    const b1 = Math.min(start + Math.floor((i + 1) * every) + 1, stop - 1);
+    const c1 = Math.min(start + Math.floor((i + 2) * every) + 1, stop);
+    let ax = 0, ay = 0;
+    for (let j = b1; j < c1; j++) { ax += xs[j]; ay += ys[j]; }
+    const cnt = Math.max(c1 - b1, 1);
+    ax /= cnt; ay /= cnt;
+    let best = b0, bestArea = -1;
+    for (let j = b0; j < b1; j++) {
+        const area = Math.abs((xs[a] - ax) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (ay - ys[a]));
+        if (area > bestArea) { bestArea = area; best = j; }
+    }
+    a = best;
+    out.x.push(xs[a]); out.y.push(ys[a]);
+}
+out.x.push(xs[stop - 1]); out.y.push(ys[stop - 1]);
+shown.data = out;
+"""
@@ -0,0 +1,205 @@
+# Rendering gambar matplotlib/seaborn untuk halaman Eksplorasi Data.
+#
+# Figure dibuat di process pool terpisah dengan backend Agg (tanpa GUI) dan
+# langsung sebagai matplotlib.figure.Figure, bukan lewat pyplot, sehingga tidak
+# ada registry figure global yang menumpuk antar-rerun: figure dibebaskan begitu
+# PNG-nya selesai ditulis. Worker hanya menerima ringkasan kecil (jumlah per
+# tahun/negara, matriks korelasi, histogram dan statistik box plot dari kubus),
+# bukan baris mentah.
+#
+# ImagePipeline mengikuti pola charts.ChartPipeline: placeholder dipasang sesuai
+# urutan halaman, PNG disimpan di ChartCache dengan kunci (id gambar, filter).
+# Pool yang rusak (worker mati karena OOM atau segfault di Agg) diganti sekali
+# per render.
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import seaborn as sns
+from matplotlib.figure import Figure
+from PIL import Image
+
+# Sama dengan pengaturan savefig st.pyplot
+SAVEFIG_KWARGS = {"format": "png", "bbox_inches": "tight", "dpi": 200}
+# st.image memperkecil gambar yang lebih lebar dari ini di setiap pemanggilan;
+# diperkecil sekali di worker agar PNG di cache bisa dikirim apa adanya.
+MAX_IMAGE_WIDTH = 2 * 730
+
+
+def _to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, **SAVEFIG_KWARGS)
+    fig.clear()
+    image = Image.open(buf)
+    if image.width <= MAX_IMAGE_WIDTH:
+        return buf.getvalue()
+    height = int(image.height * MAX_IMAGE_WIDTH / image.width)
+    out = io.BytesIO()
+    image.resize((MAX_IMAGE_WIDTH, height), resample=Image.BILINEAR).save(out, format="PNG")
+    return out.getvalue()
+
+
+def render_year_counts(payload):
+    years, counts = payload
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.bar(range(len(years)), counts, width=0.8, color=sns.color_palette("Set3", len(years)))
+    ax.set_xticks(range(len(years)))
+    ax.set_xticklabels([str(y) for y in years], rotation=45)
+    ax.set_xlabel("Year")
+    ax.set_ylabel("count")
+    ax.set_title("Distribusi Jumlah Data Per Tahun")
+    return _to_png(fig)
+
+
+def render_country_counts(payload):
+    countries, counts = payload
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.bar(range(len(countries)), counts, width=0.5, color="teal")
+    ax.set_xticks(range(len(countries)))
+    ax.set_xticklabels(countries, rotation=90)
+    ax.set_xlabel("Country")
+    ax.set_ylabel("Jumlah Data")
+    ax.set_title("10 Negara dengan Jumlah Data Terbanyak")
+    return _to_png(fig)
+
+
+def render_corr_heatmap(corr):
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+    sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
+    ax.set_title("Korelasi Antar Variabel Numerik")
+    return _to_png(fig)
+
+
+def _grid(n):
+    # Layout grid yang sama dengan DataFrame.hist
+    k = 1
+    while k ** 2 < n:
+        k += 1
+    return (k - 1, k) if (k - 1) * k >= n else (k, k)
+
+
+def render_histograms(histograms):
+    # histograms: {kolom: (counts, edges)} dari HistogramCube.histograms
+    fig = Figure(figsize=(15, 10))
+    nrows, ncols = _grid(len(histograms))
+    axes = fig.subplots(nrows, ncols, squeeze=False).ravel()
+    for ax, (col, (counts, edges)) in zip(axes, histograms.items()):
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color="salmon", edgecolor="black")
+        ax.set_title(col)
+        ax.grid(True)
+    for ax in axes[len(histograms):]:
+        fig.delaxes(ax)
+    fig.suptitle("Distribusi Fitur Numerik", fontsize=16)
+    return _to_png(fig)
+
+
+def render_boxplot(stats):
+    # stats: daftar dict untuk Axes.bxp dari HistogramCube.box_stats
+    fig = Figure(figsize=(14, 8))
+    ax = fig.subplots()
+    if stats:
+        artists = ax.bxp(
+            stats, vert=False, patch_artist=True, widths=0.8,
+            medianprops={"color": "0.3"}, whiskerprops={"color": "0.3"},
+            capprops={"color": "0.3"},
+            flierprops={"marker": "d", "markerfacecolor": "0.3", "markeredgecolor": "0.3", "markersize": 5},
+        )
+        for patch, color in zip(artists["boxes"], sns.color_palette("pastel", len(stats))):
+            patch.set_facecolor(color)
+            patch.set_edgecolor("0.3")
+        ax.invert_yaxis()
+    ax.set_title("Deteksi Outlier Pada Fitur Numerik")
+    return _to_png(fig)
+
+
+RENDERERS = {
+    "year_counts": render_year_counts,
+    "country_counts": render_country_counts,
+    "corr_heatmap": render_corr_heatmap,
+    "histograms": render_histograms,
+    "boxplot": render_boxplot,
+}
+
+
+def render(kind, payload):
+    return RENDERERS[kind](payload)
+
+
+def _start_worker():
+    # Cukup lama agar tidak ada worker yang menganggur sebelum semua dinyalakan
+    time.sleep(0.1)
+
+
+def make_render_pool(max_workers=2):
+    # forkserver, bukan fork: fork dari server Streamlit yang multithread bisa
+    # mewarisi lock yang sedang dipegang thread lain dan membuat worker macet.
+    # Worker di-fork dari proses forkserver yang bersih (satu thread) dan sudah
+    # mengimpor modul ini. app.py menandai modulnya sebagai __main__ paket
+    # (__spec__) agar worker tidak menjalankannya ulang.
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+    # Setiap submit selagi worker belum siap menyalakan satu worker
+    wait([pool.submit(_start_worker) for _ in range(max_workers)])
+    return pool
+
+
+class ImagePipeline:
+    # get_pool: fungsi st.cache_resource yang mengembalikan pool bersama (punya
+    # .clear()); context: fingerprint dataset dan filter, bagian dari kunci cache PNG
+    def __init__(self, get_pool, cache=None, context=()):
+        self._get_pool = get_pool
+        self._cache = cache
+        self._context = context
+        self._slots = []
+
+    def add(self, container, image_id, kind, prepare):
+        slot = container.empty()
+        slot.caption("Memuat grafik...")
+        self._slots.append((slot, image_id, kind, prepare))
+
+    def _key(self, image_id):
+        return (image_id, self._context)
+
+    def render(self):
+        pending = {}
+        for slot, image_id, kind, prepare in self._slots:
+            cached = self._cache.get(self._key(image_id)) if self._cache is not None else None
+            if cached is not None:
+                slot.image(cached, use_column_width=True)
+            else:
+                # Ringkasan disiapkan di thread skrip (murah, dari kubus);
+                # hanya rendering yang dikirim ke worker
+                pending[image_id] = (slot, kind, prepare())
+        self._slots = []
+        pool = self._get_pool()
+        try:
+            self._submit(pool, pending)
+        except BrokenProcessPool:
+            # Pool di cache_resource rusak permanen; ganti (kecuali sesi lain
+            # sudah menggantinya) lalu coba sekali lagi untuk gambar yang tersisa
+            pool.shutdown(wait=False, cancel_futures=True)
+            if self._get_pool() is pool:
+                self._get_pool.clear()
+            self._submit(self._get_pool(), pending)
+
+    def _submit(self, pool, pending):
+        # Gambar yang selesai dihapus dari pending
+        futures = {pool.submit(render, kind, payload): image_id
+                   for image_id, (_, kind, payload) in pending.items()}
+        for future in as_completed(futures):
+            image_id = futures[future]
+            png = future.result()
+            if self._cache is not None:
+                self._cache.put(self._key(image_id), png)
+            pending.pop(image_id)[0].image(png, use_column_width=True)
@@ -0,0 +1,223 @@
+# Pipeline batch pengganti sel clustering di Tubes_Visdat.ipynb.
+#
+# Tahap: muat + dropna -> StandardScaler -> clustering untuk beberapa k
+# (paralel, satu proses per k) -> pilih k dengan silhouette tertinggi -> PCA ->
+# tulis hasil_agglo_clustering.csv dan profil_agglo_cluster.csv.
+#
+# Setiap tahap disimpan di .pipeline/ dengan nama berisi hash dari isi
+# masukannya (digest CSV, fitur, parameter, hash tahap sebelumnya). Tahap yang
+# masukannya tidak berubah dibaca dari cache, dan hasil per k disimpan begitu
+# selesai sehingga job yang terputus bisa dilanjutkan. Output ditulis atomik
+# (file sementara lalu rename): CSV untuk notebook/aplikasi, Parquet sebagai
+# format biner, dan store kolom data_store dibangun langsung agar aplikasi tidak
+# perlu mem-parse CSV saat dibuka. Model append (append.py) di-reset dari hasil
+# baru.
+#
+# Contoh:
+#   python pipeline.py
+#   python pipeline.py --k 3 4 5 --jobs 4 --mode agglomerative
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+from append import MODEL_PATH, ClusterModel
+from clustering import AGGLOMERATIVE_MAX_ROWS, FEATURES, MODES, RANDOM_STATE, _make_model
+from data_store import file_digest, open_store
+
+CACHE_DIR = ".pipeline"
+# Naikkan bila isi tahap berubah agar cache lama tidak dipakai
+PIPELINE_VERSION = 1
+DEFAULT_K = list(range(2, 9))
+
+
+def stage_key(stage, **inputs):
+    payload = json.dumps({"stage": stage, "version": PIPELINE_VERSION, **inputs}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _atomic_write(path, write):
+    # write(path_sementara); rename setelah selesai agar pembaca tidak pernah
+    # melihat file setengah jadi
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp)
+        # mkstemp membuat file 0600; output dibaca juga oleh proses/pengguna lain
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class StageCache:
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, stage, key, ext):
+        return os.path.join(self.root, f"{stage}-{key}{ext}")
+
+    def array(self, stage, key, compute):
+        # (array, dari_cache)
+        path = self.path(stage, key, ".npy")
+        if os.path.exists(path):
+            return np.load(path), True
+        values = compute()
+        _atomic_write(path, lambda tmp: np.save(tmp, values))
+        return values, False
+
+    def load_json(self, stage, key):
+        path = self.path(stage, key, ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def save_json(self, stage, key, payload):
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump(payload, f)
+        _atomic_write(self.path(stage, key, ".json"), write)
+
+
+def fit_k(X_scaled, k, mode, silhouette_sample):
+    # Dijalankan di proses worker: label + silhouette untuk satu k
+    if mode == "agglomerative" and len(X_scaled) > AGGLOMERATIVE_MAX_ROWS:
+        mode = "minibatch"
+    start = time.perf_counter()
+    labels = _make_model(mode, k).fit_predict(X_scaled)
+    silhouette = float("nan")
+    if len(np.unique(labels)) > 1:
+        sample = None if silhouette_sample is None or silhouette_sample >= len(X_scaled) else silhouette_sample
+        silhouette = float(silhouette_score(X_scaled, labels, sample_size=sample, random_state=RANDOM_STATE))
+    return k, labels.astype(np.int32), silhouette, mode, time.perf_counter() - start
+
+
+def sweep(cache, X_scaled, scaled_key, ks, mode, jobs, silhouette_sample):
+    # {k: {"silhouette", "mode", "seconds", "key"}}; k yang sudah ada di cache tidak dihitung ulang
+    results, pending = {}, []
+    for k in ks:
+        key = stage_key("labels", scaled=scaled_key, k=k, mode=mode, silhouette_sample=silhouette_sample)
+        meta = cache.load_json("labels", key)
+        if meta is not None and os.path.exists(cache.path("labels", key, ".npy")):
+            results[k] = {**meta, "key": key, "cached": True}
+        else:
+            pending.append((k, key))
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, min(jobs, len(pending)))) as pool:
+            futures = {pool.submit(fit_k, X_scaled, k, mode, silhouette_sample): key for k, key in pending}
+            for future in as_completed(futures):
+                k, labels, silhouette, used_mode, seconds = future.result()
+                key = futures[future]
+                cache.array("labels", key, lambda: labels)
+                meta = {"k": k, "silhouette": silhouette, "mode": used_mode, "seconds": round(seconds, 3)}
+                cache.save_json("labels", key, meta)
+                results[k] = {**meta, "key": key, "cached": False}
+                print(f"  k={k:<3} silhouette {silhouette:.4f}  ({seconds:.1f} s)")
+    return results
+
+
+def best_k(results):
+    scored = {k: r["silhouette"] for k, r in results.items() if not np.isnan(r["silhouette"])}
+    if not scored:
+        raise ValueError("Tidak ada k dengan silhouette yang valid.")
+    # Seri: pilih k terkecil
+    return max(sorted(scored), key=lambda k: scored[k])
+
+
+def run_pipeline(data_path, out_dir=".", ks=DEFAULT_K, mode="agglomerative", jobs=None,
+                 silhouette_sample=None, cache_dir=CACHE_DIR):
+    cache = StageCache(os.path.join(out_dir, cache_dir))
+    jobs = jobs or os.cpu_count() or 1
+    timings = {}
+
+    start = time.perf_counter()
+    data_digest = file_digest(data_path)
+    df = pd.read_csv(data_path)
+    # Sama dengan notebook: baris dengan nilai kosong di kolom mana pun dibuang
+    keep_key = stage_key("clean", data=data_digest)
+    keep, _ = cache.array("clean", keep_key, lambda: np.flatnonzero(df.notna().all(axis=1).to_numpy()))
+    df_clean = df.iloc[keep].reset_index(drop=True)
+    timings["muat"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scaled_key = stage_key("scaled", clean=keep_key, features=FEATURES)
+    X_scaled, _ = cache.array("scaled", scaled_key, lambda: StandardScaler().fit_transform(
+        df_clean[FEATURES].to_numpy(dtype=np.float64)))
+    timings["scaler"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = sweep(cache, X_scaled, scaled_key, ks, mode, jobs, silhouette_sample)
+    k = best_k(results)
+    labels = np.load(cache.path("labels", results[k]["key"], ".npy"))
+    timings["clustering"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pca_key = stage_key("pca", scaled=scaled_key, random_state=RANDOM_STATE)
+    X_pca, _ = cache.array("pca", pca_key, lambda: PCA(
+        n_components=2, random_state=RANDOM_STATE).fit_transform(X_scaled))
+    timings["pca"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = df_clean.copy()
+    result["Cluster"] = labels
+    result["PC1"] = X_pca[:, 0]
+    result["PC2"] = X_pca[:, 1]
+    profile = result.groupby("Cluster")[FEATURES].mean().round(2)
+    write_outputs(result, profile, out_dir)
+    timings["tulis"] = time.perf_counter() - start
+    return {"k": k, "sweep": results, "rows": len(result), "timings": timings}
+
+
+def write_outputs(result, profile, out_dir):
+    agglo_path = os.path.join(out_dir, "hasil_agglo_clustering.csv")
+    _atomic_write(agglo_path, lambda tmp: result.to_csv(tmp, index=False))
+    _atomic_write(os.path.join(out_dir, "hasil_agglo_clustering.parquet"),
+                  lambda tmp: result.to_parquet(tmp, index=False))
+    _atomic_write(os.path.join(out_dir, "profil_agglo_cluster.csv"), lambda tmp: profile.to_csv(tmp))
+    _atomic_write(os.path.join(out_dir, "profil_agglo_cluster.parquet"), lambda tmp: profile.to_parquet(tmp))
+    # Store kolom untuk app.py (open_store membangunnya bila CSV berubah)
+    open_store(agglo_path)
+    # Model append.py mengikuti label baru
+    ClusterModel.fit(result).save(os.path.join(out_dir, MODEL_PATH))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jalankan pipeline clustering (pengganti sel notebook).")
+    parser.add_argument("--data", default="global_energy_consumption.csv")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_K, help="Kandidat jumlah klaster")
+    parser.add_argument("--mode", default="agglomerative", choices=list(MODES))
+    parser.add_argument("--jobs", type=int, default=None, help="Jumlah proses paralel (default: jumlah core)")
+    parser.add_argument("--silhouette-sample", type=int, default=None,
+                        help="Estimasi silhouette dari sampel (default: semua baris, seperti notebook)")
+    args = parser.parse_args()
+
+    if any(k < 2 for k in args.k):
+        parser.error("k minimal 2")
+    summary = run_pipeline(args.data, args.out_dir, sorted(set(args.k)), args.mode, args.jobs,
+                           args.silhouette_sample)
+    print(f"{summary['rows']:,} baris diklaster.")
+    for k in sorted(summary["sweep"]):
+        r = summary["sweep"][k]
+        marker = "  <- terpilih" if k == summary["k"] else ""
+        source = "cache" if r["cached"] else f"{r['seconds']:.1f} s"
+        print(f"  k={k:<3} {r['mode']:<14} silhouette {r['silhouette']:.4f}  ({source}){marker}")
+    print("Waktu per tahap: " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in summary["timings"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Layanan profil klaster untuk halaman Analisis Clustering (AI).
+#
+# Satu ClusterProfiles per dataset hasil clustering, dibagi ke semua sesi. Untuk
+# setiap filter (rentang tahun, negara) dibuat sekali sebuah ProfileView:
+#   - jumlah baris dan rata-rata fitur per klaster,
+#   - kuartil fitur per klaster (dari histogram per sel HistogramCube),
+#   - deret rata-rata per (Year, Cluster),
+#   - rata-rata per (Country, Cluster).
+# Semuanya diturunkan dari statistik cukup di kubus (jumlah dan count per sel),
+# bukan dari baris mentah, dan view disimpan di LRU kecil sehingga grafik di
+# halaman klaster cukup membaca tabel yang sudah jadi. View tampilan default
+# (semua tahun dan negara) dibuat saat konstruksi.
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class ProfileView:
+    def __init__(self, sliced, hist_cube, year_range, countries, features):
+        self.features = features
+        counts = sliced.count_by("Cluster").rename(columns={"count": "Jumlah Data"})
+        self.clusters = counts["Cluster"].tolist()
+        means = sliced.mean_by("Cluster", features)
+        self.means = counts.merge(means, on="Cluster")
+        self.by_year = sliced.mean_by(["Year", "Cluster"], features)
+        self.by_country = sliced.mean_by(["Country", "Cluster"], features)
+        self.quantiles = self._quantiles(hist_cube, year_range, countries)
+
+    def _quantiles(self, hist_cube, year_range, countries):
+        rows = []
+        if hist_cube is None:
+            return pd.DataFrame(columns=["Cluster", "Fitur", "Q1", "Median", "Q3"])
+        for cluster in self.clusters:
+            for stats in hist_cube.box_stats(year_range, countries, [cluster]):
+                if stats["label"] in self.features:
+                    rows.append({"Cluster": cluster, "Fitur": stats["label"],
+                                 "Q1": stats["q1"], "Median": stats["med"], "Q3": stats["q3"]})
+        return pd.DataFrame(rows, columns=["Cluster", "Fitur", "Q1", "Median", "Q3"])
+
+    def cluster_means(self, features):
+        if isinstance(features, str):
+            features = [features]
+        return self.means[["Cluster"] + list(features)].copy()
+
+    def cluster_row(self, cluster):
+        return self.means.set_index("Cluster").loc[cluster]
+
+    def year_series(self, feature, cluster=None):
+        series = self.by_year[["Year", "Cluster", feature]]
+        if cluster is not None:
+            series = series[series["Cluster"] == cluster]
+        return series.copy()
+
+    def country_means(self, features, cluster=None):
+        if isinstance(features, str):
+            features = [features]
+        table = self.by_country[["Country", "Cluster"] + list(features)]
+        if cluster is not None:
+            table = table[table["Cluster"] == cluster]
+        return table.copy()
+
+
+class ClusterProfiles:
+    def __init__(self, cube, hist_cube, features, memo_size=32):
+        self.cube = cube
+        self.hist_cube = hist_cube
+        self.features = [f for f in features if f in cube.features]
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+        self.default_key = (
+            (int(cube.years.min()), int(cube.years.max())) if len(cube.years) else (0, 0),
+            tuple(sorted(cube.countries.tolist())),
+        )
+        self.view(*self.default_key)
+
+    def view(self, year_range, countries):
+        key = (tuple(int(y) for y in year_range), tuple(sorted(countries)))
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        view = ProfileView(self.cube.select(key[0], list(key[1])), self.hist_cube,
+                           key[0], list(key[1]), self.features)
+        with self._lock:
+            self._memo[key] = view
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return view
@@ -0,0 +1,129 @@
+# Instrumentasi waktu dan memori per bagian skrip app.py.
+#
+# app.py adalah skrip top-level, jadi pengukuran memakai checkpoint: setiap
+# checkpoint(nama) mencatat waktu dinding dan alokasi memori sejak checkpoint
+# sebelumnya. Memori diukur dengan tracemalloc (hanya aktif saat profiling
+# dinyalakan karena memperlambat alokasi) ditambah RSS puncak proses.
+#
+# tracemalloc berlaku untuk seluruh proses, sedangkan profiling dinyalakan per
+# sesi. Setiap pemilik (id sesi) yang memprofil memegang satu lease: tracing
+# dinyalakan oleh lease pertama dan dimatikan saat lease terakhir dilepas.
+# Rerun yang terputus sebelum finish() (RerunException saat widget berubah,
+# error) tidak menambah hitungan; rerun berikutnya dari sesi yang sama memakai
+# lease yang sama, atau melepasnya bila profiling sudah dimatikan. Lease sesi
+# yang tidak pernah kembali kedaluwarsa setelah LEASE_SECONDS. reset_peak()
+# hanya dipanggil selama tidak ada sesi lain yang memprofil; selain itu kolom
+# puncak dikosongkan.
+import json
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+
+def _max_rss_mb():
+    # ru_maxrss dalam KB di Linux, byte di macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+LEASE_SECONDS = 600
+
+_lock = threading.Lock()
+# pemilik -> waktu lease terakhir diperbarui
+_leases = {}
+_owns_tracing = False
+
+
+def _sync_tracing():
+    # Dipanggil dengan _lock; tracing yang sudah aktif sebelumnya (mis.
+    # PYTHONTRACEMALLOC) tidak pernah dimatikan
+    global _owns_tracing
+    now = time.monotonic()
+    for owner, renewed in list(_leases.items()):
+        if now - renewed > LEASE_SECONDS:
+            del _leases[owner]
+    if _leases and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _owns_tracing = True
+    elif not _leases and _owns_tracing:
+        tracemalloc.stop()
+        _owns_tracing = False
+
+
+def _renew(owner):
+    # Pegang/perbarui lease; True bila pemilik ini satu-satunya yang memprofil
+    with _lock:
+        _leases[owner] = time.monotonic()
+        _sync_tracing()
+        return len(_leases) == 1
+
+
+def _release(owner):
+    with _lock:
+        _leases.pop(owner, None)
+        _sync_tracing()
+
+
+class Profiler:
+    # owner: id sesi; tanpa owner setiap Profiler memegang lease sendiri
+    def __init__(self, enabled=False, owner=None):
+        self.enabled = enabled
+        self.owner = owner if owner is not None else object()
+        self.records = []
+        # True bila sesi lain ikut memprofil selama rerun ini
+        self.shared = False
+        self._finished = False
+        if not enabled:
+            # Lepas lease dari rerun sebelumnya yang terputus sebelum finish()
+            _release(self.owner)
+            return
+        self._peak_valid = _renew(self.owner)
+        if self._peak_valid:
+            tracemalloc.reset_peak()
+        self.shared = not self._peak_valid
+        self._last_memory = tracemalloc.get_traced_memory()[0]
+        self._start = self._last = time.perf_counter()
+
+    def checkpoint(self, section):
+        if not self.enabled or self._finished:
+            return
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        sole = _renew(self.owner)
+        self.shared |= not sole
+        # Puncak hanya milik rerun ini bila reset_peak terakhir juga dilakukan olehnya
+        peak_valid = sole and self._peak_valid
+        self.records.append({
+            "Bagian": section,
+            "Waktu (ms)": round((now - self._last) * 1000, 2),
+            "Alokasi bersih (MB)": round((current - self._last_memory) / 2**20, 3),
+            "Puncak (MB)": round((peak - self._last_memory) / 2**20, 3) if peak_valid else None,
+            "RSS puncak proses (MB)": round(_max_rss_mb(), 1),
+        })
+        if sole:
+            tracemalloc.reset_peak()
+        self._peak_valid = sole
+        self._last_memory = current
+        self._last = time.perf_counter()
+
+    def finish(self):
+        # Tambahkan baris total dan lepas lease tracing (idempoten)
+        if not self.enabled or self._finished:
+            return self.records
+        self._finished = True
+        total = round((time.perf_counter() - self._start) * 1000, 2)
+        self.records.append({"Bagian": "Total", "Waktu (ms)": total,
+                             "Alokasi bersih (MB)": None, "Puncak (MB)": None,
+                             "RSS puncak proses (MB)": round(_max_rss_mb(), 1)})
+        _release(self.owner)
+        return self.records
+
+    def table(self):
+        return pd.DataFrame(self.records)
+
+    def to_json(self):
+        return json.dumps(self.records, indent=2)
@@ -0,0 +1,171 @@
+# Layanan query agregat bersama untuk semua sesi Streamlit.
+#
+# Grafik tidak lagi memotong kubus sendiri di thread skripnya; mereka memanggil
+# QueryService.series(sumber, metrik, groupby, filter). Layanan berjalan di satu
+# event loop asyncio pada thread tersendiri:
+#   - hasil disimpan di cache LRU bersama (kunci: sumber, statistik, groupby,
+#     metrik, filter), jadi sesi lain dengan filter yang sama langsung dijawab,
+#   - permintaan identik yang sedang berjalan menunggu Future yang sama (dedup),
+#   - permintaan yang datang dalam jendela batch singkat dikelompokkan per
+#     (sumber, filter) sehingga potongan kubus dibuat sekali untuk semua query
+#     di kelompok itu; kelompok dijalankan paralel di thread pool.
+# Sumber adalah AggregateCube yang didaftarkan dengan kunci dataset (frame_key).
+import asyncio
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+STATS = ("mean", "std", "count", "top")
+
+Query = namedtuple("Query", ["source", "stat", "by", "metrics", "filters", "n"])
+
+
+def _filter_key(filters):
+    # Kunci filter yang hashable dan tidak bergantung urutan negara/klaster
+    filters = filters or {}
+    years = filters.get("years")
+    countries = filters.get("countries")
+    clusters = filters.get("clusters")
+    return (
+        tuple(int(y) for y in years) if years is not None else None,
+        tuple(sorted(countries)) if countries is not None else None,
+        tuple(sorted(clusters)) if clusters is not None else None,
+    )
+
+
+def _as_tuple(value):
+    if value is None:
+        return ()
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+def _run(sliced, query):
+    by, metrics = list(query.by), list(query.metrics)
+    if query.stat == "count":
+        return sliced.count_by(by[0])
+    if query.stat == "std":
+        return sliced.std_by(by, metrics)
+    if query.stat == "top":
+        return sliced.top_n(by, metrics[0], query.n)
+    if not by:
+        return sliced.mean(metrics[0])
+    return sliced.mean_by(by, metrics)
+
+
+class QueryService:
+    def __init__(self, max_workers=4, max_results=512, batch_window=0.002, max_batch=64, max_sources=8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="query-service", daemon=True)
+        self._thread.start()
+        self._sources = OrderedDict()
+        self._sources_lock = threading.Lock()
+        self._max_sources = max_sources
+        # Hanya diakses dari thread event loop
+        self._results = OrderedDict()
+        self._max_results = max_results
+        self._inflight = {}
+        self._pending = []
+        self._flush_handle = None
+        self._batch_window = batch_window
+        self._max_batch = max_batch
+        self._stats = {"queries": 0, "hits": 0, "deduplicated": 0, "batches": 0, "groups": 0}
+
+    def register(self, source, cube):
+        with self._sources_lock:
+            self._sources[source] = cube
+            self._sources.move_to_end(source)
+            while len(self._sources) > self._max_sources:
+                self._sources.popitem(last=False)
+
+    def submit(self, source, metric=None, groupby=None, filters=None, stat="mean", n=10):
+        # concurrent.futures.Future; aman dipanggil dari thread mana pun
+        if stat not in STATS:
+            raise ValueError(f"Statistik tidak dikenal: {stat}")
+        query = Query(source, stat, _as_tuple(groupby), _as_tuple(metric), _filter_key(filters),
+                      n if stat == "top" else None)
+        return asyncio.run_coroutine_threadsafe(self._query(query), self._loop)
+
+    def series(self, source, metric=None, groupby=None, filters=None, stat="mean", n=10):
+        # Hasil dibagi antar sesi, jadi pemanggil menerima salinan
+        result = self.submit(source, metric, groupby, filters, stat, n).result()
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+
+    def stats(self):
+        async def snapshot():
+            return {**self._stats, "cached": len(self._results), "inflight": len(self._inflight)}
+        return asyncio.run_coroutine_threadsafe(snapshot(), self._loop).result()
+
+    async def _query(self, query):
+        self._stats["queries"] += 1
+        if query in self._results:
+            self._results.move_to_end(query)
+            self._stats["hits"] += 1
+            return self._results[query]
+        future = self._inflight.get(query)
+        if future is not None:
+            self._stats["deduplicated"] += 1
+            return await asyncio.shield(future)
+        future = self._loop.create_future()
+        self._inflight[query] = future
+        self._pending.append(query)
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self._batch_window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        groups = {}
+        for query in batch:
+            groups.setdefault((query.source, query.filters), []).append(query)
+        self._stats["batches"] += 1
+        self._stats["groups"] += len(groups)
+        for (source, filters), queries in groups.items():
+            self._loop.create_task(self._run_group(source, filters, queries))
+
+    async def _run_group(self, source, filters, queries):
+        # Kegagalan bersama (sumber/potongan kubus) diteruskan ke semua query
+        # dalam grup; kegagalan satu query hanya ke future query itu sendiri
+        try:
+            with self._sources_lock:
+                cube = self._sources.get(source)
+            if cube is None:
+                raise KeyError(f"Sumber query belum didaftarkan: {source!r}")
+            outcomes = await self._loop.run_in_executor(self._executor, self._compute, cube, filters, queries)
+        except Exception as e:
+            for query in queries:
+                self._inflight.pop(query).set_exception(e)
+            return
+        for query, (error, result) in zip(queries, outcomes):
+            future = self._inflight.pop(query)
+            if error is not None:
+                future.set_exception(error)
+                continue
+            self._results[query] = result
+            future.set_result(result)
+        while len(self._results) > self._max_results:
+            self._results.popitem(last=False)
+
+    @staticmethod
+    def _compute(cube, filters, queries):
+        # Satu potongan kubus untuk semua query dengan filter yang sama;
+        # hasil per query berupa pasangan (error, hasil)
+        years, countries, clusters = filters
+        sliced = cube.select(years, list(countries) if countries is not None else None,
+                             list(clusters) if clusters is not None else None)
+        outcomes = []
+        for query in queries:
+            try:
+                outcomes.append((None, _run(sliced, query)))
+            except Exception as e:
+                outcomes.append((e, None))
+        return outcomes
@@ -0,0 +1,118 @@
+# Indeks peringkat Top-N per entitas (negara, atau pasangan negara-klaster).
+#
+# RankingIndex menyimpan statistik cukup per (entitas, Year) yang terisi: jumlah
+# baris, dan jumlah serta count per fitur, terurut per entitas lalu tahun dan
+# disimpan sebagai prefix sum. Rata-rata per entitas untuk rentang tahun apa pun
+# cukup berupa selisih dua baris prefix yang dicari dengan searchsorted
+# (O(entitas log sel)), lalu Top-N dipilih dengan np.argpartition (O(entitas))
+# dan hanya N hasilnya yang diurutkan. Rata-rata per filter dan hasil Top-N
+# di-memo per fingerprint filter (rentang tahun, himpunan negara), jadi grafik
+# peringkat tetap interaktif dengan ratusan ribu entitas.
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cube import _group_sum
+
+
+def filter_fingerprint(year_range, countries):
+    # Daftar negara bisa sangat panjang; yang disimpan hanya digest-nya
+    if countries is None:
+        return (tuple(year_range) if year_range is not None else None, None)
+    digest = hashlib.sha1("\0".join(sorted(map(str, countries))).encode("utf-8")).hexdigest()
+    return (tuple(int(y) for y in year_range) if year_range is not None else None, digest)
+
+
+class RankingIndex:
+    def __init__(self, cube, by=("Country",), memo_size=64):
+        # by: ("Country",) atau ("Country", "Cluster")
+        self.by = tuple(by)
+        self.features = list(cube.features)
+        self.years = cube.years
+        year, country, cluster = cube.codes
+        if "Cluster" in self.by:
+            entity_key = country * len(cube.clusters) + cluster
+        else:
+            entity_key = country
+        # Hanya entitas yang memiliki sel; urutan entitas = urutan (Country, Cluster)
+        entity_key, entity = np.unique(entity_key, return_inverse=True)
+        if "Cluster" in self.by:
+            self.countries = cube.countries[entity_key // len(cube.clusters)]
+            self.labels = {"Country": self.countries, "Cluster": cube.clusters[entity_key % len(cube.clusters)]}
+        else:
+            self.countries = cube.countries[entity_key]
+            self.labels = {"Country": self.countries}
+        # Kunci sel per (entitas, tahun); prefix[i] = jumlah sel ke-0 .. ke-(i-1)
+        self._keys, (rows, total, count) = _group_sum(
+            entity * len(self.years) + year, cube.rows, cube.sum, cube.count)
+        self._rows = np.concatenate([[0], np.cumsum(rows)])
+        self._sum = np.concatenate([np.zeros((1, len(self.features))), np.cumsum(total, axis=0)])
+        self._count = np.concatenate([np.zeros((1, len(self.features))), np.cumsum(count, axis=0)])
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.countries)
+
+    def _remember(self, key, compute):
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        value = compute()
+        with self._lock:
+            self._memo[key] = value
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return value
+
+    def _year_bounds(self, year_range):
+        if year_range is None:
+            return 0, len(self.years)
+        return (np.searchsorted(self.years, year_range[0], side="left"),
+                np.searchsorted(self.years, year_range[1], side="right"))
+
+    def _means(self, year_range, countries, fingerprint):
+        # Rata-rata semua fitur per entitas (NaN untuk entitas tanpa data atau tersaring)
+        def compute():
+            start, stop = self._year_bounds(year_range)
+            base = np.arange(len(self.countries)) * len(self.years)
+            lo = np.searchsorted(self._keys, base + start)
+            hi = np.searchsorted(self._keys, base + stop)
+            rows = self._rows[hi] - self._rows[lo]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = (self._sum[hi] - self._sum[lo]) / (self._count[hi] - self._count[lo])
+            keep = rows > 0
+            if countries is not None:
+                keep &= pd.Index(self.countries).isin([str(c) for c in countries])
+            means[~keep] = np.nan
+            return means
+        return self._remember(("means", fingerprint), compute)
+
+    def top(self, feature, n=10, year_range=None, countries=None, ascending=False, columns=()):
+        # Setara mean_by(by, feature).sort_values(feature, ascending).head(n);
+        # columns: fitur lain yang ikut dikembalikan untuk entitas yang sama
+        fingerprint = filter_fingerprint(year_range, countries)
+        key = ("top", feature, n, ascending, tuple(columns), fingerprint)
+
+        def compute():
+            means = self._means(year_range, countries, fingerprint)
+            f = self.features.index(feature)
+            valid = np.flatnonzero(~np.isnan(means[:, f]))
+            values = means[valid, f] if ascending else -means[valid, f]
+            if n < len(valid):
+                picked = np.argpartition(values, n - 1)[:n]
+            else:
+                picked = np.arange(len(valid))
+            # Urutkan hanya N terpilih; seri diputus oleh urutan entitas
+            picked = picked[np.lexsort((valid[picked], values[picked]))]
+            idx = valid[picked]
+            out = pd.DataFrame({dim: self.labels[dim][idx] for dim in self.by})
+            for name in [feature] + [c for c in columns if c != feature]:
+                out[name] = means[idx, self.features.index(name)]
+            return out
+        return self._remember(key, compute).copy()
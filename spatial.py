@@ -0,0 +1,120 @@
+# Indeks spasial untuk peta klaster di ruang PCA (PC1, PC2).
+#
+# ClusterMap dibangun sekali per dataset hasil clustering dan dibagi ke semua
+# sesi. Isinya:
+#   - rentang PC1/PC2 seluruh data, sehingga grid ringkasan (lod.DensityGrid,
+#     sama dengan sebaran PCA halaman Analisis Clustering) punya geometri yang
+#     sama untuk semua filter,
+#   - KD-tree (scikit-learn) untuk pencarian titik terdekat,
+#   - kode negara dan tahun per titik; mask filter dibangun lewat lookup pada
+#     sumbu negara/tahun unik dan di-memo per fingerprint filter, jadi rerun
+#     dengan filter yang sama tidak memindai ulang titik.
+# Peta di browser menerima ringkasan per sel (jumlah dan jumlah fitur per klaster,
+# plus satu titik perwakilan), jadi seleksi lasso/kotak dan hover dijawab dari
+# data yang ukurannya dibatasi jumlah sel, bukan jumlah baris; saat zoom sel
+# dihitung ulang di browser (lod.REBIN_JS).
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from lod import DensityGrid
+from ranking import filter_fingerprint
+
+
+class ClusterMap:
+    def __init__(self, frame, features, cluster_col="Cluster", memo_size=8):
+        x = frame["PC1"].to_numpy(dtype=np.float64)
+        y = frame["PC2"].to_numpy(dtype=np.float64)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        self.x, self.y = x[valid], y[valid]
+        self.features = list(features)
+        self.values = frame[self.features].to_numpy(dtype=np.float64)[valid]
+        labels = frame[cluster_col].astype(str).to_numpy()[valid]
+        self.clusters, self.codes = np.unique(labels, return_inverse=True)
+        country = frame["Country"]
+        if not isinstance(country.dtype, pd.CategoricalDtype):
+            country = country.astype("category")
+        self.countries = np.asarray(country.cat.categories.astype(str))
+        self.country_code = country.cat.codes.to_numpy()[valid]
+        self.year = frame["Year"].to_numpy()[valid]
+        self.years, self.year_code = np.unique(self.year, return_inverse=True)
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+        self.extent = ((self.x.min(), self.x.max(), self.y.min(), self.y.max())
+                       if len(self.x) else (0.0, 1.0, 0.0, 1.0))
+        self.tree = KDTree(np.column_stack([self.x, self.y])) if len(self.x) else None
+
+    def _country_name(self, positions):
+        # Kode -1 (Country kosong) jatuh ke elemen terakhir: string kosong
+        return np.append(self.countries, "")[self.country_code[positions]]
+
+    def mask(self, year_range=None, countries=None):
+        # Hasil dibagi antar sesi dan tidak boleh diubah pemanggil
+        key = filter_fingerprint(year_range, countries)
+        with self._lock:
+            keep = self._memo.get(key)
+            if keep is not None:
+                self._memo.move_to_end(key)
+                return keep
+        year_mask = np.ones(len(self.years), dtype=bool)
+        if year_range is not None:
+            year_mask = (self.years >= year_range[0]) & (self.years <= year_range[1])
+        keep = year_mask[self.year_code]
+        if countries is not None:
+            # Lookup hash pada sumbu negara unik, lalu per titik lewat kodenya;
+            # kode -1 (Country kosong) jatuh ke elemen tambahan False
+            country_mask = np.append(pd.Index(self.countries).isin([str(c) for c in countries]), False)
+            keep &= country_mask[self.country_code]
+        keep.flags.writeable = False
+        with self._lock:
+            self._memo[key] = keep
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return keep
+
+    def cells(self, keep=None):
+        # (DensityGrid, kolom perwakilan per entri) untuk titik yang lolos filter:
+        # jumlah dan jumlah fitur per (sel, klaster), plus titik perwakilan
+        # (terdekat ke rata-rata entri) untuk hover
+        idx = np.arange(len(self.x)) if keep is None else np.flatnonzero(keep)
+        grid = DensityGrid(self.x[idx], self.y[idx], pd.Categorical.from_codes(self.codes[idx], self.clusters),
+                           self.clusters, extent=self.extent, values=self.values[idx], representatives=True)
+        rep = idx[grid.rep_index]
+        return grid, {"Country": self._country_name(rep), "Year": self.year[rep].astype(np.int16),
+                      "PC1": self.x[rep].astype(np.float32), "PC2": self.y[rep].astype(np.float32)}
+
+    def nearest(self, px, py, k=5, keep=None):
+        # Posisi k titik terdekat (yang lolos filter); k diperbesar bertahap
+        # bila sebagian tetangga tersaring
+        if self.tree is None:
+            return np.array([], dtype=np.int64), np.array([])
+        available = len(self.x) if keep is None else int(keep.sum())
+        k = min(k, available)
+        query = k
+        while k:
+            query = min(query, len(self.x))
+            dist, ind = self.tree.query([[px, py]], k=query)
+            dist, ind = dist[0], ind[0]
+            if keep is not None:
+                ok = keep[ind]
+                dist, ind = dist[ok], ind[ok]
+            if len(ind) >= k or query == len(self.x):
+                return ind[:k], dist[:k]
+            query *= 4
+        return np.array([], dtype=np.int64), np.array([])
+
+    def rows_frame(self, positions, dist=None):
+        data = {"Country": self._country_name(positions), "Year": self.year[positions],
+                "Cluster": self.clusters[self.codes[positions]],
+                "PC1": self.x[positions], "PC2": self.y[positions]}
+        if dist is not None:
+            data["Jarak"] = dist
+        frame = pd.DataFrame(data)
+        for f, col in enumerate(self.features):
+            frame[col] = self.values[positions, f]
+        return frame
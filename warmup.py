@@ -0,0 +1,170 @@
+# Pemanasan (warm-up) proses server dan pemeriksaan kesiapan.
+#
+# app.py memulai satu Warmup per proses server (cache_resource) pada rerun
+# pertama. Thread latar belakang mengimpor modul halaman yang berat
+# (matplotlib/seaborn, scikit-learn), memuat store data, lalu membangun kubus,
+# profil klaster dan agregat tampilan default lewat loader cache app.py, jadi
+# pengunjung berikutnya tidak membayar render dingin. Setelah selesai, status
+# ditulis ke file kesiapan (.datastore/ready.json) beserta PID proses server
+# dan stamp data yang dipanaskan.
+#
+# CLI untuk deploy bertahap:
+#   python warmup.py trigger --url http://localhost:8501   # buka satu sesi agar app.py berjalan, tunggu siap
+#   python warmup.py check                                  # exit 0 bila server siap untuk data saat ini
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+from data_store import STORE_DIR, _write_json, source_stamp
+
+DATA_PATH = os.environ.get("ENERGY_DATA_PATH", "global_energy_consumption.csv")
+AGGLO_PATH = os.environ.get("ENERGY_AGGLO_PATH", "hasil_agglo_clustering.csv")
+READY_FILE = "ready.json"
+
+
+def ready_path(data_path):
+    return os.path.join(os.path.dirname(os.path.abspath(data_path)), STORE_DIR, READY_FILE)
+
+
+class Warmup:
+    # steps: daftar (nama, fungsi tanpa argumen), dijalankan berurutan
+    def __init__(self, steps, status_path, stamps):
+        self.steps = steps
+        self.status_path = status_path
+        self.stamps = stamps
+        self.records = []
+        self.current = None
+        self.error = None
+        self.ready = threading.Event()
+        self._started = None
+        self._finished = None
+
+    def start(self, prepare_thread=None):
+        # prepare_thread(thread): mis. add_script_run_ctx agar cache Streamlit
+        # bisa dipakai dari thread ini
+        thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        if prepare_thread is not None:
+            prepare_thread(thread)
+        thread.start()
+        return self
+
+    def _run(self):
+        self._started = time.perf_counter()
+        if os.path.exists(self.status_path):
+            os.remove(self.status_path)
+        for name, step in self.steps:
+            self.current = name
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.error = f"{name}: {e}"
+                self._write_status()
+                return
+            self.records.append({"step": name, "ms": round((time.perf_counter() - start) * 1000, 1)})
+        self.current = None
+        self._finished = time.perf_counter()
+        self.ready.set()
+        self._write_status()
+
+    def elapsed(self):
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+
+    def status(self):
+        return {"ready": self.ready.is_set(), "pid": os.getpid(), "stamps": self.stamps,
+                "current": self.current, "error": self.error,
+                "seconds": round(self.elapsed(), 2), "steps": self.records}
+
+    def _write_status(self):
+        os.makedirs(os.path.dirname(self.status_path), exist_ok=True)
+        _write_json(self.status_path, {**self.status(), "written_at": time.time()})
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def check(data_path=DATA_PATH, agglo_path=AGGLO_PATH):
+    # (siap, alasan)
+    path = ready_path(data_path)
+    if not os.path.exists(path):
+        return False, "belum ada status pemanasan"
+    with open(path) as f:
+        status = json.load(f)
+    if status.get("error"):
+        return False, f"pemanasan gagal ({status['error']})"
+    if not status.get("ready"):
+        return False, "pemanasan belum selesai"
+    if not _pid_alive(status["pid"]):
+        return False, f"proses server {status['pid']} tidak berjalan"
+    current = {"data": list(source_stamp(data_path)), "agglo": list(source_stamp(agglo_path))}
+    if status.get("stamps") != current:
+        return False, "data berubah sejak pemanasan"
+    return True, f"siap (pemanasan {status['seconds']} s, PID {status['pid']})"
+
+
+async def _open_session(url):
+    # Sama dengan browser: buka websocket sesi lalu minta skrip dijalankan
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from tornado.httpclient import HTTPRequest
+    from tornado.websocket import websocket_connect
+
+    base = url.rstrip("/")
+    ws_url = base.replace("https://", "wss://").replace("http://", "ws://") + "/_stcore/stream"
+    conn = await websocket_connect(HTTPRequest(ws_url, headers={"Origin": base}))
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    await conn.write_message(msg.SerializeToString(), binary=True)
+    return conn
+
+
+async def _trigger(url, data_path, agglo_path, timeout):
+    conn = await _open_session(url)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            ok, reason = check(data_path, agglo_path)
+            if ok or time.monotonic() > deadline or reason.startswith("pemanasan gagal"):
+                return ok, reason
+            # Sesi tetap terbuka sampai siap; pesan dari server dibuang
+            try:
+                message = await asyncio.wait_for(conn.read_message(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            if message is None:
+                return check(data_path, agglo_path)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pemanasan dan pemeriksaan kesiapan server Streamlit.")
+    parser.add_argument("command", choices=["check", "trigger"])
+    parser.add_argument("--url", default="http://localhost:8501")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--agglo", default=AGGLO_PATH)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    if args.command == "check":
+        ok, reason = check(args.data, args.agglo)
+    else:
+        ok, reason = asyncio.run(_trigger(args.url, args.data, args.agglo, args.timeout))
+    print(reason)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()